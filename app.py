@@ -1,18 +1,31 @@
 import logging
+
 from flask import Flask
 
-import core.extensions.ext_storage as storage
-from web import bp as web_bp
+import core.extensions.ext_celery as celery
+from core.extensions import init_from_env
+from core.extractor.warmup import warm_up
+from web import ExtractorRequest, bp as web_bp
+from web.metrics import bp as metrics_bp
+
+if __name__ != '__main__':
+    gunicorn_logger = logging.getLogger('gunicorn.error')
+    logging.getLogger('core').handlers = gunicorn_logger.handlers
+    logging.getLogger('core').setLevel(gunicorn_logger.level)
 
 app = Flask(__name__)
+app.request_class = ExtractorRequest
 
 app.register_blueprint(web_bp)
-storage.init(storage.StorageConfig.local('/tmp'))
+app.register_blueprint(metrics_bp)
+init_from_env()
+celery_app = celery.celery_app
 
 if __name__ != '__main__':
-    gunicorn_logger = logging.getLogger('gunicorn.error')
     app.logger.handlers = gunicorn_logger.handlers
     app.logger.setLevel(gunicorn_logger.level)
 
 if __name__ == '__main__':
+    # gunicorn warms up in its master, see gunicorn.conf.py, importing the app alone never does
+    warm_up()
     app.run()
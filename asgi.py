@@ -0,0 +1,245 @@
+"""
+ASGI entry point serving the extractor api on an event loop, run it with `uvicorn asgi:app`.
+
+Uploads, downloads and storage access never block the loop, extractions run on the process pools of
+core.extractor.worker_pool. Streamed extractions send every document as soon as the worker produced it.
+"""
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Callable, Optional
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+from core.extensions import init_from_env
+from core.extensions.ext_metrics import metrics
+from core.extractor import worker_pool
+from core.extractor.entity.extract_setting import ExtractSetting
+from core.extractor.extract_processor import ExtractProcessor
+from core.extractor.pdf_extractor import parse_pages
+from core.extractor.text_splitter import from_setting as splitter_from_setting
+from core.models.serialization import (JSON_MIMETYPE, NDJSON_MIMETYPE, dump_document, dumps, join_documents,
+                                       prefers_ndjson)
+from core.extractor.url_fetcher import FetchError
+
+logger = logging.getLogger('uvicorn.error')
+
+UPLOAD_MEMORY_MAX_BYTES = int(os.environ.get('UPLOAD_MEMORY_MAX_BYTES', 10 * 1024 * 1024))
+
+# size of the chunks an upload spooled to disk is copied with
+UPLOAD_COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def error_response(status_code: int, message: str) -> JSONResponse:
+    """Build an error response in the format flask_restful uses for aborts."""
+    headers = {'Retry-After': str(int(worker_pool.ASGI_QUEUE_TIMEOUT))} if status_code == 503 else None
+    return JSONResponse({'message': message}, status_code=status_code, headers=headers)
+
+
+def wants_stream(request: Request) -> bool:
+    """Check whether the client asked for newline-delimited JSON, see web.extractor.wants_stream."""
+    if request.query_params.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+
+    return prefers_ndjson(request.headers.get('accept'))
+
+
+def request_setting(request: Request, form) -> ExtractSetting:
+    """Build the extract settings from the form or query values, see web.extractor.request_setting.
+
+    Raises:
+        ValueError: when the splitter or page values are invalid.
+    """
+    def value(name: str):
+        return form.get(name) or request.query_params.get(name)
+
+    extract_setting = ExtractSetting(splitter=value('splitter') or '', chunkSize=value('chunk_size'),
+                                     chunkOverlap=value('chunk_overlap'), pages=value('pages') or '',
+                                     maxPages=value('max_pages'), documentId=value('document_id') or '')
+    splitter_from_setting(extract_setting)
+    parse_pages(extract_setting.pages, extract_setting.maxPages)
+    return extract_setting
+
+
+def documents_response(request: Request, documents: list[bytes]) -> Response:
+    """Build the response from documents already encoded, see core.models.serialization."""
+    if wants_stream(request):
+        return StreamingResponse((document + b'\n' for document in documents), media_type=NDJSON_MIMETYPE)
+
+    return Response(join_documents(documents), media_type=JSON_MIMETYPE)
+
+
+async def stream_response(lane: worker_pool.WorkerLane, fn, *args, cleanup: Optional[Callable] = None) -> Response:
+    """
+    Run a streamed extraction of core.extractor.worker_pool and write every document as a single JSON line as
+    soon as the worker produced it, see web.extractor.ndjson_response.
+
+    The worker writes the lines to a temporary file the response follows with worker_pool.read_lines. The first
+    line is read before the response is built, so that the errors raised until then are answered with an error
+    status, an error raised once the response has started ends it with an `{"error": ...}` line. `cleanup` is
+    called once both the response and the extraction are over, the caller keeps it when an error is raised.
+    """
+    fd, output_path = tempfile.mkstemp(suffix='.ndjson')
+    os.close(fd)
+    try:
+        future = await lane.submit(fn, output_path, *args)
+        lines = worker_pool.read_lines(future, output_path)
+        first = await anext(lines, None)
+    except BaseException:
+        os.remove(output_path)
+        raise
+
+    def finish(_):
+        os.remove(output_path)
+        if cleanup is not None:
+            cleanup()
+
+    async def generate():
+        try:
+            if first is None:
+                return
+            yield first
+            async for line in lines:
+                yield line
+        except Exception as e:
+            logger.exception('extraction failed while streaming')
+            yield dumps({'error': str(e)}) + b'\n'
+        finally:
+            await lines.aclose()
+            # a worker still running after the client went away may read the files of `cleanup`
+            future.add_done_callback(finish)
+
+    return StreamingResponse(generate(), media_type=NDJSON_MIMETYPE)
+
+
+async def extract_file(request: Request) -> Response:
+    """
+    Extract an uploaded file, with the same contract as the POST /v1/extractor/file resource.
+
+    Uploads up to UPLOAD_MEMORY_MAX_BYTES are handed to the worker in memory, larger ones are copied to a
+    temporary directory first. Responds with 503 when the workers stay busy for longer than ASGI_QUEUE_TIMEOUT.
+    """
+    async with request.form() as form:
+        file = form.get('file')
+        if not isinstance(file, UploadFile):
+            return error_response(400, 'No file part')
+        if not file.filename:
+            return error_response(400, 'No selected file')
+
+        try:
+            extract_setting = request_setting(request, form)
+        except ValueError as e:
+            return error_response(400, str(e))
+
+        filename = os.path.basename(file.filename)
+        size = file.size or 0
+        lane = worker_pool.lane_for(size)
+        try:
+            if size <= UPLOAD_MEMORY_MAX_BYTES:
+                args = (None, await file.read(), filename, file.content_type, extract_setting)
+                if wants_stream(request):
+                    return await stream_response(lane, worker_pool.stream_file, *args)
+                return documents_response(request, await lane.run(worker_pool.extract_file, *args))
+
+            temp_dir = tempfile.mkdtemp()
+            cleanup = partial(shutil.rmtree, temp_dir, True)
+            try:
+                file_path = os.path.join(temp_dir, filename)
+                await run_in_threadpool(_copy_upload, file, file_path)
+                args = (file_path, None, filename, file.content_type, extract_setting)
+                if wants_stream(request):
+                    response = await stream_response(lane, worker_pool.stream_file, *args, cleanup=cleanup)
+                    # the response removes the file once the worker is done with it
+                    cleanup = None
+                    return response
+                return documents_response(request, await lane.run(worker_pool.extract_file, *args))
+            finally:
+                if cleanup is not None:
+                    await run_in_threadpool(cleanup)
+        except worker_pool.PoolBusyError as e:
+            return error_response(503, str(e))
+
+
+async def extract_url(request: Request) -> Response:
+    """
+    Extract a remote file, with the same contract as the POST /v1/extractor/url resource.
+
+    The download runs on a thread, the extraction on the lane matching the downloaded size.
+    """
+    async with request.form() as form:
+        target_url = form.get('url')
+        try:
+            extract_setting = request_setting(request, form)
+        except ValueError as e:
+            return error_response(400, str(e))
+    if not target_url:
+        return error_response(400, 'No url provided')
+
+    temp_dir = tempfile.mkdtemp()
+    cleanup = partial(shutil.rmtree, temp_dir, True)
+    try:
+        fetched = await run_in_threadpool(ExtractProcessor.fetch_url, target_url, temp_dir, extract_setting)
+        if isinstance(fetched, list):
+            return documents_response(request, [dump_document(document) for document in fetched])
+
+        lane = worker_pool.lane_for(os.path.getsize(fetched.file_path))
+        if wants_stream(request):
+            response = await stream_response(lane, worker_pool.stream_fetched, target_url, fetched, extract_setting,
+                                             cleanup=cleanup)
+            cleanup = None
+            return response
+        documents = await lane.run(worker_pool.extract_fetched, target_url, fetched, extract_setting)
+        return documents_response(request, documents)
+    except FetchError as e:
+        return error_response(e.status_code, str(e))
+    except worker_pool.PoolBusyError as e:
+        return error_response(503, str(e))
+    finally:
+        if cleanup is not None:
+            await run_in_threadpool(cleanup)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Expose the Prometheus metrics, see web.metrics.metrics_endpoint."""
+    if not metrics.enabled:
+        return error_response(404, 'Not Found')
+
+    data, content_type = await run_in_threadpool(metrics.render)
+    return Response(data, media_type=content_type)
+
+
+def _copy_upload(file: UploadFile, file_path: str):
+    file.file.seek(0)
+    with open(file_path, 'wb') as f:
+        shutil.copyfileobj(file.file, f, UPLOAD_COPY_CHUNK_BYTES)
+
+
+@asynccontextmanager
+async def lifespan(_app: Starlette):
+    for lane in (worker_pool.small_lane, worker_pool.large_lane):
+        logger.info('%s workers warmed up in %.3fs', lane.name, await lane.start())
+    yield
+    worker_pool.small_lane.shutdown()
+    worker_pool.large_lane.shutdown()
+
+
+init_from_env()
+
+app = Starlette(
+    routes=[
+        Route('/metrics', metrics_endpoint),
+        Mount('/v1', routes=[
+            Route('/extractor/file', extract_file, methods=['POST']),
+            Route('/extractor/url', extract_url, methods=['POST']),
+        ]),
+    ],
+    lifespan=lifespan,
+)
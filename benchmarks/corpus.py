@@ -0,0 +1,178 @@
+"""Generate the synthetic benchmark corpus offline, the same seed always yields the same files.
+
+Usage:
+    python -m benchmarks.corpus --output /tmp/extractor-corpus --sizes small medium
+"""
+import argparse
+import csv
+import os
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+SIZES = {
+    'small': {'pdf_pages': 10, 'xlsx_sheets': 2, 'xlsx_rows': 1000, 'csv_rows': 10000,
+              'md_sections': 200, 'html_sections': 200, 'docx_paragraphs': 500},
+    'medium': {'pdf_pages': 200, 'xlsx_sheets': 4, 'xlsx_rows': 20000, 'csv_rows': 200000,
+               'md_sections': 5000, 'html_sections': 5000, 'docx_paragraphs': 10000},
+    'large': {'pdf_pages': 2000, 'xlsx_sheets': 8, 'xlsx_rows': 100000, 'csv_rows': 2000000,
+              'md_sections': 50000, 'html_sections': 50000, 'docx_paragraphs': 100000},
+}
+FORMATS = ('pdf', 'xlsx', 'csv', 'md', 'html', 'docx')
+
+WORDS = (
+    'document extraction service text page table row column header section paragraph vector '
+    'retrieval storage cache worker stream chunk parser latency memory throughput python '
+    'encoding unicode café naïve façade 文档 提取 服务'
+).split()
+
+
+def sentence(rng: random.Random, words: int = 12) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def generate_pdf(file_path: str, pages: int, rng: random.Random):
+    """Write a PDF with a text page per page, using the standard Helvetica font."""
+    offsets = []
+
+    with open(file_path, 'wb') as f:
+        def write_object(number: int, body: bytes):
+            offsets.append((number, f.tell()))
+            f.write(f'{number} 0 obj\n'.encode('ascii') + body + b'\nendobj\n')
+
+        f.write(b'%PDF-1.4\n')
+        font_id = 3 + 2 * pages
+        kids = ' '.join(f'{3 + 2 * i} 0 R' for i in range(pages))
+        write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {pages} >>'.encode('ascii'))
+        for i in range(pages):
+            lines = [f'Page {i + 1}'] + [sentence(rng) for _ in range(30)]
+            # the WinAnsi encoding only covers latin-1, the other words are dropped from the PDF text
+            text = ' Tj T* '.join(
+                '(' + line.encode('latin-1', 'ignore').decode('latin-1').replace('\\', '\\\\')
+                .replace('(', '\\(').replace(')', '\\)') + ')' for line in lines)
+            stream = f'BT /F1 10 Tf 12 TL 50 760 Td {text} Tj ET'.encode('latin-1')
+            write_object(3 + 2 * i, (
+                f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                f'/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>').encode('ascii'))
+            write_object(4 + 2 * i, f'<< /Length {len(stream)} >>\nstream\n'.encode('ascii') + stream + b'\nendstream')
+        write_object(font_id, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+        xref_offset = f.tell()
+        f.write(f'xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n'.encode('ascii'))
+        for _, offset in sorted(offsets):
+            f.write(f'{offset:010d} 00000 n \n'.encode('ascii'))
+        f.write(f'trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n'
+                .encode('ascii'))
+
+
+def generate_xlsx(file_path: str, sheets: int, rows: int, rng: random.Random):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    for s in range(sheets):
+        sheet = wb.create_sheet(f'Sheet {s + 1}')
+        sheet.append(['id', 'name', 'amount', 'comment'])
+        for n in range(rows):
+            sheet.append([n, f'name {n}', round(rng.random() * 1000, 2), sentence(rng, 8)])
+    wb.save(file_path)
+
+
+def generate_csv(file_path: str, rows: int, rng: random.Random):
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'name', 'email', 'amount', 'comment'])
+        for n in range(rows):
+            writer.writerow([n, f'user {n}', f'user{n}@example.com', round(rng.random() * 1000, 2), sentence(rng, 8)])
+
+
+def generate_markdown(file_path: str, sections: int, rng: random.Random):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        for n in range(sections):
+            f.write(f'{"#" * (n % 3 + 1)} Section {n}\n\n')
+            for _ in range(3):
+                f.write(f'{sentence(rng)} See [the docs](https://example.com/{n}) and <b>{rng.choice(WORDS)}</b>.\n')
+            if n % 5 == 0:
+                f.write('\n```python\n# a comment, not a header\nprint("<not a tag>")\n```\n')
+            f.write('\n')
+
+
+def generate_html(file_path: str, sections: int, rng: random.Random):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html><html><head><meta charset="utf-8"><title>Benchmark page</title>'
+                '<style>body { font-family: sans-serif; }</style><script>var tracking = true;</script></head><body>'
+                '<nav>' + ''.join(f'<a href="/{n}">Link {n}</a>' for n in range(50)) + '</nav>')
+        for n in range(sections):
+            level = n % 3 + 1
+            f.write(f'<h{level}>Section {n}</h{level}><div class="content"><p>{escape(sentence(rng))} '
+                    f'<a href="/s/{n}">{rng.choice(WORDS)}</a> <b>{escape(sentence(rng, 5))}</b></p>'
+                    f'<ul><li>{escape(sentence(rng, 4))}</li><li>{escape(sentence(rng, 4))}</li></ul></div>')
+        f.write('<footer>Copyright</footer></body></html>')
+
+
+def generate_docx(file_path: str, paragraphs: int, rng: random.Random):
+    """Write a minimal docx package, holding only the parts word processors and docx2txt require."""
+    namespace = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+    with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'))
+        archive.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+            'officeDocument" Target="word/document.xml"/></Relationships>'))
+        body = ''.join(f'<w:p><w:r><w:t>{escape(sentence(rng))}</w:t></w:r></w:p>' for _ in range(paragraphs))
+        archive.writestr('word/document.xml', (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<w:document xmlns:w="{namespace}"><w:body>{body}</w:body></w:document>'))
+
+
+def generate(output: str, size: str, seed: int = 42) -> dict[str, str]:
+    """
+    Generate the corpus of a size into the output folder, files that already exist are kept.
+
+    Returns:
+        The path of the file of every format.
+    """
+    os.makedirs(output, exist_ok=True)
+    options = SIZES[size]
+    generators = {
+        'pdf': lambda path, rng: generate_pdf(path, options['pdf_pages'], rng),
+        'xlsx': lambda path, rng: generate_xlsx(path, options['xlsx_sheets'], options['xlsx_rows'], rng),
+        'csv': lambda path, rng: generate_csv(path, options['csv_rows'], rng),
+        'md': lambda path, rng: generate_markdown(path, options['md_sections'], rng),
+        'html': lambda path, rng: generate_html(path, options['html_sections'], rng),
+        'docx': lambda path, rng: generate_docx(path, options['docx_paragraphs'], rng),
+    }
+
+    files = {}
+    for file_format in FORMATS:
+        file_path = os.path.join(output, f'{size}.{file_format}')
+        if not os.path.exists(file_path):
+            partial_path = os.path.join(output, f'.{size}.partial.{file_format}')
+            generators[file_format](partial_path, random.Random(f'{seed}-{size}-{file_format}'))
+            os.replace(partial_path, file_path)
+        files[file_format] = file_path
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='/tmp/extractor-corpus')
+    parser.add_argument('--sizes', nargs='+', default=['small'], choices=list(SIZES))
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        for file_format, file_path in generate(args.output, size, args.seed).items():
+            print(f'{size:<8}{file_format:<6}{os.path.getsize(file_path):>14,d}  {file_path}')
+
+
+if __name__ == '__main__':
+    main()
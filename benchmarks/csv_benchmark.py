@@ -0,0 +1,83 @@
+"""Compare the throughput and peak memory of CSVExtractor modes on a generated CSV file.
+
+Usage:
+    python -m benchmarks.csv_benchmark --size-mb 1024
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {
+    # materializes one document per row, the behaviour of CSVExtractor.extract
+    'list': {'rows_per_document': 1, 'stream': False},
+    'stream': {'rows_per_document': 1, 'stream': True},
+    'stream-batched': {'rows_per_document': 100, 'stream': True},
+}
+
+
+def generate_csv(file_path: str, size_mb: int):
+    row = 'id,name,email,city,amount,comment\n'
+    target = size_mb * 1024 * 1024
+    with open(file_path, 'w') as f:
+        f.write(row)
+        written, i = len(row), 0
+        while written < target:
+            lines = ''.join(
+                f'{n},user {n},user{n}@example.com,city {n % 97},{n * 3.7:.2f},some free text comment for row {n}\n'
+                for n in range(i, i + 10000)
+            )
+            f.write(lines)
+            written += len(lines)
+            i += 10000
+
+
+def run_mode(file_path: str, mode: str) -> dict:
+    from core.extractor.csv_extractor import CSVExtractor
+
+    options = MODES[mode]
+    extractor = CSVExtractor(file_path, rows_per_document=options['rows_per_document'])
+    start = time.perf_counter()
+    if options['stream']:
+        documents = sum(1 for _ in extractor.load())
+    else:
+        documents = len(extractor.extract())
+    elapsed = time.perf_counter() - start
+
+    return {
+        'mode': mode,
+        'documents': documents,
+        'seconds': round(elapsed, 3),
+        'mb_per_second': round(os.path.getsize(file_path) / 1024 / 1024 / elapsed, 2),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=100)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--run-mode', help=argparse.SUPPRESS)
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(run_mode(args.file, args.run_mode)))
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = f'{temp_dir}/benchmark.csv'
+        generate_csv(file_path, args.size_mb)
+        # every mode runs in its own process, so that the peak memory of one does not hide the other
+        for mode in args.modes:
+            output = subprocess.check_output(
+                [sys.executable, '-m', 'benchmarks.csv_benchmark', '--run-mode', mode, '--file', file_path])
+            print(output.decode('utf-8').strip())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Compare the pydantic Document with the slots Document on a generated CSV file, from the extraction to the
+encoded response.
+
+Usage:
+    python -m benchmarks.document_benchmark --rows 1000000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from benchmarks.corpus import generate_csv
+
+MODES = ('pydantic', 'slots')
+
+# documents held while measuring the memory allocated per document
+ALLOCATION_SAMPLE = 100000
+
+
+class PydanticDocument(BaseModel):
+    """The Document model before it became a slots class, with the json.dumps encoding of the responses."""
+
+    content: str
+    meta: Optional[dict] = Field(default_factory=dict)
+
+    def to_dict(self):
+        return self.dict()
+
+
+def run_mode(file_path: str, mode: str) -> dict:
+    import core.extractor.csv_extractor as csv_extractor
+    from core.models.serialization import dumps
+
+    if mode == 'pydantic':
+        csv_extractor.Document = PydanticDocument
+
+        def encode(documents):
+            return json.dumps({'documents': [document.to_dict() for document in documents]}).encode('utf-8')
+    else:
+        def encode(documents):
+            return dumps({'documents': [document.to_dict() for document in documents]})
+
+    document_class = csv_extractor.Document
+    tracemalloc.start()
+    sample = [document_class(content=f'row {n}', meta={'source': '', 'row': n}) for n in range(ALLOCATION_SAMPLE)]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del sample
+
+    started_at = time.perf_counter()
+    documents = csv_extractor.CSVExtractor(file_path).extract()
+    extracted_at = time.perf_counter()
+    payload = encode(documents)
+    encoded_at = time.perf_counter()
+
+    return {
+        'mode': mode,
+        'documents': len(documents),
+        'extract_seconds': round(extracted_at - started_at, 3),
+        'encode_seconds': round(encoded_at - extracted_at, 3),
+        'payload_mb': round(len(payload) / 1024 / 1024, 1),
+        'bytes_per_document': round(allocated / ALLOCATION_SAMPLE),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--run-mode', help=argparse.SUPPRESS)
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(run_mode(args.file, args.run_mode)))
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, 'benchmark.csv')
+        generate_csv(file_path, args.rows, random.Random(42))
+        # every mode runs in its own process, so that the peak memory of one does not hide the other
+        for mode in args.modes:
+            output = subprocess.check_output(
+                [sys.executable, '-m', 'benchmarks.document_benchmark', '--run-mode', mode, '--file', file_path])
+            print(output.decode('utf-8').strip())
+
+
+if __name__ == '__main__':
+    main()
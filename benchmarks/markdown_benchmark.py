@@ -0,0 +1,99 @@
+"""Compare the MarkdownExtractor sectionizer with the previous multi-pass implementation on generated markdown.
+
+Usage:
+    python -m benchmarks.markdown_benchmark --size-mb 16
+"""
+import argparse
+import json
+import re
+import tempfile
+import time
+from typing import Optional, cast
+
+
+def generate_markdown(file_path: str, size_mb: int, section_lines: int):
+    target = size_mb * 1024 * 1024
+    with open(file_path, 'w') as f:
+        written, n = 0, 0
+        while written < target:
+            lines = [f'{"#" * (n % 3 + 1)} Section {n}\n']
+            for i in range(section_lines):
+                lines.append(f'Line {i} of section {n} with a [link](https://example.com/{i}) and <b>markup</b>.\n')
+            lines.append('```python\n# a comment, not a header\nprint("<not a tag>")\n```\n')
+            chunk = ''.join(lines)
+            f.write(chunk)
+            written += len(chunk)
+            n += 1
+
+
+def legacy_markdown_to_tups(markdown_text: str) -> list[tuple[Optional[str], str]]:
+    """The implementation MarkdownExtractor used before the single-pass sectionizer, kept as the baseline."""
+    markdown_text = re.sub(r"\[(.*?)\]\((.*?)\)", r"\1", markdown_text)
+    markdown_text = re.sub(r"!{1}\[\[(.*)\]\]", "", markdown_text)
+
+    markdown_tups: list[tuple[Optional[str], str]] = []
+    lines = markdown_text.split("\n")
+
+    current_header = None
+    current_text = ""
+
+    for line in lines:
+        header_match = re.match(r"^#+\s", line)
+        if header_match:
+            if current_header is not None:
+                markdown_tups.append((current_header, current_text))
+
+            current_header = line
+            current_text = ""
+        else:
+            current_text += line + "\n"
+    markdown_tups.append((current_header, current_text))
+
+    if current_header is not None:
+        markdown_tups = [
+            (re.sub(r"#", "", cast(str, key)).strip(), re.sub(r"<.*?>", "", value))
+            for key, value in markdown_tups
+        ]
+    else:
+        markdown_tups = [
+            (key, re.sub("\n", "", value)) for key, value in markdown_tups
+        ]
+
+    return markdown_tups
+
+
+def measure(name: str, func, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sections = func()
+        timings.append(time.perf_counter() - start)
+    return {'implementation': name, 'sections': sections, 'best_seconds': round(min(timings), 3)}
+
+
+def main():
+    from core.extractor.markdown_extractor import MarkdownExtractor
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=16)
+    parser.add_argument('--section-lines', type=int, nargs='+', default=[20, 20000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for section_lines in args.section_lines:
+            file_path = f'{temp_dir}/benchmark-{section_lines}.md'
+            generate_markdown(file_path, args.size_mb, section_lines)
+            with open(file_path) as f:
+                text = f.read()
+
+            extractor = MarkdownExtractor(file_path)
+            for result in (
+                    measure('legacy', lambda: len(legacy_markdown_to_tups(text)), args.repeat),
+                    measure('sectionizer', lambda: len(extractor.markdown_to_tups(text)), args.repeat),
+            ):
+                print(json.dumps({'size_mb': args.size_mb, 'section_lines': section_lines, **result}))
+
+
+if __name__ == '__main__':
+    main()
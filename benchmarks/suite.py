@@ -0,0 +1,263 @@
+"""Benchmark every extractor and the HTTP endpoints on the generated corpus, and write the results as JSON.
+
+Every case runs in its own process, so that the peak memory of one does not hide the others. Results
+carry the git commit they were measured on, pass a previous results file with --baseline to compare.
+
+Usage:
+    python -m benchmarks.suite --sizes small medium --repeat 5 --output results.json
+    python -m benchmarks.suite --sizes small --http flask asgi --baseline previous.json
+"""
+import argparse
+import datetime
+import functools
+import http.server
+import json
+import os
+import platform
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import corpus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'flask': lambda port: ['gunicorn', '--bind', f'127.0.0.1:{port}', 'app:app'],
+    'asgi': lambda port: ['uvicorn', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning',
+                          'asgi:app'],
+}
+ENDPOINTS = ('file', 'url')
+SERVER_START_TIMEOUT = 120
+
+
+def percentiles(latencies: list[float]) -> dict:
+    ordered = sorted(latencies)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+
+    return {'p50': at(0.5), 'p90': at(0.9), 'p99': at(0.99), 'mean': round(sum(ordered) / len(ordered), 4)}
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is in kilobytes on linux
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def run_case(file_path: str, repeat: int) -> dict:
+    """Extract a file `repeat` times in this process, after a first warm-up run."""
+    from core.extractor.entity.extract_setting import ExtractSetting
+    from core.extractor.extract_processor import ExtractProcessor
+    from core.extractor.registry import ETL_TYPE_DEFAULT, registry
+
+    extractor = type(registry.create(ETL_TYPE_DEFAULT, file_path))
+    documents = len(ExtractProcessor.extract(ExtractSetting(), file_path=file_path))
+    latencies = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        ExtractProcessor.extract(ExtractSetting(), file_path=file_path)
+        latencies.append(time.perf_counter() - started_at)
+
+    median = percentiles(latencies)['p50']
+    return {
+        'extractor': extractor.__name__,
+        'documents': documents,
+        'latency_seconds': percentiles(latencies),
+        'mb_per_second': round(os.path.getsize(file_path) / 1024 / 1024 / median, 2),
+        'documents_per_second': round(documents / median, 1),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, process: subprocess.Popen):
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not listen on {port} within {SERVER_START_TIMEOUT}s')
+
+
+def _serve_folder(folder: str) -> http.server.ThreadingHTTPServer:
+    handler = functools.partial(_QuietHandler, directory=folder)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def run_http(server_name: str, files: list[str], requests_count: int, concurrency: int) -> list[dict]:
+    """
+    Start a server and send `requests_count` requests for every file and endpoint, `concurrency` at a time.
+
+    The peak memory reported is the largest of the server processes, the server is stopped and waited
+    for before reading it.
+    """
+    import requests
+
+    port = _free_port()
+    env = dict(os.environ, EXTRACT_CACHE_ENABLED='false', PYTHONPATH=ROOT)
+    server = subprocess.Popen(SERVERS[server_name](port), cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    files_server = _serve_folder(os.path.dirname(files[0]))
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+    def send(endpoint: str, file_path: str) -> tuple[float, int]:
+        started_at = time.perf_counter()
+        if endpoint == 'file':
+            with open(file_path, 'rb') as f:
+                response = session.post(f'http://127.0.0.1:{port}/v1/extractor/file',
+                                        files={'file': (os.path.basename(file_path), f)})
+        else:
+            url = f'http://127.0.0.1:{files_server.server_port}/{os.path.basename(file_path)}'
+            response = session.post(f'http://127.0.0.1:{port}/v1/extractor/url', data={'url': url})
+        response.content
+        return time.perf_counter() - started_at, response.status_code
+
+    results = []
+    try:
+        _wait_for_port(port, server)
+        with ThreadPoolExecutor(concurrency) as executor:
+            for endpoint in ENDPOINTS:
+                for file_path in files:
+                    send(endpoint, file_path)
+                    started_at = time.perf_counter()
+                    responses = list(executor.map(lambda _: send(endpoint, file_path), range(requests_count)))
+                    elapsed = time.perf_counter() - started_at
+                    results.append({
+                        'endpoint': endpoint,
+                        'file': os.path.basename(file_path),
+                        'latency_seconds': percentiles([latency for latency, _ in responses]),
+                        'requests_per_second': round(requests_count / elapsed, 2),
+                        'errors': sum(1 for _, status in responses if status != 200),
+                    })
+    finally:
+        files_server.shutdown()
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+    # gunicorn waits for its workers, the largest of them is reported for the children of this process
+    for result in results:
+        result['server_peak_rss_mb'] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+    return results
+
+
+def _run_subprocess(*args: str) -> dict:
+    output = subprocess.check_output([sys.executable, '-m', 'benchmarks.suite', *args], cwd=ROOT)
+    return json.loads(output)
+
+
+def _metadata() -> dict:
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                             cwd=ROOT, text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def _case_key(result: dict) -> tuple:
+    return result['kind'], result.get('server'), result.get('endpoint'), result['size'], result['format']
+
+
+def compare(results: list[dict], baseline: dict):
+    """Print the change of the median latency of every case also found in the baseline results."""
+    previous = {_case_key(result): result for result in baseline['results']}
+    print(f"compared with {baseline['meta'].get('commit')}:")
+    for result in results:
+        old = previous.get(_case_key(result))
+        if old is None:
+            continue
+        before, after = old['latency_seconds']['p50'], result['latency_seconds']['p50']
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"  {' '.join(str(part) for part in _case_key(result) if part):<40}"
+              f"p50 {before:.4f}s -> {after:.4f}s ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default='/tmp/extractor-corpus')
+    parser.add_argument('--sizes', nargs='+', default=['small'], choices=list(corpus.SIZES))
+    parser.add_argument('--formats', nargs='+', default=list(corpus.FORMATS), choices=list(corpus.FORMATS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--http', nargs='*', default=[], choices=list(SERVERS),
+                        help='also benchmark the endpoints of these servers')
+    parser.add_argument('--http-requests', type=int, default=20)
+    parser.add_argument('--http-concurrency', type=int, default=4)
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help='a previous results file to compare with')
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    parser.add_argument('--run-http', help=argparse.SUPPRESS)
+    parser.add_argument('--files', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.repeat)))
+        return
+    if args.run_http:
+        print(json.dumps(run_http(args.run_http, args.files, args.http_requests, args.http_concurrency)))
+        return
+
+    results = []
+    for size in args.sizes:
+        files = corpus.generate(args.corpus, size)
+        for file_format in args.formats:
+            result = {'kind': 'extractor', 'size': size, 'format': file_format,
+                      'bytes': os.path.getsize(files[file_format]),
+                      **_run_subprocess('--run-case', files[file_format], '--repeat', str(args.repeat))}
+            print(json.dumps(result))
+            results.append(result)
+
+        for server_name in args.http:
+            http_results = _run_subprocess(
+                '--run-http', server_name, '--files', *[files[file_format] for file_format in args.formats],
+                '--http-requests', str(args.http_requests), '--http-concurrency', str(args.http_concurrency))
+            for http_result in http_results:
+                result = {'kind': 'http', 'server': server_name, 'size': size,
+                          'format': http_result.pop('file').rsplit('.', 1)[-1], **http_result}
+                print(json.dumps(result))
+                results.append(result)
+
+    with open(args.output, 'w') as f:
+        json.dump({'meta': _metadata(), 'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import os
+
+
+def init_from_env():
+    """Initialize the storage, cache and job queue extensions from the environment variables."""
+    import core.extensions.ext_cache as cache
+    import core.extensions.ext_celery as celery
+    import core.extensions.ext_metrics as metrics
+    import core.extensions.ext_storage as storage
+
+    if os.environ.get('STORAGE_TYPE', 'local') == 's3':
+        storage.init(storage.StorageConfig.s3(
+            bucket_name=os.environ.get('S3_BUCKET_NAME'),
+            access_key=os.environ.get('S3_ACCESS_KEY'),
+            secret_key=os.environ.get('S3_SECRET_KEY'),
+            endpoint=os.environ.get('S3_ENDPOINT'),
+            region=os.environ.get('S3_REGION'),
+            max_connections=int(os.environ.get('S3_MAX_CONNECTIONS', storage.S3_MAX_CONNECTIONS)),
+            multipart_threshold=int(os.environ.get('S3_MULTIPART_THRESHOLD', storage.S3_MULTIPART_THRESHOLD)),
+            multipart_chunksize=int(os.environ.get('S3_MULTIPART_CHUNKSIZE', storage.S3_MULTIPART_CHUNKSIZE)),
+            max_concurrency=int(os.environ.get('S3_MAX_CONCURRENCY', storage.S3_MAX_CONCURRENCY)),
+        ))
+    else:
+        storage.init(storage.StorageConfig.local(os.environ.get('STORAGE_LOCAL_PATH', '/tmp')))
+    if os.environ.get('EXTRACT_CACHE_ENABLED', 'true').lower() == 'true':
+        cache.init(cache.CacheConfig.create(
+            ttl=int(os.environ.get('EXTRACT_CACHE_TTL', 24 * 3600)),
+            max_memory_bytes=int(os.environ.get('EXTRACT_CACHE_MEMORY_BYTES', 64 * 1024 * 1024)),
+            max_entry_bytes=int(os.environ.get('EXTRACT_CACHE_ENTRY_BYTES', 16 * 1024 * 1024)),
+            max_storage_bytes=int(os.environ.get('EXTRACT_CACHE_STORAGE_BYTES', 1024 * 1024 * 1024)),
+            sweep_interval=int(os.environ.get('EXTRACT_CACHE_SWEEP_INTERVAL', 600)),
+        ))
+
+    if os.environ.get('METRICS_ENABLED', 'false').lower() == 'true':
+        metrics.init(metrics.MetricsConfig.create())
+
+    celery_broker_url = os.environ.get('CELERY_BROKER_URL', 'memory://')
+    if celery_broker_url == 'memory://':
+        celery.init(celery.CeleryConfig.memory())
+    elif celery_broker_url.startswith('filesystem://'):
+        celery.init(celery.CeleryConfig.filesystem(celery_broker_url[len('filesystem://'):] or '/tmp/celery'))
+    else:
+        celery.init(celery.CeleryConfig.broker(celery_broker_url))
@@ -0,0 +1,213 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from core.extensions.ext_storage import storage
+
+logger = logging.getLogger(__name__)
+
+
+class CacheConfig:
+    """
+    The CacheConfig class is used to configure the extraction result cache.
+    Cached entries are persisted through the storage extension, with an in-process LRU layer on top.
+    """
+
+    def __init__(self):
+        """
+        Initializes a new instance of the CacheConfig class.
+        """
+        self.enabled = False
+        self.prefix = 'extract_cache/'
+        self.ttl = 24 * 3600
+        self.max_memory_bytes = 64 * 1024 * 1024
+        self.max_entry_bytes = 16 * 1024 * 1024
+        self.max_storage_bytes = 1024 * 1024 * 1024
+        self.sweep_interval = 600
+
+    @classmethod
+    def create(cls, prefix: str = 'extract_cache/', ttl: int = 24 * 3600,
+               max_memory_bytes: int = 64 * 1024 * 1024, max_entry_bytes: int = 16 * 1024 * 1024,
+               max_storage_bytes: int = 1024 * 1024 * 1024, sweep_interval: int = 600):
+        """
+        Configures an enabled cache.
+
+        Args:
+            prefix (str): The storage key prefix under which cache entries are saved.
+            ttl (int): The number of seconds an entry stays valid, 0 means never expire.
+            max_memory_bytes (int): The total size of the in-process LRU layer, 0 disables it.
+            max_entry_bytes (int): Entries larger than this are not cached at all.
+            max_storage_bytes (int): The total size of the entries kept in storage, the oldest ones are
+                removed beyond it, 0 means no limit.
+            sweep_interval (int): The minimum number of seconds between two sweeps of the stored entries,
+                0 disables them.
+
+        Returns:
+            CacheConfig: A configured instance of the CacheConfig class.
+        """
+        conf = CacheConfig()
+        conf.enabled = True
+        conf.prefix = prefix
+        conf.ttl = ttl
+        conf.max_memory_bytes = max_memory_bytes
+        conf.max_entry_bytes = max_entry_bytes
+        conf.max_storage_bytes = max_storage_bytes
+        conf.sweep_interval = sweep_interval
+
+        return conf
+
+
+class Cache:
+    """
+    A two level bytes cache: an in-process LRU evicted by total size, backed by the storage
+    extension so that entries survive restarts and are shared between workers.
+
+    Every entry persisted to storage is prefixed with a header line holding its expiry timestamp,
+    expired entries are removed when they are read. Writes also start a `sweep` of the stored entries
+    in the background, at most once per `sweep_interval`, so that entries never read again expire too
+    and the storage stays within `max_storage_bytes`.
+    """
+
+    def __init__(self):
+        self.enabled: bool = False
+        self.prefix: str = ''
+        self.ttl: int = 0
+        self.max_memory_bytes: int = 0
+        self.max_entry_bytes: int = 0
+        self.max_storage_bytes: int = 0
+        self.sweep_interval: int = 0
+        self._last_sweep: float = 0
+        self._sweeping: bool = False
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._memory_bytes: int = 0
+        self._lock = threading.Lock()
+
+    def init(self, conf: CacheConfig):
+        self.enabled = conf.enabled
+        self.prefix = conf.prefix
+        self.ttl = conf.ttl
+        self.max_memory_bytes = conf.max_memory_bytes
+        self.max_entry_bytes = conf.max_entry_bytes
+        self.max_storage_bytes = conf.max_storage_bytes
+        self.sweep_interval = conf.sweep_interval
+        self._last_sweep = 0
+        self.clear_memory()
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, data = entry
+                if not expires_at or expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    return data
+                self._evict(key)
+
+        try:
+            raw = storage.load_once(self.prefix + key)
+        except FileNotFoundError:
+            return None
+
+        header, _, data = raw.partition(b'\n')
+        expires_at = float(header or 0)
+        if expires_at and expires_at <= time.time():
+            storage.delete(self.prefix + key)
+            return None
+
+        self._remember(key, expires_at, data)
+        return data
+
+    def set(self, key: str, data: bytes):
+        if not self.enabled or len(data) > self.max_entry_bytes:
+            return
+
+        expires_at = time.time() + self.ttl if self.ttl else 0
+        storage.save(self.prefix + key, str(expires_at).encode('utf-8') + b'\n' + data)
+        self._remember(key, expires_at, data)
+        self._schedule_sweep()
+
+    def sweep(self) -> int:
+        """
+        Remove the stored entries that expired, then the oldest ones until the others fit into
+        `max_storage_bytes`.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        now = time.time()
+        kept, removed = [], 0
+        for entry in storage.scan(self.prefix):
+            if self.ttl and entry.modified + self.ttl <= now:
+                self._delete(entry.filename)
+                removed += 1
+            else:
+                kept.append(entry)
+
+        if self.max_storage_bytes:
+            total = sum(entry.size for entry in kept)
+            for entry in sorted(kept, key=lambda entry: entry.modified):
+                if total <= self.max_storage_bytes:
+                    break
+                self._delete(entry.filename)
+                total -= entry.size
+                removed += 1
+        return removed
+
+    def clear_memory(self):
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+
+    def _remember(self, key: str, expires_at: float, data: bytes):
+        if len(data) > self.max_memory_bytes:
+            return
+
+        with self._lock:
+            self._evict(key)
+            self._entries[key] = (expires_at, data)
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def _delete(self, filename: str):
+        with self._lock:
+            self._evict(filename[len(self.prefix):])
+        storage.delete(filename)
+
+    def _schedule_sweep(self):
+        if not self.sweep_interval:
+            return
+
+        with self._lock:
+            if self._sweeping or time.time() - self._last_sweep < self.sweep_interval:
+                return
+            self._sweeping = True
+            self._last_sweep = time.time()
+        threading.Thread(target=self._sweep_in_background, name='cache-sweep', daemon=True).start()
+
+    def _sweep_in_background(self):
+        try:
+            removed = self.sweep()
+            if removed:
+                logger.info('removed %d cache entries from storage', removed)
+        except Exception:
+            logger.warning('failed to sweep the cache entries', exc_info=True)
+        finally:
+            self._sweeping = False
+
+    def _evict(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[1])
+
+
+cache = Cache()
+
+
+def init(conf: CacheConfig):
+    cache.init(conf)
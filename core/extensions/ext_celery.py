@@ -0,0 +1,92 @@
+import os
+
+from celery import Celery
+
+
+class CeleryConfig:
+    """
+    The CeleryConfig class is used to configure the asynchronous job queue.
+    It can be configured to use a real broker, a local filesystem broker or to run jobs in process.
+    """
+
+    def __init__(self):
+        """
+        Initializes a new instance of the CeleryConfig class.
+        """
+        self.broker_url = None
+        self.broker_transport_options = {}
+        self.task_always_eager = False
+
+    @classmethod
+    def broker(cls, broker_url: str):
+        """
+        Configures the job queue to use a broker such as redis or rabbitmq.
+
+        Args:
+            broker_url (str): The url of the broker, e.g. redis://localhost:6379/0.
+
+        Returns:
+            CeleryConfig: A configured instance of the CeleryConfig class.
+        """
+        conf = CeleryConfig()
+        conf.broker_url = broker_url
+
+        return conf
+
+    @classmethod
+    def filesystem(cls, folder: str):
+        """
+        Configures the job queue to exchange messages through a local folder, useful for single host
+        deployments and offline testing, workers still run in their own processes.
+
+        Args:
+            folder (str): The folder used to exchange messages between the web server and the workers.
+
+        Returns:
+            CeleryConfig: A configured instance of the CeleryConfig class.
+        """
+        conf = CeleryConfig()
+        conf.broker_url = 'filesystem://'
+        queue_folder = os.path.join(folder, 'queue')
+        processed_folder = os.path.join(folder, 'processed')
+        control_folder = os.path.join(folder, 'control')
+        for path in (queue_folder, processed_folder, control_folder):
+            os.makedirs(path, exist_ok=True)
+        conf.broker_transport_options = {
+            'data_folder_in': queue_folder,
+            'data_folder_out': queue_folder,
+            'processed_folder': processed_folder,
+            'control_folder': control_folder,
+        }
+
+        return conf
+
+    @classmethod
+    def memory(cls):
+        """
+        Configures the job queue to run every job in process right after it is submitted, no worker is needed.
+
+        Returns:
+            CeleryConfig: A configured instance of the CeleryConfig class.
+        """
+        conf = CeleryConfig()
+        conf.broker_url = 'memory://'
+        conf.task_always_eager = True
+
+        return conf
+
+
+celery_app = Celery('extractor')
+
+
+def init(conf: CeleryConfig):
+    celery_app.conf.update(
+        broker_url=conf.broker_url,
+        broker_transport_options=conf.broker_transport_options,
+        task_always_eager=conf.task_always_eager,
+        broker_connection_retry_on_startup=True,
+        # job states and results are kept in the storage, not in a celery result backend
+        task_ignore_result=True,
+        task_acks_late=True,
+        worker_prefetch_multiplier=1,
+    )
@@ -0,0 +1,182 @@
+import contextlib
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from typing import ContextManager, Optional
+
+# metric objects can only be registered once per process, they are shared by every init
+_collectors: Optional[dict] = None
+_collectors_lock = threading.Lock()
+
+_disabled_stage = contextlib.nullcontext()
+
+# latency buckets in seconds, from small text files to large documents
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class MetricsConfig:
+    """
+    The MetricsConfig class is used to configure the Prometheus metrics of the extractions.
+
+    With several worker processes (gunicorn workers, extraction pools) the PROMETHEUS_MULTIPROC_DIR
+    environment variable has to point to an empty folder shared by all of them, see the
+    prometheus_client documentation on multiprocess mode.
+    """
+
+    def __init__(self):
+        """
+        Initializes a new instance of the MetricsConfig class.
+        """
+        self.enabled = False
+        self.buckets = DEFAULT_BUCKETS
+
+    @classmethod
+    def create(cls, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Configures enabled metrics.
+
+        Args:
+            buckets (tuple[float, ...]): The buckets of the latency histograms, in seconds.
+
+        Returns:
+            MetricsConfig: A configured instance of the MetricsConfig class.
+        """
+        conf = MetricsConfig()
+        conf.enabled = True
+        conf.buckets = buckets
+
+        return conf
+
+
+class Metrics:
+    """
+    Records extraction metrics with prometheus_client.
+
+    While disabled every method returns immediately, callers do not have to check `enabled` themselves
+    and prometheus_client does not even have to be installed.
+    """
+
+    def __init__(self):
+        self.enabled: bool = False
+        self._collectors: dict = {}
+        self._stages: dict = {}
+
+    def init(self, conf: MetricsConfig):
+        self.enabled = conf.enabled
+        if self.enabled:
+            self._collectors = _create_collectors(conf.buckets)
+            self._stages = {}
+
+    def stage(self, name: str) -> ContextManager:
+        """
+        Time a stage of the extraction, e.g. `storage_download` or `encoding_detection`.
+
+        Returns:
+            A context manager observing its duration in the `extract_stage_duration_seconds` histogram.
+        """
+        if not self.enabled:
+            return _disabled_stage
+
+        timer = self._stages.get(name)
+        if timer is None:
+            timer = self._stages[name] = self._collectors['stage_duration'].labels(name)
+        return timer.time()
+
+    def cache_lookup(self, hit: bool):
+        if self.enabled:
+            self._collectors['cache_requests'].labels('hit' if hit else 'miss').inc()
+
+    def track(self, extractor_name: str, blob, documents: Iterable) -> Iterable:
+        """
+        Wrap the documents produced by an extractor to record its metrics once they are consumed.
+
+        Only the time spent producing the documents is measured, not the time the consumer spends
+        between two of them, so that streamed responses report the extractor latency alone.
+        """
+        if not self.enabled:
+            return documents
+        return self._track(extractor_name, blob, documents)
+
+    def render(self) -> tuple[bytes, str]:
+        """Return the exposition of all the metrics and its content type."""
+        from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            from prometheus_client import multiprocess
+
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    def _track(self, extractor_name: str, blob, documents: Iterable) -> Iterator:
+        collectors = self._collectors
+        try:
+            if blob.data is not None:
+                bytes_in = len(blob.data)
+            else:
+                bytes_in = blob.size if blob.size is not None else os.path.getsize(blob.path)
+        except OSError:
+            bytes_in = 0
+        collectors['in_flight'].labels(extractor_name).inc()
+        elapsed, bytes_out, pages, rows, sections = 0.0, 0, 0, 0, 0
+        try:
+            iterator = iter(documents)
+            while True:
+                started_at = time.perf_counter()
+                try:
+                    document = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - started_at
+
+                bytes_out += len(document.content)
+                meta = document.meta
+                if 'page' in meta:
+                    pages += 1
+                elif 'row' in meta:
+                    rows += meta.get('row_end', meta['row']) - meta['row'] + 1
+                else:
+                    sections += 1
+                yield document
+        finally:
+            collectors['in_flight'].labels(extractor_name).dec()
+            collectors['duration'].labels(extractor_name).observe(elapsed)
+            collectors['bytes_in'].labels(extractor_name).inc(bytes_in)
+            collectors['bytes_out'].labels(extractor_name).inc(bytes_out)
+            for unit, count in (('page', pages), ('row', rows), ('section', sections)):
+                if count:
+                    collectors['items'].labels(extractor_name, unit).inc(count)
+
+
+def _create_collectors(buckets: tuple[float, ...]) -> dict:
+    global _collectors
+    from prometheus_client import Counter, Gauge, Histogram
+
+    with _collectors_lock:
+        if _collectors is None:
+            _collectors = {
+                'duration': Histogram(
+                    'extract_duration_seconds', 'Time spent by an extractor producing the documents of a file',
+                    ['extractor'], buckets=buckets),
+                'stage_duration': Histogram(
+                    'extract_stage_duration_seconds', 'Time spent in a stage of the extraction pipeline',
+                    ['stage'], buckets=buckets),
+                'bytes_in': Counter('extract_input_bytes', 'Size of the files extracted', ['extractor']),
+                'bytes_out': Counter('extract_output_bytes', 'Size of the extracted text', ['extractor']),
+                'items': Counter('extract_items', 'Pages, rows and sections extracted', ['extractor', 'unit']),
+                'cache_requests': Counter('extract_cache_requests', 'Result cache lookups', ['result']),
+                'in_flight': Gauge('extract_in_flight', 'Extractions in progress', ['extractor'],
+                                   multiprocess_mode='livesum'),
+            }
+        return _collectors
+
+
+metrics = Metrics()
+
+
+def init(conf: MetricsConfig):
+    metrics.init(conf)
@@ -1,12 +1,37 @@
 import os
 import shutil
-from collections.abc import Generator
-from contextlib import closing
-from typing import Union
+from collections.abc import Generator, Iterator
+from io import BytesIO
+from typing import NamedTuple, Optional, Union
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+# defaults of the s3 connection pool and of the managed transfers
+S3_MAX_CONNECTIONS = 32
+S3_MULTIPART_THRESHOLD = 16 * 1024 * 1024
+S3_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+S3_MAX_CONCURRENCY = 8
+
+NOT_FOUND_ERROR_CODES = ('404', 'NoSuchKey', 'NotFound')
+
+
+class StorageObject(NamedTuple):
+    """Size and version of a stored file, the version changes whenever the content does."""
+
+    size: int
+    version: str
+
+
+class StorageEntry(NamedTuple):
+    """A stored file listed by `Storage.scan`."""
+
+    filename: str
+    size: int
+    modified: float  # unix timestamp of the last write
+
 
 class StorageConfig:
     """
@@ -25,6 +50,10 @@ class StorageConfig:
         self.s3_secret_key = None
         self.s3_endpoint = None
         self.s3_region = None
+        self.s3_max_connections = S3_MAX_CONNECTIONS
+        self.s3_multipart_threshold = S3_MULTIPART_THRESHOLD
+        self.s3_multipart_chunksize = S3_MULTIPART_CHUNKSIZE
+        self.s3_max_concurrency = S3_MAX_CONCURRENCY
 
     @classmethod
     def local(cls, local_path: str):
@@ -44,7 +73,9 @@ class StorageConfig:
         return conf
 
     @classmethod
-    def s3(cls, bucket_name: str, access_key: str, secret_key: str, endpoint: str, region: str):
+    def s3(cls, bucket_name: str, access_key: str, secret_key: str, endpoint: str, region: str,
+           max_connections: int = S3_MAX_CONNECTIONS, multipart_threshold: int = S3_MULTIPART_THRESHOLD,
+           multipart_chunksize: int = S3_MULTIPART_CHUNKSIZE, max_concurrency: int = S3_MAX_CONCURRENCY):
         """
         Configures the storage system to use Amazon S3.
 
@@ -54,6 +85,11 @@ class StorageConfig:
             secret_key (str): The secret key for the S3 service.
             endpoint (str): The endpoint for the S3 service.
             region (str): The region for the S3 service.
+            max_connections (int): The size of the connection pool shared by all threads.
+            multipart_threshold (int): Files from this size on are uploaded in parts and downloaded with
+                parallel ranged requests.
+            multipart_chunksize (int): The size of the parts and of the ranges.
+            max_concurrency (int): The number of parts or ranges transferred at once for a single file.
 
         Returns:
             StorageConfig: A configured instance of the StorageConfig class.
@@ -65,34 +101,68 @@ class StorageConfig:
         conf.s3_secret_key = secret_key
         conf.s3_endpoint = endpoint
         conf.s3_region = region
+        conf.s3_max_connections = max_connections
+        conf.s3_multipart_threshold = multipart_threshold
+        conf.s3_multipart_chunksize = multipart_chunksize
+        conf.s3_max_concurrency = max_concurrency
 
         return conf
 
 
 class Storage:
+    """
+    Saves and loads files on the local file system or on S3.
+
+    The S3 client is created once and shared by all threads, boto3 clients are thread safe and keep a
+    pool of up to `max_connections` connections alive between calls. Large files are transferred with
+    the managed transfers of boto3, uploaded in parts and downloaded with parallel ranged requests.
+    """
+
     def __init__(self):
         self.storage_type: str = ''
         self.bucket_name: str = ''
         self.client = None
+        self.transfer_config: TransferConfig = None
+        self.multipart_threshold: int = S3_MULTIPART_THRESHOLD
         self.folder: str = ''
+        self._conf: StorageConfig = None
+        os.register_at_fork(after_in_child=self._after_fork)
 
     def init(self, conf: StorageConfig):
+        self._conf = conf
         self.storage_type = conf.storage_type
         if self.storage_type == 's3':
             self.bucket_name = conf.s3_bucket_name
-            self.client = boto3.client(
+            # a session of its own, the default session of boto3 is not thread safe
+            self.client = boto3.session.Session().client(
                 's3',
                 aws_secret_access_key=conf.s3_secret_key,
                 aws_access_key_id=conf.s3_access_key,
                 endpoint_url=conf.s3_endpoint,
-                region_name=conf.s3_region
+                region_name=conf.s3_region,
+                config=Config(max_pool_connections=conf.s3_max_connections, retries={'mode': 'standard'}),
+            )
+            self.multipart_threshold = conf.s3_multipart_threshold
+            # transfer threads share the connection pool, more of them would only wait for a connection
+            self.transfer_config = TransferConfig(
+                multipart_threshold=conf.s3_multipart_threshold,
+                multipart_chunksize=conf.s3_multipart_chunksize,
+                max_concurrency=min(conf.s3_max_concurrency, conf.s3_max_connections),
             )
         else:
             self.folder = conf.local_path
 
+    def _after_fork(self):
+        # pooled connections must not be shared with the parent, forked workers create their own client
+        if self.storage_type == 's3':
+            self.init(self._conf)
+
     def save(self, filename, data):
         if self.storage_type == 's3':
-            self.client.put_object(Bucket=self.bucket_name, Key=filename, Body=data)
+            if len(data) >= self.multipart_threshold:
+                self.client.upload_fileobj(BytesIO(data), self.bucket_name, filename, Config=self.transfer_config)
+            else:
+                self.client.put_object(Bucket=self.bucket_name, Key=filename, Body=data)
         else:
             if not self.folder or self.folder.endswith('/'):
                 filename = self.folder + filename
@@ -114,10 +184,9 @@ class Storage:
     def load_once(self, filename: str) -> bytes:
         if self.storage_type == 's3':
             try:
-                with closing(self.client) as client:
-                    data = client.get_object(Bucket=self.bucket_name, Key=filename)['Body'].read()
+                data = self.client.get_object(Bucket=self.bucket_name, Key=filename)['Body'].read()
             except ClientError as ex:
-                if ex.response['Error']['Code'] == 'NoSuchKey':
+                if _is_not_found(ex):
                     raise FileNotFoundError("File not found")
                 else:
                     raise
@@ -139,12 +208,15 @@ class Storage:
         def generate(filename: str = filename) -> Generator:
             if self.storage_type == 's3':
                 try:
-                    with closing(self.client) as client:
-                        response = client.get_object(Bucket=self.bucket_name, Key=filename)
-                        for chunk in response['Body'].iter_chunks():
+                    body = self.client.get_object(Bucket=self.bucket_name, Key=filename)['Body']
+                    try:
+                        for chunk in body.iter_chunks():
                             yield chunk
+                    finally:
+                        # a body left unread would keep its connection out of the pool
+                        body.close()
                 except ClientError as ex:
-                    if ex.response['Error']['Code'] == 'NoSuchKey':
+                    if _is_not_found(ex):
                         raise FileNotFoundError("File not found")
                     else:
                         raise
@@ -165,8 +237,13 @@ class Storage:
 
     def download(self, filename, target_filepath):
         if self.storage_type == 's3':
-            with closing(self.client) as client:
-                client.download_file(self.bucket_name, filename, target_filepath)
+            try:
+                self.client.download_file(self.bucket_name, filename, target_filepath, Config=self.transfer_config)
+            except ClientError as ex:
+                if _is_not_found(ex):
+                    raise FileNotFoundError("File not found")
+                else:
+                    raise
         else:
             if not self.folder or self.folder.endswith('/'):
                 filename = self.folder + filename
@@ -178,14 +255,57 @@ class Storage:
 
             shutil.copyfile(filename, target_filepath)
 
+    def info(self, filename: str) -> StorageObject:
+        if self.storage_type == 's3':
+            try:
+                response = self.client.head_object(Bucket=self.bucket_name, Key=filename)
+            except ClientError as ex:
+                if _is_not_found(ex):
+                    raise FileNotFoundError("File not found")
+                raise
+            return StorageObject(response['ContentLength'], response.get('ETag', '').strip('"'))
+        else:
+            stat = os.stat(self.local_path(filename))
+            return StorageObject(stat.st_size, f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+    def local_path(self, filename: str) -> Optional[str]:
+        """Return the path of a file of the local storage, None for remote storages."""
+        if self.storage_type == 's3':
+            return None
+        if not self.folder or self.folder.endswith('/'):
+            return self.folder + filename
+        return self.folder + '/' + filename
+
+    def scan(self, prefix: str) -> Iterator[StorageEntry]:
+        """List the stored files whose name starts with the prefix, in no particular order."""
+        if self.storage_type == 's3':
+            paginator = self.client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                for item in page.get('Contents', []):
+                    yield StorageEntry(item['Key'], item['Size'], item['LastModified'].timestamp())
+        else:
+            root = self.local_path('')
+            for folder, _, names in os.walk(os.path.dirname(self.local_path(prefix)) or '.'):
+                for name in names:
+                    path = os.path.join(folder, name)
+                    filename = os.path.relpath(path, root or '.')
+                    if not filename.startswith(prefix):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield StorageEntry(filename, stat.st_size, stat.st_mtime)
+
     def exists(self, filename):
         if self.storage_type == 's3':
-            with closing(self.client) as client:
-                try:
-                    client.head_object(Bucket=self.bucket_name, Key=filename)
-                    return True
-                except:
+            try:
+                self.client.head_object(Bucket=self.bucket_name, Key=filename)
+                return True
+            except ClientError as ex:
+                if _is_not_found(ex):
                     return False
+                raise
         else:
             if not self.folder or self.folder.endswith('/'):
                 filename = self.folder + filename
@@ -194,6 +314,22 @@ class Storage:
 
             return os.path.exists(filename)
 
+    def delete(self, filename):
+        if self.storage_type == 's3':
+            self.client.delete_object(Bucket=self.bucket_name, Key=filename)
+        else:
+            if not self.folder or self.folder.endswith('/'):
+                filename = self.folder + filename
+            else:
+                filename = self.folder + '/' + filename
+
+            if os.path.exists(filename):
+                os.remove(filename)
+
+
+def _is_not_found(ex: ClientError) -> bool:
+    return ex.response.get('Error', {}).get('Code') in NOT_FOUND_ERROR_CODES
+
 
 storage = Storage()
 
@@ -9,10 +9,10 @@ from __future__ import annotations
 import contextlib
 import mimetypes
 from abc import ABC, abstractmethod
-from collections.abc import Generator, Iterable, Mapping
-from io import BufferedReader, BytesIO
+from collections.abc import Generator, Iterable, Iterator, Mapping
+from io import DEFAULT_BUFFER_SIZE, BufferedReader, BytesIO, RawIOBase
 from pathlib import PurePath
-from typing import Any, Optional, Union
+from typing import Any, BinaryIO, Callable, Optional, Union
 
 from pydantic import BaseModel, root_validator
 
@@ -37,6 +37,10 @@ class Blob(BaseModel):
     # Useful for situations where downstream code assumes it must work with file paths
     # rather than in-memory content.
     path: Optional[PathLike] = None
+    # Opens a fresh, possibly not seekable, byte stream of content that is neither in memory nor in a
+    # local file, e.g. an object of the storage; the path then only names the source.
+    opener: Optional[Callable[[], BinaryIO]] = None
+    size: Optional[int] = None  # Size of the content behind the opener, when known
 
     class Config:
         arbitrary_types_allowed = True
@@ -49,14 +53,16 @@ class Blob(BaseModel):
 
     @root_validator(pre=True)
     def check_blob_is_valid(cls, values: Mapping[str, Any]) -> Mapping[str, Any]:
-        """Verify that either data or path is provided."""
-        if "data" not in values and "path" not in values:
-            raise ValueError("Either data or path must be provided")
+        """Verify that either data, path or opener is provided."""
+        if "data" not in values and "path" not in values and "opener" not in values:
+            raise ValueError("Either data, path or opener must be provided")
         return values
 
     def as_string(self) -> str:
         """Read data as a string."""
-        if self.data is None and self.path:
+        if self.opener is not None:
+            return self.as_bytes().decode(self.encoding)
+        elif self.data is None and self.path:
             with open(str(self.path), encoding=self.encoding) as f:
                 return f.read()
         elif isinstance(self.data, bytes):
@@ -68,7 +74,10 @@ class Blob(BaseModel):
 
     def as_bytes(self) -> bytes:
         """Read data as bytes."""
-        if isinstance(self.data, bytes):
+        if self.opener is not None:
+            with self.opener() as f:
+                return f.read()
+        elif isinstance(self.data, bytes):
             return self.data
         elif isinstance(self.data, str):
             return self.data.encode(self.encoding)
@@ -80,8 +89,11 @@ class Blob(BaseModel):
 
     @contextlib.contextmanager
     def as_bytes_io(self) -> Generator[Union[BytesIO, BufferedReader], None, None]:
-        """Read data as a byte stream."""
-        if isinstance(self.data, bytes):
+        """Read data as a byte stream, only seekable when the blob has no opener."""
+        if self.opener is not None:
+            with self.opener() as f:
+                yield f
+        elif isinstance(self.data, bytes):
             yield BytesIO(self.data)
         elif self.data is None and self.path:
             with open(str(self.path), "rb") as f:
@@ -140,6 +152,31 @@ class Blob(BaseModel):
         """
         return cls(data=data, mimetype=mime_type, encoding=encoding, path=path)
 
+    @classmethod
+    def from_chunks(
+        cls,
+        chunks: Callable[[], Iterator[bytes]],
+        *,
+        encoding: str = "utf-8",
+        mime_type: Optional[str] = None,
+        path: Optional[str] = None,
+        size: Optional[int] = None,
+    ) -> Blob:
+        """Initialize the blob from a source of byte chunks, such as `Storage.load_stream`.
+
+        Args:
+            chunks: called every time the blob is read, returns an iterator over the content
+            encoding: Encoding to use if decoding the bytes into a string
+            mime_type: if provided, will be set as the mime-type of the data
+            path: if provided, will be set as the source from which the data came
+            size: if provided, the size of the content
+
+        Returns:
+            Blob instance
+        """
+        return cls(data=None, mimetype=mime_type, encoding=encoding, path=path, size=size,
+                   opener=lambda: BufferedReader(ChunkReader(chunks()), buffer_size=DEFAULT_BUFFER_SIZE * 8))
+
     def __repr__(self) -> str:
         """Define the blob representation."""
         str_repr = f"Blob {id(self)}"
@@ -148,6 +185,34 @@ class Blob(BaseModel):
         return str_repr
 
 
+class ChunkReader(RawIOBase):
+    """A read-only, not seekable, raw stream over an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._pending = memoryview(b'')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed and hasattr(self._chunks, 'close'):
+            # releases the connection of a chunk generator stopped before its end
+            self._chunks.close()
+        super().close()
+
+
 class BlobLoader(ABC):
     """Abstract interface for blob loaders implementation.
 
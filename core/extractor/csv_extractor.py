@@ -1,18 +1,32 @@
 """Abstract interface for document loader implementations."""
 import csv
+import io
+import os
+from collections.abc import Iterator
 from typing import Optional
 
+from core.extractor.blod.blod import Blob
 from core.extractor.extractor_base import BaseExtractor
+from core.extractor.helpers import candidate_encodings
 from core.models.document import Document
 
+CSV_ROWS_PER_DOCUMENT = int(os.environ.get('CSV_ROWS_PER_DOCUMENT', 1))
+
+
 class CSVExtractor(BaseExtractor):
     """Load CSV files.
 
 
     Args:
         file_path: Path to the file to load.
+        rows_per_document: Number of rows grouped into a single document, the meta of grouped
+            documents holds the index of their first `row` and their last `row_end`.
+        blob: In-memory content of the file, when given the file path is only used as the source.
     """
 
+    supports_blob = True
+    supports_stream = True
+
     def __init__(
             self,
             file_path: str,
@@ -20,6 +34,8 @@ class CSVExtractor(BaseExtractor):
             autodetect_encoding: bool = False,
             source_column: Optional[str] = None,
             csv_args: Optional[dict] = None,
+            rows_per_document: int = CSV_ROWS_PER_DOCUMENT,
+            blob: Optional[Blob] = None,
     ):
         """Initialize with file path."""
         self._file_path = file_path
@@ -27,44 +43,75 @@ class CSVExtractor(BaseExtractor):
         self._autodetect_encoding = autodetect_encoding
         self.source_column = source_column
         self.csv_args = csv_args or {}
+        self._rows_per_document = max(1, rows_per_document)
+        self._blob = blob if blob is not None else Blob.from_path(file_path)
+
+    @property
+    def cache_tag(self) -> str:
+        return f'rows-{self._rows_per_document}' if self._rows_per_document > 1 else ''
 
     def extract(self) -> list[Document]:
         """Load data into document objects."""
+        return list(self.load())
+
+    def load(self) -> Iterator[Document]:
+        """Lazily load documents, reading the file row by row."""
+        rows = []
+        for i, row in self._iter_rows():
+            rows.append((i, row))
+            if len(rows) >= self._rows_per_document:
+                yield self._to_document(rows)
+                rows = []
+        if rows:
+            yield self._to_document(rows)
+
+    def _iter_rows(self) -> Iterator[tuple[int, dict]]:
+        position = 0
         try:
-            with open(self._file_path, newline="", encoding=self._encoding) as csvfile:
-                docs = self._read_from_file(csvfile)
+            with self._blob.as_bytes_io() as f:
+                csv_reader = csv.DictReader(io.TextIOWrapper(f, newline="", encoding=self._encoding), **self.csv_args)
+                for row in csv_reader:
+                    yield position, row
+                    position += 1
+            return
         except UnicodeDecodeError as e:
-            if self._autodetect_encoding:
-                detected_encodings = detect_filze_encodings(self._file_path)
-                for encoding in detected_encodings:
-                    try:
-                        with open(self._file_path, newline="", encoding=encoding.encoding) as csvfile:
-                            docs = self._read_from_file(csvfile)
-                        break
-                    except UnicodeDecodeError:
-                        continue
-            else:
+            if not self._autodetect_encoding:
                 raise RuntimeError(f"Error loading {self._file_path}") from e
 
-        return docs
-
-    def _read_from_file(self, csvfile) -> list[Document]:
-        docs = []
-        csv_reader = csv.DictReader(csvfile, **self.csv_args)  # type: ignore
-        for i, row in enumerate(csv_reader):
-            content = "\n".join(f"{k.strip()}: {v.strip()}" for k, v in row.items())
+        # rows decoded before the error have been yielded already, skip them after switching the encoding
+        for encoding in candidate_encodings(self._blob, {self._encoding}):
             try:
-                source = (
-                    row[self.source_column]
-                    if self.source_column is not None
-                    else ''
-                )
-            except KeyError:
-                raise ValueError(
-                    f"Source column '{self.source_column}' not found in CSV file."
-                )
-            meta = {"source": source, "row": i}
-            doc = Document(content=content, meta=meta)
-            docs.append(doc)
-
-        return docs
+                with self._blob.as_bytes_io() as f:
+                    csv_reader = csv.DictReader(io.TextIOWrapper(f, newline="", encoding=encoding),
+                                                **self.csv_args)
+                    for i, row in enumerate(csv_reader):
+                        if i >= position:
+                            yield i, row
+                            position = i + 1
+                self._encoding = encoding
+                return
+            except (UnicodeDecodeError, LookupError):
+                continue
+
+        raise RuntimeError(f"Error loading {self._file_path}")
+
+    def _to_document(self, rows: list[tuple[int, dict]]) -> Document:
+        contents = []
+        for _, row in rows:
+            contents.append("\n".join(f"{k.strip()}: {v.strip()}" for k, v in row.items()))
+
+        try:
+            source = (
+                rows[0][1][self.source_column]
+                if self.source_column is not None
+                else ''
+            )
+        except KeyError:
+            raise ValueError(
+                f"Source column '{self.source_column}' not found in CSV file."
+            )
+
+        meta = {"source": source, "row": rows[0][0]}
+        if self._rows_per_document > 1:
+            meta["row_end"] = rows[-1][0]
+        return Document(content="\n\n".join(contents), meta=meta)
@@ -0,0 +1,75 @@
+"""Delta extraction, comparing the documents of a new version of a file with those of its previous version."""
+import hashlib
+import json
+from collections import Counter
+from collections.abc import Iterable, Iterator
+
+from core.extensions.ext_storage import storage
+from core.models.document import Document
+from core.models.serialization import dumps, loads
+
+DELTA_PREFIX = 'delta/'
+
+CHANGE_NEW = 'new'
+CHANGE_CHANGED = 'changed'
+CHANGE_UNCHANGED = 'unchanged'
+
+# meta that does not tell where a document is in its file
+UNPOSITIONED_META = {'source', 'ocr', 'change', 'content_hash'}
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+
+
+def document_key(document: Document) -> str:
+    """Identify the position of a document in its file by its meta, e.g. its page, header path, row or chunk.
+
+    Documents without such meta, or sharing it like sections under the same headers, are told apart by
+    `mark_changes` with their ordinal.
+    """
+    return json.dumps({k: v for k, v in document.meta.items() if k not in UNPOSITIONED_META},
+                      sort_keys=True, default=str)
+
+
+def _state_path(document_id: str) -> str:
+    return DELTA_PREFIX + hashlib.sha256(document_id.encode('utf-8')).hexdigest() + '.json'
+
+
+def load_hashes(document_id: str) -> list[tuple[str, str]]:
+    """Load the position keys and content hashes of the documents of the last extraction of a document id."""
+    try:
+        return [(key, digest) for key, digest in loads(storage.load_once(_state_path(document_id)))['hashes']]
+    except FileNotFoundError:
+        return []
+
+
+def mark_changes(document_id: str, documents: Iterable[Document]) -> Iterator[Document]:
+    """Mark every document as new, changed or unchanged since the last extraction of the document id.
+
+    A document is unchanged when its content was already part of the last extraction, wherever it was, so that
+    sections moved by an edit are not reported again; every previous document matches a single new one. Otherwise
+    it is changed when a document was at the same position, and new when there was none. The `change` and
+    `content_hash` meta are added, and the hashes are stored for the next extraction once all documents have been
+    consumed.
+    """
+    previous = load_hashes(document_id)
+    previous_keys = {key for key, _ in previous}
+    previous_hashes = Counter(digest for _, digest in previous)
+    ordinals = Counter()
+    hashes = []
+    for document in documents:
+        position, digest = document_key(document), content_hash(document.content)
+        key = f'{position}#{ordinals[position]}'
+        ordinals[position] += 1
+        if previous_hashes[digest] > 0:
+            previous_hashes[digest] -= 1
+            change = CHANGE_UNCHANGED
+        elif key in previous_keys:
+            change = CHANGE_CHANGED
+        else:
+            change = CHANGE_NEW
+        hashes.append((key, digest))
+        yield Document(content=document.content, meta={**document.meta, 'content_hash': digest, 'change': change})
+
+    storage.save(_state_path(document_id), dumps({'document_id': document_id, 'hashes': hashes}))
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -10,6 +12,18 @@ class ExtractSetting(BaseModel):
     # valid values: Unstructured or others
     etlType: str = ''
 
+    # splitter chunking the extracted documents, see core.extractor.text_splitter, empty keeps them whole
+    splitter: str = ''
+    chunkSize: Optional[int] = None
+    chunkOverlap: Optional[int] = None
+
+    # pages of paged documents to extract, e.g. `1-10,15`, see core.extractor.pdf_extractor.parse_pages
+    pages: str = ''
+    maxPages: Optional[int] = None
+
+    # id under which the documents are compared to those of the previous version, see core.extractor.delta
+    documentId: str = ''
+
     class Config:
         arbitrary_types_allowed = True
 
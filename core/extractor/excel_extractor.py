@@ -1,11 +1,65 @@
 """Abstract interface for document loader implementations."""
+import os
+from collections import deque
+from collections.abc import Iterator
 from typing import Optional
 
 from openpyxl.reader.excel import load_workbook
 
+from core.extractor.blod.blod import Blob
 from core.extractor.extractor_base import BaseExtractor
+from core.extractor.helpers import get_process_pool
 from core.models.document import Document
 
+EXCEL_ROWS_PER_DOCUMENT = int(os.environ.get('EXCEL_ROWS_PER_DOCUMENT', 1))
+EXCEL_PARALLEL_WORKERS = int(os.environ.get('EXCEL_PARALLEL_WORKERS', 0))
+EXCEL_PARALLEL_MIN_SHEETS = int(os.environ.get('EXCEL_PARALLEL_MIN_SHEETS', 4))
+# workers return whole sheets, larger workbooks are extracted serially to bound the memory of their results
+EXCEL_PARALLEL_MAX_BYTES = int(os.environ.get('EXCEL_PARALLEL_MAX_BYTES', 16 * 1024 * 1024))
+
+
+def _iter_sheet(sheet, rows_per_document: int) -> Iterator[tuple[str, int, int]]:
+    """Lazily read a sheet, yielding the content of every batch of rows with its first and last row number.
+
+    The first non-empty row of the sheet is its header.
+    """
+    try:
+        dimension = sheet.calculate_dimension()
+    except ValueError:
+        # the workbook does not record the sheet size
+        dimension = None
+    if dimension in (None, 'A1:A1'):
+        sheet.reset_dimensions()
+
+    keys = None
+    items, first_row, last_row = [], 0, 0
+    for row_number, row in enumerate(sheet.iter_rows(values_only=True), start=sheet.min_row or 1):
+        if all(v is None for v in row):
+            continue
+        if keys is None:
+            keys = list(map(str, row))
+            continue
+
+        row_dict = {k: str(v) for k, v in zip(keys, row) if v is not None}
+        if not items:
+            first_row = row_number
+        last_row = row_number
+        items.append(''.join(f'{k}:{v};' for k, v in row_dict.items() if v))
+        if len(items) >= rows_per_document:
+            yield '\n'.join(items), first_row, last_row
+            items = []
+    if items:
+        yield '\n'.join(items), first_row, last_row
+
+
+def _extract_sheet(file_path: str, sheet_name: str, rows_per_document: int) -> list[tuple[str, int, int]]:
+    """Extract a whole sheet in a worker process with its own workbook handle, see EXCEL_PARALLEL_MAX_BYTES."""
+    wb = load_workbook(filename=file_path, read_only=True)
+    try:
+        return list(_iter_sheet(wb[sheet_name], rows_per_document))
+    finally:
+        wb.close()
+
 
 class ExcelExtractor(BaseExtractor):
     """Load Excel files.
@@ -13,38 +67,101 @@ class ExcelExtractor(BaseExtractor):
 
     Args:
         file_path: Path to the file to load.
+        rows_per_document: Number of rows grouped into a single document, the meta of grouped
+            documents holds the number of their first `row` and their last `row_end`.
+        parallel_workers: Number of worker processes used to extract sheets in parallel,
+            values below 2 disable parallel extraction.
+        parallel_min_sheets: Minimum sheet count of a workbook before switching to parallel extraction.
+        parallel_max_bytes: Size of the largest workbook file extracted in parallel.
+        blob: In-memory content of the file, when given the file path is only used as the source.
     """
 
+    supports_blob = True
+
     def __init__(
             self,
             file_path: str,
             encoding: Optional[str] = None,
-            autodetect_encoding: bool = False
+            autodetect_encoding: bool = False,
+            rows_per_document: int = EXCEL_ROWS_PER_DOCUMENT,
+            parallel_workers: int = EXCEL_PARALLEL_WORKERS,
+            parallel_min_sheets: int = EXCEL_PARALLEL_MIN_SHEETS,
+            parallel_max_bytes: int = EXCEL_PARALLEL_MAX_BYTES,
+            blob: Optional[Blob] = None
     ):
         """Initialize with file path."""
         self._file_path = file_path
         self._encoding = encoding
         self._autodetect_encoding = autodetect_encoding
+        self._rows_per_document = max(1, rows_per_document)
+        self._parallel_workers = parallel_workers
+        self._parallel_min_sheets = parallel_min_sheets
+        self._parallel_max_bytes = parallel_max_bytes
+        self._blob = blob if blob is not None else Blob.from_path(file_path)
+
+    @property
+    def cache_tag(self) -> str:
+        return f'rows-{self._rows_per_document}' if self._rows_per_document > 1 else ''
 
     def extract(self) -> list[Document]:
         """Load from file path."""
-        data = []
-        keys = []
-        wb = load_workbook(filename=self._file_path, read_only=True)
-        # loop over all sheets
-        for sheet in wb:
-            if 'A1:A1' == sheet.calculate_dimension():
-                sheet.reset_dimensions()
-            for row in sheet.iter_rows(values_only=True):
-                if all(v is None for v in row):
-                    continue
-                if keys == []:
-                    keys = list(map(str, row))
-                else:
-                    row_dict = dict(zip(keys, list(map(str, row))))
-                    row_dict = {k: v for k, v in row_dict.items() if v}
-                    item = ''.join(f'{k}:{v};' for k, v in row_dict.items())
-                    document = Document(content=item, meta={'source': self._file_path})
-                    data.append(document)
-
-        return data
+        return list(self.load())
+
+    def load(self) -> Iterator[Document]:
+        """Lazily load documents, sheet by sheet and row by row."""
+        with self._blob.as_bytes_io() as f:
+            wb = load_workbook(filename=f, read_only=True)
+            try:
+                if self._should_parallelize(len(wb.sheetnames)):
+                    sheet_names = wb.sheetnames
+                    wb.close()
+                    yield from self._load_parallel(sheet_names)
+                    return
+
+                # loop over all sheets
+                for sheet in wb:
+                    for content, first_row, last_row in _iter_sheet(sheet, self._rows_per_document):
+                        yield self._to_document(sheet.title, content, first_row, last_row)
+            finally:
+                wb.close()
+
+    def _should_parallelize(self, sheet_count: int) -> bool:
+        # workers open the file on their own, so in-memory blobs are always extracted serially
+        blob = self._blob
+        return (self._parallel_workers > 1 and sheet_count >= self._parallel_min_sheets
+                and blob.data is None and blob.opener is None and blob.path is not None
+                and os.path.getsize(blob.path) <= self._parallel_max_bytes)
+
+    def _load_parallel(self, sheet_names: list[str]) -> Iterator[Document]:
+        """Extract the sheets on the process pool and yield the documents back in sheet order.
+
+        A sheet is submitted whenever one is consumed, so that at most one sheet per worker is held at once.
+        """
+        executor = get_process_pool(self._parallel_workers)
+        remaining = iter(sheet_names)
+        in_flight = deque()
+        try:
+            for sheet_name in remaining:
+                in_flight.append((sheet_name, executor.submit(_extract_sheet, str(self._blob.path), sheet_name,
+                                                              self._rows_per_document)))
+                if len(in_flight) >= self._parallel_workers:
+                    break
+
+            while in_flight:
+                sheet_name, future = in_flight.popleft()
+                batches = future.result()
+                next_sheet_name = next(remaining, None)
+                if next_sheet_name is not None:
+                    in_flight.append((next_sheet_name, executor.submit(_extract_sheet, str(self._blob.path),
+                                                                       next_sheet_name, self._rows_per_document)))
+                for content, first_row, last_row in batches:
+                    yield self._to_document(sheet_name, content, first_row, last_row)
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+
+    def _to_document(self, sheet_name: str, content: str, first_row: int, last_row: int) -> Document:
+        meta = {'source': self._file_path, 'sheet': sheet_name, 'row': first_row}
+        if self._rows_per_document > 1:
+            meta['row_end'] = last_row
+        return Document(content=content, meta=meta)
@@ -1,31 +1,49 @@
+import hashlib
+import json
 import os
+import shutil
 import tempfile
+import threading
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
-import requests
-
-from core.extractor.csv_extractor import CSVExtractor
+from core.extractor.blod.blod import Blob
+from core.extractor.delta import mark_changes
 from core.extractor.entity.extract_setting import ExtractSetting
-from core.extractor.excel_extractor import ExcelExtractor
-from core.extractor.html_extractor import HtmlExtractor
-from core.extractor.markdown_extractor import MarkdownExtractor
-from core.extractor.pdf_extractor import PdfExtractor
-from core.extractor.text_extractor import TextExtractor
-from core.extractor.unstructured.unstructured_doc_extractor import UnstructuredWordExtractor
-from core.extractor.unstructured.unstructured_eml_extractor import UnstructuredEmailExtractor
-from core.extractor.unstructured.unstructured_markdown_extractor import UnstructuredMarkdownExtractor
-from core.extractor.unstructured.unstructured_msg_extractor import UnstructuredMsgExtractor
-from core.extractor.unstructured.unstructured_ppt_extractor import UnstructuredPPTExtractor
-from core.extractor.unstructured.unstructured_pptx_extractor import UnstructuredPPTXExtractor
-from core.extractor.unstructured.unstructured_text_extractor import UnstructuredTextExtractor
-from core.extractor.unstructured.unstructured_xml_extractor import UnstructuredXmlExtractor
-from core.extractor.word_extractor import WordExtractor
+from core.extractor.extractor_base import BaseExtractor
+from core.extractor.registry import registry
+from core.extractor.text_splitter import from_setting as splitter_from_setting
+from core.extractor.url_fetcher import FetchedFile, url_fetcher
 from core.models.document import Document
+from core.models.serialization import dump_document, dumps, loads
+from core.extensions.ext_cache import cache
+from core.extensions.ext_metrics import metrics
 from core.extensions.ext_storage import storage
 
 SUPPORT_URL_CONTENT_TYPES = ['application/pdf', 'text/plain']
-USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+# documents are cached before they are split and compared to their previous version, the settings of these
+# steps are not part of the cache keys
+TRANSFORM_SETTING_FIELDS = {'splitter', 'chunkSize', 'chunkOverlap', 'documentId'}
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 4))
+# files of a remote storage up to this size are read into memory for the extractors that cannot take a stream
+STORAGE_MEMORY_MAX_BYTES = int(os.environ.get('STORAGE_MEMORY_MAX_BYTES', 16 * 1024 * 1024))
+
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+
+def _get_batch_executor() -> ThreadPoolExecutor:
+    """Return the worker pool shared by all batch extractions, bounding their total concurrency.
+
+    The workers are threads, their pdfium calls are serialized by `helpers.pdfium_lock`.
+    """
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='extract-batch')
+        return _batch_executor
 
 
 class ExtractProcessor:
@@ -41,78 +59,325 @@ class ExtractProcessor:
 
     @classmethod
     def load_from_url(cls, url: str, return_text: bool = False) -> Union[list[Document], str]:
-        response = requests.get(url, headers={
-            "User-Agent": USER_AGENT
-        })
-
-        with tempfile.TemporaryDirectory() as temp_dir:
-            suffix = Path(url).suffix
-            file_path = f"{temp_dir}/{next(tempfile._get_candidate_names())}{suffix}"
-            with open(file_path, 'wb') as file:
-                file.write(response.content)
-            extract_setting = ExtractSetting()
-            if return_text:
-                delimiter = '\n'
-                return delimiter.join([document.content for document in cls.extract(
-                    extract_setting=extract_setting, file_path=file_path)])
-            else:
-                return cls.extract(extract_setting=extract_setting, file_path=file_path)
+        if return_text:
+            delimiter = '\n'
+            return delimiter.join([document.content for document in cls.iter_from_url(url)])
+        else:
+            return list(cls.iter_from_url(url))
+
+    @classmethod
+    def iter_from_url(cls, url: str, extract_setting: ExtractSetting = None) -> Iterator[Document]:
+        """Download a remote file and lazily extract it.
+
+        The download happens before the first document is requested, so that fetch errors are raised by
+        this call, see `fetch_url`.
+        """
+        extract_setting = extract_setting or ExtractSetting()
+        temp_dir = tempfile.mkdtemp()
+        try:
+            fetched = cls.fetch_url(url, temp_dir, extract_setting)
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        if isinstance(fetched, list):
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return iter(fetched)
+
+        return cls._iter_and_remove(cls.iter_fetched(url, fetched, extract_setting), temp_dir)
+
+    @classmethod
+    def fetch_url(cls, url: str, folder: str, extract_setting: ExtractSetting = None) \
+            -> Union[list[Document], FetchedFile]:
+        """Download a remote file into the folder, unless its documents are cached.
+
+        When the result cache is enabled, the ETag and Last-Modified headers of the last download of the url
+        are sent along, and an unmodified remote file is answered with the cached documents.
+
+        Returns:
+            The cached documents, or the downloaded file to pass to `iter_fetched`.
+        """
+        extract_setting = extract_setting or ExtractSetting()
+        validators = json.loads(cache.get(cls._url_cache_key(extract_setting, url)) or b'{}')
+        with metrics.stage('url_fetch'):
+            fetched = url_fetcher.fetch(url, folder, validators.get('etag'), validators.get('last_modified'))
+        if not fetched.not_modified:
+            return fetched
+
+        cached = cache.get(validators['key']) if 'key' in validators else None
+        metrics.cache_lookup(cached is not None)
+        if cached is not None:
+            return list(cls._transform(extract_setting, cls._load_cache_entry(cached)))
+        # the extracted documents were evicted in the meantime
+        with metrics.stage('url_fetch'):
+            return url_fetcher.fetch(url, folder)
+
+    @classmethod
+    def iter_fetched(cls, url: str, fetched: FetchedFile, extract_setting: ExtractSetting = None) \
+            -> Iterator[Document]:
+        """Lazily extract a file downloaded by `fetch_url`.
+
+        The file type is taken from the url path, or from the Content-Type header when the path has no
+        known extension.
+        """
+        extract_setting = extract_setting or ExtractSetting()
+        file_path = fetched.file_path
+        extension = registry.extension_for_mimetype(fetched.mimetype)
+        if extension and not registry.is_registered(Path(file_path).suffix.lower()):
+            os.rename(file_path, file_path + extension)
+            file_path += extension
+
+        extractor = cls._build_extractor(extract_setting, file_path)
+        blob = Blob.from_path(file_path, mime_type=fetched.mimetype)
+        cache_key = cls._cache_key(extract_setting, extractor, blob) if cache.enabled else None
+        yield from cls._transform(extract_setting, cls._load_with_cache(extract_setting, extractor, blob, cache_key))
+        if cache_key and (fetched.etag or fetched.last_modified):
+            cache.set(cls._url_cache_key(extract_setting, url), json.dumps({
+                'etag': fetched.etag, 'last_modified': fetched.last_modified, 'key': cache_key,
+            }).encode('utf-8'))
+
+    @staticmethod
+    def _iter_and_remove(documents: Iterator[Document], temp_dir: str) -> Iterator[Document]:
+        try:
+            yield from documents
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
 
     @classmethod
     def extract(cls, extract_setting: ExtractSetting, is_automatic: bool = False,
-                file_path: str = None) -> list[Document]:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            if not file_path:
-                upload_file = extract_setting.filepath
-                suffix = Path(upload_file).suffix
-                file_path = f"{temp_dir}/{next(tempfile._get_candidate_names())}{suffix}"
-                storage.download(upload_file, file_path)
-            input_file = Path(file_path)
-            file_extension = input_file.suffix.lower()
-            etl_type = extract_setting.etlType
-            unstructured_api_url = os.environ.get('UNSTRUCTURED_API_URL')
-            if etl_type == 'Unstructured':
-                if file_extension == '.xlsx':
-                    extractor = ExcelExtractor(file_path)
-                elif file_extension == '.pdf':
-                    extractor = PdfExtractor(file_path)
-                elif file_extension in ['.md', '.markdown']:
-                    extractor = UnstructuredMarkdownExtractor(file_path, unstructured_api_url) if is_automatic \
-                        else MarkdownExtractor(file_path, autodetect_encoding=True)
-                elif file_extension in ['.htm', '.html']:
-                    extractor = HtmlExtractor(file_path)
-                elif file_extension in ['.docx']:
-                    extractor = UnstructuredWordExtractor(file_path, unstructured_api_url)
-                elif file_extension == '.csv':
-                    extractor = CSVExtractor(file_path, autodetect_encoding=True)
-                elif file_extension == '.msg':
-                    extractor = UnstructuredMsgExtractor(file_path, unstructured_api_url)
-                elif file_extension == '.eml':
-                    extractor = UnstructuredEmailExtractor(file_path, unstructured_api_url)
-                elif file_extension == '.ppt':
-                    extractor = UnstructuredPPTExtractor(file_path, unstructured_api_url)
-                elif file_extension == '.pptx':
-                    extractor = UnstructuredPPTXExtractor(file_path, unstructured_api_url)
-                elif file_extension == '.xml':
-                    extractor = UnstructuredXmlExtractor(file_path, unstructured_api_url)
-                else:
-                    # txt
-                    extractor = UnstructuredTextExtractor(file_path, unstructured_api_url) if is_automatic \
-                        else TextExtractor(file_path, autodetect_encoding=True)
+                file_path: str = None, blob: Blob = None, source: str = None) -> list[Document]:
+        return list(cls.iter_extract(extract_setting, is_automatic, file_path, blob, source))
+
+    @classmethod
+    def extract_batch(cls, files: dict[str, Union[str, Blob]], extract_setting: ExtractSetting = None) \
+            -> dict[str, Union[list[Document], Exception]]:
+        """Extract many files on the shared batch worker pool.
+
+        Args:
+            files: The local file paths or in-memory blobs to extract, keyed by the name they are reported under.
+            extract_setting: The settings applied to every file, a document id is suffixed with the name of
+                every file.
+
+        Returns:
+            The documents of every file keyed by its name, or the exception raised while extracting it.
+        """
+        extract_setting = extract_setting or ExtractSetting()
+        executor = _get_batch_executor()
+        futures = {}
+        for name, file in files.items():
+            file_setting = extract_setting
+            if extract_setting.documentId:
+                file_setting = extract_setting.copy(update={'documentId': f'{extract_setting.documentId}/{name}'})
+            if isinstance(file, Blob):
+                futures[name] = executor.submit(cls.extract, file_setting, blob=file)
+            else:
+                futures[name] = executor.submit(cls.extract, file_setting, file_path=file)
+
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = e
+
+        return results
+
+    @classmethod
+    def iter_extract(cls, extract_setting: ExtractSetting, is_automatic: bool = False,
+                     file_path: str = None, blob: Blob = None, source: str = None) -> Iterator[Document]:
+        """Lazily extract documents, yielding each one as soon as the extractor produces it.
+
+        The input is taken from `blob` when given, then from `file_path`, and is otherwise read from the
+        storage key in `extract_setting.filepath`, see `_open_storage`. In-memory blobs are handed to the
+        extractor directly and only touch the filesystem when the chosen extractor needs a real file.
+
+        Documents read from the storage get the storage key as their `source` meta, or `source` when
+        given, instead of the local path the file was read from.
+        """
+        temp_dir, cache_key = None, None
+        try:
+            if blob is not None and blob.data is None and blob.opener is None:
+                file_path, blob = str(blob.path), None
+
+            if blob is not None:
+                extractor = cls._build_extractor(extract_setting, blob.source or '', is_automatic, blob=blob)
+                if not extractor.supports_blob:
+                    temp_dir = tempfile.mkdtemp()
+                    file_path = f"{temp_dir}/{os.path.basename(blob.source or '') or 'file'}"
+                    with open(file_path, 'wb') as f:
+                        f.write(blob.as_bytes())
+                    blob = None
+
+            if blob is None and not file_path:
+                extractor, blob, temp_dir, cache_key = cls._open_storage(extract_setting, is_automatic)
+                documents = cls._rename_source(cls._load_with_cache(extract_setting, extractor, blob, cache_key),
+                                               blob.source, source or extract_setting.filepath)
             else:
-                if file_extension == '.xlsx':
-                    extractor = ExcelExtractor(file_path)
-                elif file_extension == '.pdf':
-                    extractor = PdfExtractor(file_path)
-                elif file_extension in ['.md', '.markdown']:
-                    extractor = MarkdownExtractor(file_path, autodetect_encoding=True)
-                elif file_extension in ['.htm', '.html']:
-                    extractor = HtmlExtractor(file_path)
-                elif file_extension in ['.docx']:
-                    extractor = WordExtractor(file_path)
-                elif file_extension == '.csv':
-                    extractor = CSVExtractor(file_path, autodetect_encoding=True)
+                if blob is None:
+                    extractor = cls._build_extractor(extract_setting, file_path, is_automatic)
+                    blob = Blob.from_path(file_path)
+                documents = cls._load_with_cache(extract_setting, extractor, blob, cache_key)
+
+            yield from cls._transform(extract_setting, documents)
+        finally:
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @classmethod
+    def _open_storage(cls, extract_setting: ExtractSetting, is_automatic: bool = False) \
+            -> tuple[BaseExtractor, Blob, Optional[str], Optional[str]]:
+        """Open the file of the storage key in `extract_setting.filepath`, copying it only when needed.
+
+        Files of a local storage are read in place. Files of a remote storage are streamed to the
+        extractors that read them front to back in bounded memory (CSV), read into memory up to
+        STORAGE_MEMORY_MAX_BYTES for the other extractors taking blobs (text, markdown, HTML, PDF, XLSX
+        and DOCX), and only downloaded to a temporary file when they are larger or the extractor needs a
+        real file.
+
+        Returns:
+            The extractor, its blob, the temporary folder to remove afterwards and the cache key, when it
+            is known without reading the content.
+        """
+        upload_file = extract_setting.filepath
+        local_path = storage.local_path(upload_file)
+        if local_path is not None:
+            if not os.path.exists(local_path):
+                raise FileNotFoundError("File not found")
+            return cls._build_extractor(extract_setting, local_path, is_automatic), Blob.from_path(local_path), \
+                None, None
+
+        # the type of files without a known extension is detected from their content, which needs the file
+        extension = Path(upload_file).suffix.lower()
+        if extension and registry.is_registered(extension):
+            with metrics.stage('storage_info'):
+                stored = storage.info(upload_file)
+            blob = Blob.from_chunks(lambda: storage.load_stream(upload_file), path=upload_file, size=stored.size)
+            extractor = cls._build_extractor(extract_setting, upload_file, is_automatic, blob=blob)
+            if not extractor.supports_stream and extractor.supports_blob and stored.size <= STORAGE_MEMORY_MAX_BYTES:
+                with metrics.stage('storage_download'):
+                    blob = Blob.from_data(storage.load_once(upload_file), path=upload_file)
+                extractor = cls._build_extractor(extract_setting, upload_file, is_automatic, blob=blob)
+
+            if extractor.supports_stream or blob.data is not None:
+                # the version of the stored file identifies its content, hashing it would read it twice
+                cache_key = cls._cache_key(extract_setting, extractor, blob, f'{upload_file}:{stored.version}') \
+                    if cache.enabled else None
+                return extractor, blob, None, cache_key
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            file_path = f"{temp_dir}/{next(tempfile._get_candidate_names())}{Path(upload_file).suffix}"
+            with metrics.stage('storage_download'):
+                storage.download(upload_file, file_path)
+            return cls._build_extractor(extract_setting, file_path, is_automatic), Blob.from_path(file_path), \
+                temp_dir, None
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+    @classmethod
+    def _load_with_cache(cls, extract_setting: ExtractSetting, extractor: BaseExtractor,
+                         blob: Blob, cache_key: str = None) -> Iterator[Document]:
+        documents = metrics.track(type(extractor).__name__, blob, extractor.load())
+        if not cache.enabled:
+            yield from documents
+            return
+
+        with metrics.stage('cache_lookup'):
+            cache_key = cache_key or cls._cache_key(extract_setting, extractor, blob)
+            cached = cache.get(cache_key)
+        metrics.cache_lookup(cached is not None)
+        if cached is not None:
+            yield from cls._load_cache_entry(cached, blob.source)
+            return
+
+        # only keep the serialized documents around while they still fit in a cache entry
+        serialized, serialized_bytes = [], 0
+        for document in documents:
+            if serialized is not None:
+                item = dump_document(document)
+                serialized_bytes += len(item)
+                if serialized_bytes <= cache.max_entry_bytes:
+                    serialized.append(item)
                 else:
-                    # txt
-                    extractor = TextExtractor(file_path, autodetect_encoding=True)
-            return extractor.extract()
+                    serialized = None
+            yield document
+
+        if serialized is not None:
+            cache.set(cache_key, b'{"source":' + dumps(blob.source) + b',"documents":[' + b','.join(serialized) + b']}')
+
+    @staticmethod
+    def _load_cache_entry(cached: bytes, source: Optional[str] = None) -> list[Document]:
+        """Load the documents of a cache entry, the same content may have been cached under another path.
+
+        The `source` meta the documents got from the path of the cached file is replaced by `source`, when given.
+        """
+        entry = loads(cached)
+        if isinstance(entry, list):
+            # written before the source was recorded
+            entry = {'source': None, 'documents': entry}
+        documents = []
+        for item in entry['documents']:
+            meta = item.get('meta')
+            if source is not None and meta and 'source' in meta and meta['source'] == entry['source']:
+                meta['source'] = source
+            documents.append(Document(item['content'], meta))
+        return documents
+
+    @staticmethod
+    def _rename_source(documents: Iterable[Document], path: Optional[str], source: str) -> Iterator[Document]:
+        """Replace the `source` meta the documents got from the path their file was read from by `source`."""
+        for document in documents:
+            if path is not None and document.meta and document.meta.get('source') == path:
+                document = Document(content=document.content, meta={**document.meta, 'source': source})
+            yield document
+
+    @classmethod
+    def _transform(cls, extract_setting: ExtractSetting, documents: Iterable[Document]) -> Iterable[Document]:
+        """Split the extracted documents, then mark their changes when the extract settings have a document id."""
+        documents = cls._split(extract_setting, documents)
+        if extract_setting.documentId:
+            documents = mark_changes(extract_setting.documentId, documents)
+        return documents
+
+    @classmethod
+    def _split(cls, extract_setting: ExtractSetting, documents: Iterable[Document]) -> Iterable[Document]:
+        """Chunk the documents with the splitter selected by the extract settings, if any."""
+        splitter = splitter_from_setting(extract_setting)
+        if splitter is None:
+            return documents
+        return splitter.iter_transform(documents)
+
+    @classmethod
+    def _build_extractor(cls, extract_setting: ExtractSetting, file_path: str,
+                         is_automatic: bool = False, blob: Blob = None) -> BaseExtractor:
+        extractor = registry.create(extract_setting.etlType, file_path, is_automatic, blob=blob)
+        if (extract_setting.pages or extract_setting.maxPages) and extractor.supports_pages:
+            extractor.select_pages(extract_setting.pages, extract_setting.maxPages)
+        return extractor
+
+    @classmethod
+    def _cache_key(cls, extract_setting: ExtractSetting, extractor: BaseExtractor, blob: Blob,
+                   content_id: str = None) -> str:
+        """Build a cache key from the file content, or an identifier of it, the chosen extractor and the
+        extract settings."""
+        content_hash = hashlib.sha256()
+        if content_id is not None:
+            content_hash.update(content_id.encode('utf-8'))
+        else:
+            with blob.as_bytes_io() as f:
+                while chunk := f.read(1024 * 1024):
+                    content_hash.update(chunk)
+
+        setting = json.dumps(extract_setting.dict(exclude={'filepath', *TRANSFORM_SETTING_FIELDS}),
+                             sort_keys=True, default=str)
+        name = type(extractor).__name__ + (f"/{extractor.cache_tag}" if extractor.cache_tag else '')
+        key = hashlib.sha256(f"{name}:{setting}".encode('utf-8')).hexdigest()[:16]
+        return f"{content_hash.hexdigest()}-{key}"
+
+    @classmethod
+    def _url_cache_key(cls, extract_setting: ExtractSetting, url: str) -> str:
+        """Build the key under which the validators of the last download of a url are cached."""
+        setting = json.dumps(extract_setting.dict(exclude={'filepath', *TRANSFORM_SETTING_FIELDS}),
+                             sort_keys=True, default=str)
+        return 'url-' + hashlib.sha256(f"{url}:{setting}".encode('utf-8')).hexdigest()
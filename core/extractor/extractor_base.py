@@ -1,12 +1,33 @@
 """Abstract interface for document loader implementations."""
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from typing import Optional
 
 
 class BaseExtractor(ABC):
     """Interface for extract files.
     """
 
+    # whether the extractor accepts an in-memory `blob` instead of a file on disk
+    supports_blob: bool = False
+    # whether the extractor reads its blob front to back in bounded memory, so that it can be a stream of the storage
+    supports_stream: bool = False
+    # whether the extractor can be limited to some of the pages of a document, see `select_pages`
+    supports_pages: bool = False
+    # distinguishes the cached results of differently configured extractors of the same class, it has to cover
+    # every setting changing the documents, including those read from the environment
+    cache_tag: str = ''
+
     @abstractmethod
     def extract(self):
         raise NotImplementedError
 
+    def select_pages(self, pages: str = '', max_pages: Optional[int] = None):
+        """Only extract the given pages, e.g. `1-10,15`, and at most `max_pages` of them.
+
+        Extractors without `supports_pages` extract the whole document and ignore the selection.
+        """
+
+    def load(self) -> Iterator:
+        """Lazily load documents, extractors that can produce documents incrementally should override this."""
+        yield from self.extract()
@@ -1,7 +1,32 @@
 """Document loader helpers."""
 
 import concurrent.futures
-from typing import NamedTuple, Optional, cast
+import io
+import logging
+import os
+import threading
+from collections.abc import Iterator
+from typing import NamedTuple, Optional, Union
+
+from core.extensions.ext_metrics import metrics
+from core.extractor.blod.blod import Blob
+
+logger = logging.getLogger(__name__)
+
+# size of the chunks fed to the incremental encoding detector
+ENCODING_CHUNK_BYTES = 64 * 1024
+# files larger than three samples are only sampled at their head, middle and tail
+ENCODING_SAMPLE_BYTES = 256 * 1024
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+_process_pools: dict[int, concurrent.futures.ProcessPoolExecutor] = {}
+_process_pools_lock = threading.Lock()
+
+# pdfium is not thread-safe, the threads of a process, e.g. those of the batch pool, hold this lock around every
+# pdfium call, pages are extracted in parallel by the worker processes of `get_process_pool` instead
+pdfium_lock = threading.RLock()
 
 
 class FileEncoding(NamedTuple):
@@ -15,32 +40,161 @@ class FileEncoding(NamedTuple):
     """The language of the file."""
 
 
-def detect_file_encodings(file_path: str, timeout: int = 5) -> list[FileEncoding]:
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Return the thread pool shared by all encoding detections, used to enforce their timeout."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(thread_name_prefix='detect-encoding')
+        return _executor
+
+
+def get_process_pool(workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    """Return the process pool with the given number of workers shared by CPU bound extractions.
+
+    Pools are created on first use, see warmup.process_context for how their workers are started.
+    """
+    from core.extractor.warmup import WORKER_MAX_JOBS, process_context
+
+    with _process_pools_lock:
+        if workers not in _process_pools:
+            _process_pools[workers] = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, mp_context=process_context(), max_tasks_per_child=WORKER_MAX_JOBS or None)
+        return _process_pools[workers]
+
+
+def detect_file_encodings(file_path: Union[str, Blob], timeout: int = 5, sample: bool = True) -> list[FileEncoding]:
     """Try to detect the file encoding.
 
+    The content is fed to an incremental detector in bounded chunks, which stops as soon as it is
+    confident. Files larger than three times ENCODING_SAMPLE_BYTES are only sampled at their head,
+    middle and tail, streams that cannot seek only at their head. Without `sample`, all the candidate
+    encodings of the whole content are returned instead, only its first chunk and the lines holding non ASCII
+    bytes are fed to the detector as the others tell nothing about the encoding.
+
     Returns a list of `FileEncoding` tuples with the detected encodings ordered
     by confidence.
 
     Args:
-        file_path: The path to the file to detect the encoding for.
+        file_path: The path to the file, or the blob, to detect the encoding for.
         timeout: The timeout in seconds for the encoding detection.
+        sample: Whether to detect the encoding on samples of the content only.
     """
     import chardet
+    from chardet.universaldetector import UniversalDetector
 
-    def read_and_detect(file_path: str) -> list[dict]:
-        with open(file_path, "rb") as f:
-            rawdata = f.read()
-        return cast(list[dict], chardet.detect_all(rawdata))
+    cancelled = threading.Event()
+    source = file_path.source if isinstance(file_path, Blob) else file_path
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future = executor.submit(read_and_detect, file_path)
-        try:
+    def read_and_detect(file_path: Union[str, Blob]) -> list[dict]:
+        blob = file_path if isinstance(file_path, Blob) else Blob.from_path(file_path)
+        if not sample:
+            data = blob.as_bytes()
+            lines = [line for line in data[ENCODING_CHUNK_BYTES:].splitlines(keepends=True) if not line.isascii()]
+            return chardet.detect_all(data[:ENCODING_CHUNK_BYTES] + b''.join(lines))
+
+        detector = UniversalDetector()
+        with blob.as_bytes_io() as f:
+            if not f.seekable():
+                # a stream of the storage, only its head is sampled
+                size = 3 * ENCODING_SAMPLE_BYTES
+                samples = [0]
+            elif (size := f.seek(0, os.SEEK_END)) > 3 * ENCODING_SAMPLE_BYTES:
+                samples = [0, (size - ENCODING_SAMPLE_BYTES) // 2, size - ENCODING_SAMPLE_BYTES]
+            else:
+                samples = [0]
+
+            for offset in samples:
+                if f.seekable():
+                    f.seek(offset)
+                if offset:
+                    # skip the partial line, it may start in the middle of a multibyte character
+                    f.readline()
+                remaining = ENCODING_SAMPLE_BYTES if len(samples) > 1 else size
+                while remaining > 0 and not detector.done and not cancelled.is_set():
+                    chunk = f.read(min(ENCODING_CHUNK_BYTES, remaining))
+                    if not chunk:
+                        break
+                    detector.feed(chunk)
+                    remaining -= len(chunk)
+                if detector.done or cancelled.is_set():
+                    break
+
+        detector.close()
+        return [detector.result]
+
+    future = _get_executor().submit(read_and_detect, file_path)
+    try:
+        with metrics.stage('encoding_detection'):
             encodings = future.result(timeout=timeout)
-        except concurrent.futures.TimeoutError:
-            raise TimeoutError(
-                f"Timeout reached while detecting encoding for {file_path}"
-            )
+    except concurrent.futures.TimeoutError:
+        cancelled.set()
+        raise TimeoutError(
+            f"Timeout reached while detecting encoding for {source}"
+        )
 
     if all(encoding["encoding"] is None for encoding in encodings):
-        raise RuntimeError(f"Could not detect encoding for {file_path}")
+        raise RuntimeError(f"Could not detect encoding for {source}")
     return [FileEncoding(**enc) for enc in encodings if enc["encoding"] is not None]
+
+
+def candidate_encodings(blob: Blob, tried: Optional[set] = None) -> Iterator[str]:
+    """Yield the encodings to try when decoding the blob failed.
+
+    The encodings detected on samples of the content come first, then those detected on the whole
+    content, as a single odd byte may be outside of the samples. The encodings in `tried` are skipped,
+    every yielded encoding is added to it.
+    """
+    tried = set() if tried is None else tried
+    for sample in (True, False):
+        try:
+            detected_encodings = detect_file_encodings(blob, sample=sample)
+        except (RuntimeError, TimeoutError):
+            logger.warning('failed to detect the encoding of %s', blob.source, exc_info=True)
+            continue
+        for detected in detected_encodings:
+            if detected.encoding not in tried:
+                tried.add(detected.encoding)
+                yield detected.encoding
+
+
+def read_text(blob: Blob, encoding: Optional[str] = None,
+              autodetect_encoding: bool = False) -> tuple[str, Optional[str]]:
+    """Read the blob as text.
+
+    The raw content is read only once, when decoding with `encoding` fails and `autodetect_encoding`
+    is set, the `candidate_encodings` of that same content are tried. When none of them decodes it,
+    the content is decoded as UTF-8 with the undecodable bytes replaced.
+
+    Returns:
+        The text and the encoding it was decoded with.
+
+    Raises:
+        RuntimeError: when the blob cannot be read or decoded.
+    """
+    try:
+        data = blob.as_bytes()
+    except Exception as e:
+        raise RuntimeError(f"Error loading {blob.source}") from e
+
+    try:
+        return _decode(data, encoding), encoding
+    except UnicodeDecodeError as e:
+        if not autodetect_encoding:
+            raise RuntimeError(f"Error loading {blob.source}") from e
+    except LookupError as e:
+        raise RuntimeError(f"Error loading {blob.source}") from e
+
+    for detected in candidate_encodings(Blob.from_data(data, path=blob.source), {encoding}):
+        try:
+            return _decode(data, detected), detected
+        except (UnicodeDecodeError, LookupError):
+            continue
+
+    logger.warning('no detected encoding decodes %s, decoding it as utf-8 with replacements', blob.source)
+    return data.decode('utf-8', errors='replace'), 'utf-8'
+
+
+def _decode(data: bytes, encoding: Optional[str]) -> str:
+    # the text wrapper falls back to the locale encoding and translates newlines like open() does
+    return io.TextIOWrapper(io.BytesIO(data), encoding=encoding).read()
@@ -0,0 +1,257 @@
+"""Html to text engine dropping boilerplate and splitting pages into sections by heading."""
+import os
+import re
+from html.parser import HTMLParser
+from typing import NamedTuple, Optional
+
+from core.extractor.blod.blod import Blob
+from core.extractor.helpers import read_text
+
+ENGINE_AUTO = 'auto'
+ENGINE_LXML = 'lxml'
+ENGINE_HTML_PARSER = 'html.parser'
+
+HTML_ENGINE = os.environ.get('HTML_ENGINE', ENGINE_AUTO)
+
+# elements dropped with their whole content, boilerplate and non-text elements
+SKIP_TAGS = frozenset({
+    'script', 'style', 'noscript', 'template', 'nav', 'footer', 'svg', 'iframe', 'object', 'canvas',
+})
+# skipped elements holding text, kept when skipping them would leave a page without any text
+BOILERPLATE_TAGS = frozenset({'nav', 'footer'})
+# elements without an end tag
+VOID_TAGS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr',
+})
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+# elements starting on a line of their own
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'details', 'div', 'dl', 'dt', 'fieldset',
+    'figcaption', 'figure', 'footer', 'form', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section',
+    'summary', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+})
+
+# number of leading bytes searched for the declared charset of a page
+CHARSET_SNIFF_BYTES = 2048
+CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+class HtmlSection(NamedTuple):
+    """The text under a heading of a html page."""
+
+    heading: Optional[str]
+    """The heading text, None for the text before the first heading."""
+    text: str
+    """The text of the section, without the heading."""
+    heading_path: list[str]
+    """The enclosing headings (h1 > h2 > ...), the section heading included."""
+
+
+class _SectionSink:
+    """
+    Collects the text of a html page from start, end and data events and splits it into sections.
+
+    The event methods follow the lxml parser target interface, the stdlib tokenizer is adapted to it
+    by _StdlibParser. A skipped element ends with its end tag or with the end tag of any element it
+    is nested in, so that an unclosed `<nav>` does not drop the rest of its parent.
+    """
+
+    def __init__(self, skip_tags: frozenset = SKIP_TAGS):
+        self.title: Optional[str] = None
+        self.sections: list[HtmlSection] = []
+        self.dropped_boilerplate = False
+        self._skip_tags = skip_tags
+        self._open: list[str] = []
+        # the index in _open of the skipped element, if any
+        self._skip_index: Optional[int] = None
+        self._pre_depth = 0
+        self._in_title = False
+        self._title_parts: list[str] = []
+        self._heading_level = 0
+        self._heading_parts: list[str] = []
+        self._path: list[tuple[int, str]] = []
+        self._heading: Optional[str] = None
+        self._lines: list[str] = []
+        self._line: list[str] = []
+
+    def start(self, tag: str, attrib=None):
+        tag = tag.lower()
+        if tag not in VOID_TAGS:
+            self._open.append(tag)
+        if self._skip_index is None and tag in self._skip_tags:
+            self._skip_index = len(self._open) - 1
+        if self._skip_index is not None:
+            return
+
+        if tag == 'title':
+            self._in_title = True
+        elif tag in HEADING_TAGS:
+            self._flush_section()
+            self._heading_level = HEADING_TAGS[tag]
+            self._heading_parts = []
+        elif tag in BLOCK_TAGS:
+            self._break_line()
+            if tag == 'pre':
+                self._pre_depth += 1
+
+    def end(self, tag: str):
+        tag = tag.lower()
+        if tag not in VOID_TAGS and tag in self._open:
+            # the elements left open inside are closed along
+            del self._open[len(self._open) - 1 - self._open[::-1].index(tag):]
+        if self._skip_index is not None:
+            if len(self._open) > self._skip_index:
+                return
+            self._skip_index = None
+            if tag in self._skip_tags:
+                return
+
+        if tag == 'title':
+            self._in_title = False
+            if self.title is None:
+                self.title = WHITESPACE_PATTERN.sub(' ', ''.join(self._title_parts)).strip()
+        elif tag in HEADING_TAGS and self._heading_level:
+            level, self._heading_level = self._heading_level, 0
+            heading = WHITESPACE_PATTERN.sub(' ', ''.join(self._heading_parts)).strip()
+            if not heading:
+                return
+            while self._path and self._path[-1][0] >= level:
+                self._path.pop()
+            self._path.append((level, heading))
+            self._heading = heading
+        elif tag in BLOCK_TAGS:
+            self._break_line()
+            if tag == 'pre':
+                self._pre_depth = max(0, self._pre_depth - 1)
+
+    def data(self, data: str):
+        if self._skip_index is not None:
+            if self._open[self._skip_index] in BOILERPLATE_TAGS and data.strip():
+                self.dropped_boilerplate = True
+            return
+        if self._in_title:
+            self._title_parts.append(data)
+        elif self._heading_level:
+            self._heading_parts.append(data)
+        elif self._pre_depth:
+            lines = data.split('\n')
+            self._line.append(lines[0])
+            for line in lines[1:]:
+                self._break_line()
+                self._line.append(line)
+        else:
+            self._line.append(WHITESPACE_PATTERN.sub(' ', data))
+
+    def close(self):
+        self._flush_section()
+
+    def _break_line(self):
+        if self._line:
+            line = ''.join(self._line) if self._pre_depth else ''.join(self._line).strip()
+            if line.strip():
+                self._lines.append(line)
+            self._line = []
+
+    def _flush_section(self):
+        self._break_line()
+        if self._heading is not None or self._lines:
+            self.sections.append(HtmlSection(self._heading, '\n'.join(self._lines), [h for _, h in self._path]))
+        self._heading = None
+        self._lines = []
+
+
+class _StdlibParser(HTMLParser):
+    """Feeds the events of the stdlib html tokenizer to a _SectionSink."""
+
+    def __init__(self, sink: _SectionSink):
+        super().__init__(convert_charrefs=True)
+        self._sink = sink
+
+    def handle_starttag(self, tag, attrs):
+        self._sink.start(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # self closing tags only break lines, they never open a skipped or heading element
+        if tag in BLOCK_TAGS:
+            self._sink.start(tag)
+            self._sink.end(tag)
+
+    def handle_endtag(self, tag):
+        self._sink.end(tag)
+
+    def handle_data(self, data):
+        self._sink.data(data)
+
+    def close(self):
+        super().close()
+        self._sink.close()
+
+
+def resolve_engine(engine: str = HTML_ENGINE) -> str:
+    """Return the engine used for the requested one, `auto` picks lxml when it is installed."""
+    if engine == ENGINE_AUTO:
+        try:
+            import lxml.etree  # noqa: F401
+            return ENGINE_LXML
+        except ImportError:
+            return ENGINE_HTML_PARSER
+    if engine not in (ENGINE_LXML, ENGINE_HTML_PARSER):
+        raise ValueError(f"Unsupported html engine: {engine}")
+    return engine
+
+
+def parse_html(html: str, engine: str = HTML_ENGINE) -> tuple[Optional[str], list[HtmlSection]]:
+    """
+    Parse a html page, dropping scripts, styles, navigation and footers.
+
+    Navigation and footers are kept when dropping them leaves no text at all, e.g. when a `<nav>` is
+    never closed.
+
+    Returns:
+        The page title and the sections of the page in document order, the text before the first
+        heading is returned as a section without heading.
+    """
+    engine = resolve_engine(engine)
+    sink = _parse(html, engine, SKIP_TAGS)
+    if sink.dropped_boilerplate and not any(section.heading or section.text for section in sink.sections):
+        sink = _parse(html, engine, SKIP_TAGS - BOILERPLATE_TAGS)
+
+    return sink.title, sink.sections
+
+
+def _parse(html: str, engine: str, skip_tags: frozenset) -> _SectionSink:
+    sink = _SectionSink(skip_tags)
+    if engine == ENGINE_LXML:
+        from lxml import etree
+
+        parser = etree.HTMLParser(target=sink, remove_comments=True, remove_pis=True)
+        parser.feed(html)
+        parser.close()
+    else:
+        parser = _StdlibParser(sink)
+        parser.feed(html)
+        parser.close()
+
+    return sink
+
+
+def html_to_text(html: str, engine: str = HTML_ENGINE) -> str:
+    """Return the text of a html page, with the headings on their own line."""
+    _, sections = parse_html(html, engine)
+    return '\n'.join('\n'.join(filter(None, (section.heading, section.text))) for section in sections).strip()
+
+
+def parse_html_blob(blob: Blob, engine: str = HTML_ENGINE) -> tuple[Optional[str], list[HtmlSection]]:
+    """Decode a html blob with its declared charset, falling back to detection, and parse it."""
+    # read once, the blob may be a stream of the storage
+    data = blob.as_bytes()
+    match = CHARSET_PATTERN.search(data[:CHARSET_SNIFF_BYTES])
+    encoding = match.group(1).decode('ascii') if match else 'utf-8'
+    try:
+        ''.encode(encoding)
+    except LookupError:
+        encoding = 'utf-8'
+
+    html, _ = read_text(Blob.from_data(data, path=blob.source), encoding, autodetect_encoding=True)
+    return parse_html(html, engine)
@@ -1,7 +1,10 @@
 """Abstract interface for document loader implementations."""
-from bs4 import BeautifulSoup
+from collections.abc import Iterator
+from typing import Optional
 
+from core.extractor.blod.blod import Blob
 from core.extractor.extractor_base import BaseExtractor
+from core.extractor.html_engine import HTML_ENGINE, parse_html_blob, resolve_engine
 from core.models.document import Document
 
 
@@ -10,25 +13,43 @@ class HtmlExtractor(BaseExtractor):
     """
     Load html files.
 
+    Scripts, styles, navigation and footers are dropped and the page is split into a document per
+    heading, the meta holds the page `title` and the enclosing headings in `header_path`.
+
 
     Args:
         file_path: Path to the file to load.
+        engine: The html engine, `lxml`, `html.parser` or `auto` to use lxml when it is installed.
+        blob: In-memory content of the file, when given the file path is only used as the source.
     """
 
+    supports_blob = True
+
     def __init__(
         self,
-        file_path: str
+        file_path: str,
+        engine: str = HTML_ENGINE,
+        blob: Optional[Blob] = None
     ):
         """Initialize with file path."""
         self._file_path = file_path
+        self._engine = engine
+        self._blob = blob if blob is not None else Blob.from_path(file_path)
 
-    def extract(self) -> list[Document]:
-        return [Document(content=self._load_as_text())]
+    @property
+    def cache_tag(self) -> str:
+        return resolve_engine(self._engine)
 
-    def _load_as_text(self) -> str:
-        with open(self._file_path, "rb") as fp:
-            soup = BeautifulSoup(fp, 'html.parser')
-            text = soup.get_text()
-            text = text.strip() if text else ''
-
-        return text
\ No newline at end of file
+    def extract(self) -> list[Document]:
+        return list(self.load())
+
+    def load(self) -> Iterator[Document]:
+        """Load a document per section."""
+        title, sections = parse_html_blob(self._blob, self._engine)
+        for section in sections:
+            content = f"{section.heading}\n{section.text}" if section.heading is not None else section.text
+            meta = {"source": self._file_path, "title": title, "header_path": section.heading_path}
+            yield Document(content=content.strip(), meta=meta)
+        if not sections:
+            # a page without text is still a document
+            yield Document(content='', meta={"source": self._file_path, "title": title, "header_path": []})
@@ -1,20 +1,38 @@
 """Abstract interface for document loader implementations."""
 import re
-from typing import Optional, cast
+from collections.abc import Iterable, Iterator
+from typing import Optional, Union
 
+from core.extractor.blod.blod import Blob
 from core.extractor.extractor_base import BaseExtractor
-from core.extractor.helpers import detect_file_encodings
+from core.extractor.helpers import read_text
 from core.models.document import Document
 
+HEADER_PATTERN = re.compile(r"^(#+)\s")
+HEADER_MARKS_PATTERN = re.compile(r"^#+\s*|\s+#+\s*$")
+FENCE_PATTERN = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+HYPERLINK_PATTERN = re.compile(r"\[(.*?)\]\((.*?)\)")
+IMAGE_PATTERN = re.compile(r"!{1}\[\[(.*)\]\]")
+TAG_PATTERN = re.compile(r"<.*?>")
+# an empty line or a line starting with any of these may open or close a code fence
+FENCE_FIRST_CHARS = " `~"
+
 
 class MarkdownExtractor(BaseExtractor):
     """Load Markdown files.
 
+    The file is split into one document per header section in a single pass, the titles of the
+    enclosing headers (H1 > H2 > H3 ...) are kept in the `header_path` meta. Lines inside fenced
+    code blocks are kept as they are and never start a new section.
+
 
     Args:
         file_path: Path to the file to load.
+        blob: In-memory content of the file, when given the file path is only used as the source.
     """
 
+    supports_blob = True
+
     def __init__(
             self,
             file_path: str,
@@ -22,6 +40,7 @@ class MarkdownExtractor(BaseExtractor):
             remove_images: bool = True,
             encoding: Optional[str] = None,
             autodetect_encoding: bool = True,
+            blob: Optional[Blob] = None,
     ):
         """Initialize with file path."""
         self._file_path = file_path
@@ -29,94 +48,107 @@ class MarkdownExtractor(BaseExtractor):
         self._remove_images = remove_images
         self._encoding = encoding
         self._autodetect_encoding = autodetect_encoding
+        self._blob = blob if blob is not None else Blob.from_path(file_path)
 
     def extract(self) -> list[Document]:
         """Load from file path."""
-        tups = self.parse_tups(self._file_path)
-        documents = []
-        for header, value in tups:
+        return list(self.load())
+
+    def load(self) -> Iterator[Document]:
+        """Lazily load a document per section."""
+        for header, value, header_path in self.iter_sections(self._read_content(self._blob).split("\n")):
             value = value.strip()
             if header is None:
-                documents.append(Document(content=value))
+                yield Document(content=value, meta={"header_path": header_path})
             else:
-                documents.append(Document(content=f"\n\n{header}\n{value}"))
-
-        return documents
-
-    def markdown_to_tups(self, markdown_text: str) -> list[tuple[Optional[str], str]]:
-        """Convert a markdown file to a dictionary.
+                yield Document(content=f"\n\n{header}\n{value}", meta={"header_path": header_path})
 
-        The keys are the headers and the values are the text under each header.
+    def iter_sections(self, lines: Iterable[str]) -> Iterator[tuple[Optional[str], str, list[str]]]:
+        """Split markdown lines into sections in a single pass.
 
+        Yields:
+            The header of every section (None for the text before the first header), the text under
+            it and the titles of the headers enclosing it, the section header included.
         """
-        markdown_tups: list[tuple[Optional[str], str]] = []
-        lines = markdown_text.split("\n")
-
+        path: list[tuple[int, str]] = []
         current_header = None
-        current_text = ""
+        current_lines: list[str] = []
+        # prose lines are cleaned in batches, a regex pass over a joined run is cheaper than one per line
+        pending: list[str] = []
+        fence = None
 
         for line in lines:
-            header_match = re.match(r"^#+\s", line)
+            line = line.rstrip("\n")
+            first = line[:1]
+
+            fence_match = FENCE_PATTERN.match(line) if first in FENCE_FIRST_CHARS else None
+            if fence is not None:
+                # a fence is closed by a bare fence of the same character, at least as long as the opening one
+                if fence_match and fence_match.group(1)[0] == fence[0] and len(fence_match.group(1)) >= len(fence) \
+                        and not line.strip().strip(fence[0]):
+                    fence = None
+                current_lines.append(line)
+                continue
+            if fence_match:
+                if pending:
+                    current_lines.append(self._clean_line("\n".join(pending)))
+                    pending = []
+                fence = fence_match.group(1)
+                current_lines.append(line)
+                continue
+
+            header_match = HEADER_PATTERN.match(line) if first == "#" else None
             if header_match:
-                if current_header is not None:
-                    markdown_tups.append((current_header, current_text))
-
-                current_header = line
-                current_text = ""
+                if pending:
+                    current_lines.append(self._clean_line("\n".join(pending)))
+                    pending = []
+                if current_header is not None or "".join(current_lines).strip():
+                    yield current_header, "\n".join(current_lines), [title for _, title in path]
+
+                level = len(header_match.group(1))
+                current_header = HEADER_MARKS_PATTERN.sub("", self._clean_line(line)).strip()
+                while path and path[-1][0] >= level:
+                    path.pop()
+                path.append((level, current_header))
+                current_lines = []
             else:
-                current_text += line + "\n"
-        markdown_tups.append((current_header, current_text))
-
-        if current_header is not None:
-            # pass linting, assert keys are defined
-            markdown_tups = [
-                (re.sub(r"#", "", cast(str, key)).strip(), re.sub(r"<.*?>", "", value))
-                for key, value in markdown_tups
-            ]
-        else:
-            markdown_tups = [
-                (key, re.sub("\n", "", value)) for key, value in markdown_tups
-            ]
-
-        return markdown_tups
+                pending.append(line)
+
+        if pending:
+            current_lines.append(self._clean_line("\n".join(pending)))
+        if current_header is not None or "".join(current_lines).strip():
+            yield current_header, "\n".join(current_lines), [title for _, title in path]
+
+    def markdown_to_tups(self, markdown_text: str) -> list[tuple[Optional[str], str]]:
+        """Convert a markdown file to a dictionary.
+
+        The keys are the headers and the values are the text under each header.
+
+        """
+        return [(header, value) for header, value, _ in self.iter_sections(markdown_text.split("\n"))]
 
     def remove_images(self, content: str) -> str:
         """Get a dictionary of a markdown file from its path."""
-        pattern = r"!{1}\[\[(.*)\]\]"
-        content = re.sub(pattern, "", content)
-        return content
+        return IMAGE_PATTERN.sub("", content)
 
     def remove_hyperlinks(self, content: str) -> str:
         """Get a dictionary of a markdown file from its path."""
-        pattern = r"\[(.*?)\]\((.*?)\)"
-        content = re.sub(pattern, r"\1", content)
-        return content
+        return HYPERLINK_PATTERN.sub(r"\1", content)
 
-    def parse_tups(self, filepath: str) -> list[tuple[Optional[str], str]]:
+    def parse_tups(self, filepath: Union[str, Blob]) -> list[tuple[Optional[str], str]]:
         """Parse file into tuples."""
-        content = ""
-        try:
-            with open(filepath, encoding=self._encoding) as f:
-                content = f.read()
-        except UnicodeDecodeError as e:
-            if self._autodetect_encoding:
-                detected_encodings = detect_file_encodings(filepath)
-                for encoding in detected_encodings:
-                    try:
-                        with open(filepath, encoding=encoding.encoding) as f:
-                            content = f.read()
-                        break
-                    except UnicodeDecodeError:
-                        continue
-            else:
-                raise RuntimeError(f"Error loading {filepath}") from e
-        except Exception as e:
-            raise RuntimeError(f"Error loading {filepath}") from e
-
-        if self._remove_hyperlinks:
-            content = self.remove_hyperlinks(content)
+        blob = filepath if isinstance(filepath, Blob) else Blob.from_path(filepath)
+        return self.markdown_to_tups(self._read_content(blob))
 
-        if self._remove_images:
-            content = self.remove_images(content)
+    def _read_content(self, blob: Blob) -> str:
+        content, self._encoding = read_text(blob, self._encoding, self._autodetect_encoding)
+        return content
 
-        return self.markdown_to_tups(content)
+    def _clean_line(self, text: str) -> str:
+        if self._remove_hyperlinks and "](" in text:
+            text = self.remove_hyperlinks(text)
+        if self._remove_images and "![[" in text:
+            text = self.remove_images(text)
+        if "<" in text:
+            text = TAG_PATTERN.sub("", text)
+        return text
@@ -0,0 +1,144 @@
+"""OCR of the PDF pages without a text layer, with the local tesseract binary."""
+import concurrent.futures
+import hashlib
+import logging
+import os
+import subprocess
+import threading
+from collections import deque
+from collections.abc import Iterable, Iterator
+from typing import Callable, Optional
+
+from core.extensions.ext_cache import cache
+from core.extensions.ext_metrics import metrics
+from core.extractor.helpers import pdfium_lock
+from core.models.document import Document
+
+logger = logging.getLogger(__name__)
+
+PDF_OCR_ENABLED = os.environ.get('PDF_OCR_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+# pages with fewer non-whitespace characters in their text layer are taken for scanned images
+PDF_OCR_MIN_CHARS = int(os.environ.get('PDF_OCR_MIN_CHARS', 16))
+PDF_OCR_DPI = int(os.environ.get('PDF_OCR_DPI', 300))
+PDF_OCR_LANGUAGES = os.environ.get('PDF_OCR_LANGUAGES', 'eng')
+PDF_OCR_WORKERS = int(os.environ.get('PDF_OCR_WORKERS', os.cpu_count() or 1))
+PDF_OCR_TIMEOUT = int(os.environ.get('PDF_OCR_TIMEOUT', 120))
+TESSERACT_CMD = os.environ.get('TESSERACT_CMD', 'tesseract')
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Return the thread pool shared by all OCR runs, every thread waits on a tesseract process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, PDF_OCR_WORKERS),
+                                                              thread_name_prefix='pdf-ocr')
+        return _executor
+
+
+def needs_ocr(content: str, min_chars: int = PDF_OCR_MIN_CHARS) -> bool:
+    """Whether the text layer of a page is too short for a digital page."""
+    return len(''.join(content.split())) < min_chars
+
+
+def ocr_image(image: bytes, languages: str = PDF_OCR_LANGUAGES, timeout: int = PDF_OCR_TIMEOUT) -> str:
+    """Recognize the text of an encoded image with tesseract, which runs offline in a process of its own."""
+    # a single thread per process, the parallelism comes from the worker pool
+    result = subprocess.run([TESSERACT_CMD, 'stdin', 'stdout', '-l', languages], input=image, capture_output=True,
+                            timeout=timeout, env={**os.environ, 'OMP_THREAD_LIMIT': '1'})
+    if result.returncode != 0:
+        raise RuntimeError(f"tesseract exited with {result.returncode}: {result.stderr.decode('utf-8', 'replace')}")
+    return result.stdout.decode('utf-8')
+
+
+def page_fingerprint(pdf_file, page_number: int, content: str) -> str:
+    """Identify the look of a scanned page from the raw data of its images, without decoding or rendering them."""
+    import pypdfium2.raw as pdfium_c
+
+    fingerprint = hashlib.sha256(content.encode('utf-8'))
+    with pdfium_lock:
+        page = pdf_file[page_number]
+        try:
+            fingerprint.update(repr(page.get_size()).encode('ascii'))
+            for image in page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_IMAGE,), max_depth=2):
+                fingerprint.update(repr(image.get_pos()).encode('ascii'))
+                fingerprint.update(bytes(image.get_data(decode_simple=False)))
+        finally:
+            page.close()
+    return fingerprint.hexdigest()
+
+
+def ocr_pages(documents: Iterable[Document], open_pdf: Callable, dpi: int = PDF_OCR_DPI,
+              min_chars: int = PDF_OCR_MIN_CHARS) -> Iterator[Document]:
+    """Replace the content of the page documents without a text layer by their OCR text, keeping the page order.
+
+    Only the pages detected by `needs_ocr` are rendered, the PDF is opened with `open_pdf` when the first one
+    is found, and they are recognized on the shared worker pool while the next pages are extracted. Digital
+    pages are yielded as they come as long as no OCR page is pending before them. Pages whose OCR fails keep
+    their original content.
+
+    When the result cache is enabled, the text of every page is cached by `page_fingerprint`, so that the
+    unchanged pages of a new version of a scanned document are neither rendered nor recognized again.
+
+    Args:
+        documents: The page documents, with the index of their page in the `page` meta.
+        open_pdf: Opens the PDF as a pypdfium2 document.
+        dpi: The resolution the pages are rendered at.
+        min_chars: See `needs_ocr`.
+    """
+    from lib.pdf import render_page
+
+    executor = _get_executor()
+    max_pending = 4 * max(1, PDF_OCR_WORKERS)
+    pending: deque[tuple[Document, Optional[concurrent.futures.Future], Optional[str]]] = deque()
+    pdf_file = None
+
+    def merge(document: Document, future: Optional[concurrent.futures.Future], cache_key: Optional[str]) \
+            -> Document:
+        if future is None:
+            return document
+        try:
+            with metrics.stage('ocr'):
+                text = future.result()
+        except Exception:
+            logger.warning('failed to ocr page %s of %s', document.meta.get('page'), document.meta.get('source'),
+                           exc_info=True)
+            return document
+        if cache_key is not None:
+            cache.set(cache_key, text.encode('utf-8'))
+        return Document(content=text, meta={**document.meta, 'ocr': True})
+
+    try:
+        for document in documents:
+            future, cache_key = None, None
+            if needs_ocr(document.content, min_chars):
+                if pdf_file is None:
+                    pdf_file = open_pdf()
+                page_number = document.meta['page']
+                cached = None
+                if cache.enabled:
+                    fingerprint = page_fingerprint(pdf_file, page_number, document.content)
+                    cache_key = f'ocr-{fingerprint}-{dpi}-{PDF_OCR_LANGUAGES}'
+                    cached = cache.get(cache_key)
+                if cached is not None:
+                    future, cache_key = concurrent.futures.Future(), None
+                    future.set_result(cached.decode('utf-8'))
+                else:
+                    future = executor.submit(ocr_image, render_page(pdf_file, page_number, dpi, 'png'))
+            pending.append((document, future, cache_key))
+
+            while pending and (pending[0][1] is None or pending[0][1].done() or len(pending) > max_pending):
+                yield merge(*pending.popleft())
+
+        while pending:
+            yield merge(*pending.popleft())
+    finally:
+        for _, future, _ in pending:
+            if future is not None:
+                future.cancel()
+        if pdf_file is not None:
+            with pdfium_lock:
+                pdf_file.close()
@@ -1,11 +1,71 @@
 """Abstract interface for document loader implementations."""
+import os
 from collections.abc import Iterator
 from typing import Optional
 
 from core.extractor.blod.blod import Blob
 from core.extractor.extractor_base import BaseExtractor
+from core.extractor.helpers import get_process_pool, pdfium_lock
+from core.extractor.ocr import PDF_OCR_DPI, PDF_OCR_ENABLED, PDF_OCR_LANGUAGES, PDF_OCR_MIN_CHARS, ocr_pages
 from core.models.document import Document
-from core.extensions.ext_storage import storage
+
+PDF_PARALLEL_WORKERS = int(os.environ.get('PDF_PARALLEL_WORKERS', 0))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 64))
+PDF_PARALLEL_PAGES_PER_TASK = int(os.environ.get('PDF_PARALLEL_PAGES_PER_TASK', 16))
+
+
+def parse_pages(pages: str, max_pages: Optional[int] = None) -> list[tuple[int, Optional[int]]]:
+    """Parse a page selection such as `1-10,15`, pages are numbered from 1 and `20-` runs to the last page.
+
+    Returns:
+        The ranges [start, stop) of 0-based page indexes, stop is None for ranges running to the last page.
+
+    Raises:
+        ValueError: when the selection or `max_pages` is invalid.
+    """
+    if max_pages is not None and max_pages < 1:
+        raise ValueError(f'max_pages must be positive, got {max_pages}')
+
+    ranges = []
+    for part in pages.split(','):
+        if not part.strip():
+            continue
+        first, dash, last = (value.strip() for value in part.partition('-'))
+        try:
+            start = int(first) if first else 1
+            stop = int(last) if last else (None if dash else start)
+        except ValueError:
+            raise ValueError(f'Invalid page range {part.strip()!r}, expected pages like 1-10,15') from None
+        if start < 1 or (stop is not None and stop < start):
+            raise ValueError(f'Invalid page range {part.strip()!r}, expected pages like 1-10,15')
+        ranges.append((start - 1, stop))
+    return ranges
+
+
+def select_pages(ranges: list[tuple[int, Optional[int]]], max_pages: Optional[int], page_count: int) -> list[int]:
+    """Return the indexes of the pages selected by `parse_pages` in document order, pages past the end are ignored."""
+    selected = set()
+    for start, stop in ranges or [(0, None)]:
+        selected.update(range(start, page_count if stop is None else min(stop, page_count)))
+    return sorted(selected)[:max_pages]
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> list[str]:
+    """Extract the text of pages [start, stop) in a worker process with its own document handle."""
+    import pypdfium2
+
+    pdf_reader = pypdfium2.PdfDocument(file_path)
+    try:
+        texts = []
+        for page_number in range(start, stop):
+            page = pdf_reader[page_number]
+            text_page = page.get_textpage()
+            texts.append(text_page.get_text_range())
+            text_page.close()
+            page.close()
+        return texts
+    finally:
+        pdf_reader.close()
 
 
 class PdfExtractor(BaseExtractor):
@@ -14,59 +74,126 @@ class PdfExtractor(BaseExtractor):
 
     Args:
         file_path: Path to the file to load.
+        parallel_workers: Number of worker processes used to extract pages in parallel,
+            values below 2 disable parallel extraction.
+        parallel_min_pages: Minimum page count of a document before switching to parallel extraction.
+        blob: In-memory content of the file, when given the file path is only used as the source.
+        pages: Pages to extract, e.g. `1-10,15`, all pages when empty, see `parse_pages`.
+        max_pages: Maximum number of pages to extract, the first ones of the selection are kept.
+        ocr: Whether pages without a text layer are recognized with tesseract, see core.extractor.ocr.
     """
 
+    supports_blob = True
+    supports_pages = True
+
     def __init__(
             self,
             file_path: str,
-            file_cache_key: Optional[str] = None
+            parallel_workers: int = PDF_PARALLEL_WORKERS,
+            parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES,
+            blob: Optional[Blob] = None,
+            pages: str = '',
+            max_pages: Optional[int] = None,
+            ocr: bool = PDF_OCR_ENABLED,
     ):
         """Initialize with file path."""
         self._file_path = file_path
-        self._file_cache_key = file_cache_key
+        self._blob = blob
+        self._parallel_workers = parallel_workers
+        self._parallel_min_pages = parallel_min_pages
+        self._ocr = ocr
+        self.select_pages(pages, max_pages)
+
+    @property
+    def cache_tag(self) -> str:
+        return f'ocr-{PDF_OCR_MIN_CHARS}-{PDF_OCR_DPI}-{PDF_OCR_LANGUAGES}' if self._ocr else ''
+
+    def select_pages(self, pages: str = '', max_pages: Optional[int] = None):
+        self._page_ranges = parse_pages(pages, max_pages)
+        self._max_pages = max_pages
 
     def extract(self) -> list[Document]:
-        plaintext_file_key = ''
-        plaintext_file_exists = False
-        if self._file_cache_key:
-            try:
-                text = storage.load(self._file_cache_key).decode('utf-8')
-                plaintext_file_exists = True
-                return [Document(content=text)]
-            except FileNotFoundError:
-                pass
-        documents = list(self.load())
-        text_list = []
-        for document in documents:
-            text_list.append(document.content)
-        text = "\n\n".join(text_list)
-
-        # save plaintext file for caching
-        if not plaintext_file_exists and plaintext_file_key:
-            storage.save(plaintext_file_key, text.encode('utf-8'))
-
-        return documents
+        return list(self.load())
 
     def load(
             self,
     ) -> Iterator[Document]:
         """Lazy load given path as pages."""
-        blob = Blob.from_path(self._file_path)
-        yield from self.parse(blob)
+        blob = self._blob if self._blob is not None else Blob.from_path(self._file_path)
+        if self._ocr:
+            yield from ocr_pages(self.parse(blob), lambda: self._open_document(blob))
+        else:
+            yield from self.parse(blob)
+
+    @staticmethod
+    def _open_document(blob: Blob):
+        import pypdfium2
+
+        if blob.data is None and blob.opener is None:
+            with pdfium_lock:
+                return pypdfium2.PdfDocument(str(blob.path))
+        data = blob.as_bytes()
+        with pdfium_lock:
+            return pypdfium2.PdfDocument(data)
 
     def parse(self, blob: Blob) -> Iterator[Document]:
         """Lazily parse the blob."""
         import pypdfium2
 
         with blob.as_bytes_io() as file_path:
-            pdf_reader = pypdfium2.PdfDocument(file_path, autoclose=True)
+            # the lock is never held while a document is yielded
+            with pdfium_lock:
+                pdf_reader = pypdfium2.PdfDocument(file_path, autoclose=True)
             try:
-                for page_number, page in enumerate(pdf_reader):
-                    text_page = page.get_textpage()
-                    content = text_page.get_text_range()
-                    text_page.close()
-                    page.close()
+                # pages are only loaded when accessed, the pages left out are never opened
+                with pdfium_lock:
+                    page_numbers = select_pages(self._page_ranges, self._max_pages, len(pdf_reader))
+                if self._should_parallelize(blob, len(page_numbers)):
+                    # the workers open the file on their own, it is not kept open while they run
+                    with pdfium_lock:
+                        pdf_reader.close()
+                    pdf_reader = None
+                    yield from self._parse_parallel(blob, page_numbers)
+                    return
+
+                for page_number in page_numbers:
+                    with pdfium_lock:
+                        page = pdf_reader[page_number]
+                        text_page = page.get_textpage()
+                        content = text_page.get_text_range()
+                        text_page.close()
+                        page.close()
                     meta = {"source": blob.source, "page": page_number}
                     yield Document(content=content, meta=meta)
             finally:
-                pdf_reader.close()
+                if pdf_reader is not None:
+                    with pdfium_lock:
+                        pdf_reader.close()
+
+    def _should_parallelize(self, blob: Blob, page_count: int) -> bool:
+        # workers open the file on their own, so in-memory blobs are always parsed serially
+        return (self._parallel_workers > 1 and blob.data is None and blob.opener is None
+                and blob.path is not None and page_count >= self._parallel_min_pages)
+
+    def _parse_parallel(self, blob: Blob, page_numbers: list[int]) -> Iterator[Document]:
+        """Split the selected pages across the process pool and yield them back in order."""
+        executor = get_process_pool(self._parallel_workers)
+        pages_per_task = max(1, min(PDF_PARALLEL_PAGES_PER_TASK, -(-len(page_numbers) // self._parallel_workers)))
+        # tasks cover runs of consecutive pages
+        tasks, start = [], None
+        for i, page_number in enumerate(page_numbers):
+            if start is None:
+                start = page_number
+            stop = page_number + 1
+            if stop - start >= pages_per_task or i + 1 == len(page_numbers) or page_numbers[i + 1] != stop:
+                tasks.append((start, stop))
+                start = None
+        futures = [(start, executor.submit(_extract_page_range, str(blob.path), start, stop)) for start, stop in tasks]
+        try:
+            for start, future in futures:
+                for offset, content in enumerate(future.result()):
+                    meta = {"source": blob.source, "page": start + offset}
+                    yield Document(content=content, meta=meta)
+        finally:
+            for _, future in futures:
+                future.cancel()
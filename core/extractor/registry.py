@@ -0,0 +1,221 @@
+"""Registry mapping file extensions and mime types to extractor factories."""
+import importlib
+import logging
+import os
+import zipfile
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Optional
+
+from core.extractor.blod.blod import Blob
+from core.extractor.csv_extractor import CSVExtractor
+from core.extractor.excel_extractor import ExcelExtractor
+from core.extractor.extractor_base import BaseExtractor
+from core.extractor.html_extractor import HtmlExtractor
+from core.extractor.markdown_extractor import MarkdownExtractor
+from core.extractor.pdf_extractor import PdfExtractor
+from core.extractor.text_extractor import TextExtractor
+from core.extractor.unstructured.unstructured_doc_extractor import UnstructuredWordExtractor
+from core.extractor.unstructured.unstructured_eml_extractor import UnstructuredEmailExtractor
+from core.extractor.unstructured.unstructured_markdown_extractor import UnstructuredMarkdownExtractor
+from core.extractor.unstructured.unstructured_msg_extractor import UnstructuredMsgExtractor
+from core.extractor.unstructured.unstructured_ppt_extractor import UnstructuredPPTExtractor
+from core.extractor.unstructured.unstructured_pptx_extractor import UnstructuredPPTXExtractor
+from core.extractor.unstructured.unstructured_text_extractor import UnstructuredTextExtractor
+from core.extractor.unstructured.unstructured_xml_extractor import UnstructuredXmlExtractor
+from core.extractor.word_extractor import WordExtractor
+
+logger = logging.getLogger(__name__)
+
+ETL_TYPE_DEFAULT = ''
+ETL_TYPE_UNSTRUCTURED = 'Unstructured'
+
+# extension used when no factory is registered for the extension of a file
+FALLBACK_EXTENSION = ''
+
+UNSTRUCTURED_API_URL = os.environ.get('UNSTRUCTURED_API_URL')
+# maximum size of the chunks the unstructured extractors combine elements into, see chunk_by_title
+UNSTRUCTURED_CHUNK_MAX_CHARACTERS = int(os.environ.get('UNSTRUCTURED_CHUNK_MAX_CHARACTERS', 2000))
+
+# number of leading bytes inspected when detecting the type of a file from its content
+SNIFF_BYTES = 2048
+
+# office open xml documents are zip archives, their type is told apart by the top level folder
+OOXML_FOLDER_MIMETYPES = {
+    'word/': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'xl/': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'ppt/': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+}
+
+ExtractorFactory = Callable[[str, Optional[Blob], bool], BaseExtractor]
+"""Builds an extractor from the file path, the optional in-memory blob and the is_automatic flag."""
+
+
+class ExtractorRegistry:
+    """
+    Maps file extensions to extractor factories, per etl type.
+
+    An etl type only has to register the extensions it handles differently, lookups fall back to the
+    default etl type, and then to the fallback extension. Mime types are mapped to extensions, so that
+    files with a missing or unknown suffix can be dispatched by their detected content type.
+    """
+
+    def __init__(self):
+        self._factories: dict[str, dict[str, ExtractorFactory]] = {}
+        self._mimetypes: dict[str, str] = {}
+
+    def register(self, extensions: Iterable[str], factory: ExtractorFactory,
+                 mimetypes: Iterable[str] = (), etl_type: str = ETL_TYPE_DEFAULT):
+        """
+        Register a factory for the given extensions.
+
+        Args:
+            extensions: Lower case extensions including the leading dot, FALLBACK_EXTENSION registers
+                the factory for files no other factory matches.
+            factory: Builds the extractor, see ExtractorFactory.
+            mimetypes: Mime types mapped to the first extension, used for content based detection.
+            etl_type: The etl type the factory is registered for.
+        """
+        extensions = list(extensions)
+        factories = self._factories.setdefault(etl_type, {})
+        for extension in extensions:
+            factories[extension] = factory
+        for mimetype in mimetypes:
+            self._mimetypes[mimetype] = extensions[0]
+
+    def is_registered(self, extension: str) -> bool:
+        return any(extension in factories for factories in self._factories.values())
+
+    def extension_for_mimetype(self, mimetype: Optional[str]) -> Optional[str]:
+        if not mimetype:
+            return None
+        return self._mimetypes.get(mimetype.split(';')[0].strip().lower())
+
+    def resolve_extension(self, file_path: str, blob: Optional[Blob] = None) -> str:
+        """
+        Return the extension used for dispatching a file. The suffix of the file path is trusted when an
+        extractor is registered for it, otherwise the type is detected from the blob mime type or the content.
+        """
+        extension = Path(file_path).suffix.lower()
+        if extension and self.is_registered(extension):
+            return extension
+
+        detected = self.extension_for_mimetype(blob.mimetype if blob is not None else None)
+        if detected is None:
+            detected = self.extension_for_mimetype(self._sniff_mimetype(file_path, blob))
+
+        return detected or extension
+
+    def create(self, etl_type: str, file_path: str, is_automatic: bool = False,
+               blob: Optional[Blob] = None) -> BaseExtractor:
+        extension = self.resolve_extension(file_path, blob)
+        factory = self._lookup(etl_type, extension) or self._lookup(etl_type, FALLBACK_EXTENSION)
+        if factory is None:
+            raise ValueError(f"No extractor registered for {file_path}")
+
+        return factory(file_path, blob, is_automatic)
+
+    def _lookup(self, etl_type: str, extension: str) -> Optional[ExtractorFactory]:
+        for factories in (self._factories.get(etl_type, {}), self._factories.get(ETL_TYPE_DEFAULT, {})):
+            if extension in factories:
+                return factories[extension]
+        return None
+
+    @staticmethod
+    def _sniff_mimetype(file_path: str, blob: Optional[Blob]) -> Optional[str]:
+        try:
+            import magic
+        except ImportError:
+            return None
+
+        try:
+            source = blob if blob is not None else Blob.from_path(file_path)
+            with source.as_bytes_io() as f:
+                mimetype = magic.from_buffer(f.read(SNIFF_BYTES), mime=True)
+                if mimetype == 'application/zip':
+                    f.seek(0)
+                    with zipfile.ZipFile(f) as archive:
+                        for name in archive.namelist():
+                            for folder, ooxml_mimetype in OOXML_FOLDER_MIMETYPES.items():
+                                if name.startswith(folder):
+                                    return ooxml_mimetype
+            return mimetype
+        except Exception:
+            logger.debug('failed to detect the mime type of %s', file_path, exc_info=True)
+            return None
+
+
+def _register_builtin(registry: ExtractorRegistry):
+    api_url = UNSTRUCTURED_API_URL
+    max_characters = UNSTRUCTURED_CHUNK_MAX_CHARACTERS
+
+    registry.register(
+        ['.xlsx'], lambda file_path, blob, is_automatic: ExcelExtractor(file_path, blob=blob),
+        mimetypes=['application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'])
+    registry.register(
+        ['.pdf'], lambda file_path, blob, is_automatic: PdfExtractor(file_path, blob=blob),
+        mimetypes=['application/pdf'])
+    registry.register(
+        ['.md', '.markdown'],
+        lambda file_path, blob, is_automatic: MarkdownExtractor(file_path, autodetect_encoding=True, blob=blob),
+        mimetypes=['text/markdown', 'text/x-markdown'])
+    registry.register(
+        ['.htm', '.html'], lambda file_path, blob, is_automatic: HtmlExtractor(file_path, blob=blob),
+        mimetypes=['text/html', 'application/xhtml+xml'])
+    registry.register(
+        ['.docx'], lambda file_path, blob, is_automatic: WordExtractor(file_path, blob=blob),
+        mimetypes=['application/vnd.openxmlformats-officedocument.wordprocessingml.document'])
+    registry.register(
+        ['.csv'], lambda file_path, blob, is_automatic: CSVExtractor(file_path, autodetect_encoding=True, blob=blob),
+        mimetypes=['text/csv'])
+    registry.register(
+        ['.txt', FALLBACK_EXTENSION],
+        lambda file_path, blob, is_automatic: TextExtractor(file_path, autodetect_encoding=True, blob=blob),
+        mimetypes=['text/plain'])
+
+    registry.register(
+        ['.md', '.markdown'],
+        lambda file_path, blob, is_automatic:
+        UnstructuredMarkdownExtractor(file_path, api_url, max_characters) if is_automatic
+        else MarkdownExtractor(file_path, autodetect_encoding=True, blob=blob),
+        etl_type=ETL_TYPE_UNSTRUCTURED)
+    registry.register(
+        ['.docx'], lambda file_path, blob, is_automatic: UnstructuredWordExtractor(file_path, api_url, max_characters),
+        etl_type=ETL_TYPE_UNSTRUCTURED)
+    registry.register(
+        ['.msg'], lambda file_path, blob, is_automatic: UnstructuredMsgExtractor(file_path, api_url, max_characters),
+        mimetypes=['application/vnd.ms-outlook'], etl_type=ETL_TYPE_UNSTRUCTURED)
+    registry.register(
+        ['.eml'], lambda file_path, blob, is_automatic: UnstructuredEmailExtractor(file_path, api_url, max_characters),
+        mimetypes=['message/rfc822'], etl_type=ETL_TYPE_UNSTRUCTURED)
+    registry.register(
+        ['.ppt'], lambda file_path, blob, is_automatic: UnstructuredPPTExtractor(file_path, api_url),
+        mimetypes=['application/vnd.ms-powerpoint'], etl_type=ETL_TYPE_UNSTRUCTURED)
+    registry.register(
+        ['.pptx'], lambda file_path, blob, is_automatic: UnstructuredPPTXExtractor(file_path, api_url),
+        mimetypes=['application/vnd.openxmlformats-officedocument.presentationml.presentation'],
+        etl_type=ETL_TYPE_UNSTRUCTURED)
+    registry.register(
+        ['.xml'], lambda file_path, blob, is_automatic: UnstructuredXmlExtractor(file_path, api_url, max_characters),
+        mimetypes=['application/xml', 'text/xml'], etl_type=ETL_TYPE_UNSTRUCTURED)
+    registry.register(
+        ['.txt', FALLBACK_EXTENSION],
+        lambda file_path, blob, is_automatic:
+        UnstructuredTextExtractor(file_path, api_url, max_characters) if is_automatic
+        else TextExtractor(file_path, autodetect_encoding=True, blob=blob),
+        etl_type=ETL_TYPE_UNSTRUCTURED)
+
+
+def _load_plugins(registry: ExtractorRegistry):
+    """
+    Load the plugin modules listed in EXTRACTOR_PLUGINS (comma separated), each of them must define a
+    `register(registry: ExtractorRegistry)` function adding its factories.
+    """
+    for module_name in filter(None, (name.strip() for name in os.environ.get('EXTRACTOR_PLUGINS', '').split(','))):
+        module = importlib.import_module(module_name)
+        module.register(registry)
+
+
+registry = ExtractorRegistry()
+_register_builtin(registry)
+_load_plugins(registry)
@@ -1,8 +1,9 @@
 """Abstract interface for document loader implementations."""
 from typing import Optional
 
+from core.extractor.blod.blod import Blob
 from core.extractor.extractor_base import BaseExtractor
-from core.extractor.helpers import detect_file_encodings
+from core.extractor.helpers import read_text
 from core.models.document import Document
 
 
@@ -12,37 +13,30 @@ class TextExtractor(BaseExtractor):
 
     Args:
         file_path: Path to the file to load.
+        blob: In-memory content of the file, when given the file path is only used as the source.
     """
 
+    supports_blob = True
+
     def __init__(
             self,
             file_path: str,
             encoding: Optional[str] = None,
-            autodetect_encoding: bool = False
+            autodetect_encoding: bool = False,
+            blob: Optional[Blob] = None
     ):
         """Initialize with file path."""
         self._file_path = file_path
         self._encoding = encoding
         self._autodetect_encoding = autodetect_encoding
+        self._blob = blob if blob is not None else Blob.from_path(file_path)
 
     def extract(self) -> list[Document]:
         """Load from file path."""
-        text = ""
         try:
-            with open(self._file_path, encoding=self._encoding) as f:
-                text = f.read()
-        except UnicodeDecodeError as e:
-            if self._autodetect_encoding:
-                detected_encodings = detect_file_encodings(self._file_path)
-                for encoding in detected_encodings:
-                    try:
-                        with open(self._file_path, encoding=encoding.encoding) as f:
-                            text = f.read()
-                        break
-                    except UnicodeDecodeError:
-                        continue
-            else:
-                raise RuntimeError(f"Error loading {self._file_path}") from e
+            text, self._encoding = read_text(self._blob, self._encoding, self._autodetect_encoding)
+        except RuntimeError:
+            raise
         except Exception as e:
             raise RuntimeError(f"Error loading {self._file_path}") from e
 
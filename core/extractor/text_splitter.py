@@ -0,0 +1,269 @@
+"""Splitters chunking extracted documents for retrieval, they run on the documents after the extraction."""
+import asyncio
+import functools
+import os
+import re
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, Callable, Optional
+
+from core.extractor.entity.extract_setting import ExtractSetting
+from core.extractor.markdown_extractor import FENCE_PATTERN, HEADER_MARKS_PATTERN, HEADER_PATTERN
+from core.models.document import BaseDocumentTransformer, Document
+
+SPLITTER_RECURSIVE = 'recursive'
+SPLITTER_MARKDOWN = 'markdown'
+SPLITTER_TOKEN = 'token'
+
+SPLIT_CHUNK_SIZE = int(os.environ.get('SPLIT_CHUNK_SIZE', 1000))
+SPLIT_CHUNK_OVERLAP = int(os.environ.get('SPLIT_CHUNK_OVERLAP', 200))
+# `regex` or the name of a tiktoken encoding whose file is available offline, e.g. cl100k_base
+SPLIT_TOKENIZER = os.environ.get('SPLIT_TOKENIZER', 'regex')
+
+DEFAULT_SEPARATORS = ['\n\n', '\n', ' ', '']
+
+# CJK characters are a token each, other words are cut every 8 letters, BPE vocabularies split long words too
+CJK_CHARS = r'\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+TOKEN_PATTERN = re.compile(
+    rf"'(?:[sdmt]|ll|ve|re)|[{CJK_CHARS}]| ?[^\W\d_{CJK_CHARS}]{{1,8}}| ?\d{{1,3}}| ?[^\s\w]+|\s+(?!\S)|\s+|.",
+    re.S)
+
+
+class TextSplitter(BaseDocumentTransformer, ABC):
+    """Split the content of documents into chunks of at most `chunk_size`, consecutive chunks share up to
+    `chunk_overlap` of their content.
+
+    Every chunk keeps the meta of its document, with the position of the chunk in the document added as `chunk`.
+    """
+
+    def __init__(self, chunk_size: int = SPLIT_CHUNK_SIZE, chunk_overlap: int = SPLIT_CHUNK_OVERLAP):
+        if chunk_size <= 0:
+            raise ValueError(f'chunk_size must be positive, got {chunk_size}')
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(f'chunk_overlap must be between 0 and chunk_size, got {chunk_overlap}')
+        self._chunk_size = chunk_size
+        self._chunk_overlap = chunk_overlap
+
+    @abstractmethod
+    def split_text(self, text: str) -> list[str]:
+        """Split a text into chunks."""
+
+    def split_document(self, document: Document) -> Iterator[Document]:
+        for i, chunk in enumerate(self.split_text(document.content)):
+            yield Document(content=chunk, meta={**(document.meta or {}), 'chunk': i})
+
+    def iter_transform(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Lazily split documents, chunks are produced as soon as their document is."""
+        for document in documents:
+            yield from self.split_document(document)
+
+    def transform_documents(self, documents: Sequence[Document], **kwargs: Any) -> Sequence[Document]:
+        return list(self.iter_transform(documents))
+
+    async def atransform_documents(self, documents: Sequence[Document], **kwargs: Any) -> Sequence[Document]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.transform_documents, documents)
+
+    def _merge(self, splits: list[str], lengths: list[int], separator: str, separator_length: int) -> list[str]:
+        """Merge consecutive splits shorter than the chunk size into chunks, repeating the last splits of
+        a chunk at the start of the next one as overlap."""
+        chunks = []
+        current: deque[int] = deque()
+        total = 0
+        for i, length in enumerate(lengths):
+            if current and total + separator_length + length > self._chunk_size:
+                chunks.append(separator.join(splits[j] for j in current))
+                # drop splits from the front until what is left fits the overlap and the next split
+                while current and (total > self._chunk_overlap
+                                   or total + separator_length + length > self._chunk_size):
+                    total -= lengths[current.popleft()] + (separator_length if current else 0)
+            total += length + (separator_length if current else 0)
+            current.append(i)
+        if current:
+            chunks.append(separator.join(splits[j] for j in current))
+        return [chunk for chunk in (chunk.strip() for chunk in chunks) if chunk]
+
+
+class RecursiveCharacterTextSplitter(TextSplitter):
+    """Split texts on the first separator that keeps chunks under the chunk size, paragraphs first, then
+    lines, then words, and finally characters.
+
+    Args:
+        chunk_size: Maximum length of a chunk, as measured by `length_function`.
+        chunk_overlap: Maximum length shared by two consecutive chunks.
+        separators: Separators tried in order, the empty string splits between characters.
+        length_function: Measures the length of a text, the number of characters by default.
+    """
+
+    def __init__(self, chunk_size: int = SPLIT_CHUNK_SIZE, chunk_overlap: int = SPLIT_CHUNK_OVERLAP,
+                 separators: Optional[list[str]] = None, length_function: Callable[[str], int] = len):
+        super().__init__(chunk_size, chunk_overlap)
+        self._separators = separators or DEFAULT_SEPARATORS
+        self._length = length_function
+
+    def split_text(self, text: str) -> list[str]:
+        if self._length(text) <= self._chunk_size:
+            text = text.strip()
+            return [text] if text else []
+        return self._split(text, self._separators)
+
+    def _split(self, text: str, separators: list[str]) -> list[str]:
+        separator, remaining = separators[-1], []
+        for i, candidate in enumerate(separators):
+            if candidate == '' or candidate in text:
+                separator, remaining = candidate, separators[i + 1:]
+                break
+
+        if separator == '' and self._length is len:
+            step = self._chunk_size - self._chunk_overlap
+            return [text[i:i + self._chunk_size] for i in range(0, max(len(text) - self._chunk_overlap, 1), step)]
+
+        splits = text.split(separator) if separator else list(text)
+        separator_length = self._length(separator)
+        chunks, pending, pending_lengths = [], [], []
+        for split in splits:
+            length = self._length(split)
+            if length <= self._chunk_size:
+                pending.append(split)
+                pending_lengths.append(length)
+                continue
+
+            if pending:
+                chunks.extend(self._merge(pending, pending_lengths, separator, separator_length))
+                pending, pending_lengths = [], []
+            if remaining:
+                chunks.extend(self._split(split, remaining))
+            else:
+                chunks.append(split)
+        if pending:
+            chunks.extend(self._merge(pending, pending_lengths, separator, separator_length))
+        return chunks
+
+
+class MarkdownHeaderTextSplitter(TextSplitter):
+    """Split markdown texts into their header sections, sections longer than the chunk size are split
+    further with the recursive splitter.
+
+    Chunks start with the header of their section, the titles of the enclosing headers are kept in the
+    `header_path` meta. Headers inside fenced code blocks are ignored.
+    """
+
+    def __init__(self, chunk_size: int = SPLIT_CHUNK_SIZE, chunk_overlap: int = SPLIT_CHUNK_OVERLAP):
+        super().__init__(chunk_size, chunk_overlap)
+        self._recursive = RecursiveCharacterTextSplitter(chunk_size, chunk_overlap)
+
+    def split_text(self, text: str) -> list[str]:
+        return [chunk for _, section in self.iter_sections(text) for chunk in self._recursive.split_text(section)]
+
+    def split_document(self, document: Document) -> Iterator[Document]:
+        meta = document.meta or {}
+        parent_path = meta.get('header_path') or []
+        i = 0
+        for header_path, section in self.iter_sections(document.content):
+            if parent_path and header_path and header_path[0] == parent_path[-1]:
+                # the document is a section of the markdown extractor, starting with the header it is named after
+                header_path = parent_path[:-1] + header_path
+            else:
+                header_path = parent_path + header_path
+            for chunk in self._recursive.split_text(section):
+                yield Document(content=chunk, meta={**meta, 'header_path': header_path, 'chunk': i})
+                i += 1
+
+    @staticmethod
+    def iter_sections(text: str) -> Iterator[tuple[list[str], str]]:
+        """Split a markdown text at its headers, yielding the enclosing header titles and the text of every section."""
+        path: list[tuple[int, str]] = []
+        current: list[str] = []
+        fence = None
+        for line in text.split('\n'):
+            if line[:1] in ' `~' and (match := FENCE_PATTERN.match(line)):
+                marker = match.group(1)
+                if fence is None:
+                    fence = marker
+                elif marker[0] == fence[0] and len(marker) >= len(fence):
+                    fence = None
+            elif fence is None and line.startswith('#') and (match := HEADER_PATTERN.match(line)):
+                if current:
+                    yield [title for _, title in path], '\n'.join(current)
+                level = len(match.group(1))
+                while path and path[-1][0] >= level:
+                    path.pop()
+                path.append((level, HEADER_MARKS_PATTERN.sub('', line)))
+                current = []
+            current.append(line)
+        if current:
+            yield [title for _, title in path], '\n'.join(current)
+
+
+class RegexTokenizer:
+    """A tokenizer that needs no vocabulary, approximating the token counts of BPE tokenizers."""
+
+    def encode(self, text: str) -> list[str]:
+        return TOKEN_PATTERN.findall(text)
+
+    def decode(self, tokens: list[str]) -> str:
+        return ''.join(tokens)
+
+
+class TokenTextSplitter(TextSplitter):
+    """Split texts into windows of at most `chunk_size` tokens, overlapping by `chunk_overlap` tokens.
+
+    Args:
+        chunk_size: Maximum number of tokens of a chunk.
+        chunk_overlap: Number of tokens shared by two consecutive chunks.
+        tokenizer: Any object with `encode(text)` and `decode(tokens)` methods, tiktoken encodings
+            included, defaults to the SPLIT_TOKENIZER one.
+    """
+
+    def __init__(self, chunk_size: int = SPLIT_CHUNK_SIZE, chunk_overlap: int = SPLIT_CHUNK_OVERLAP,
+                 tokenizer=None):
+        super().__init__(chunk_size, chunk_overlap)
+        self._tokenizer = tokenizer or get_tokenizer(SPLIT_TOKENIZER)
+
+    def split_text(self, text: str) -> list[str]:
+        tokens = self._tokenizer.encode(text)
+        step = self._chunk_size - self._chunk_overlap
+        chunks = []
+        for start in range(0, max(len(tokens) - self._chunk_overlap, 1), step):
+            chunk = self._tokenizer.decode(tokens[start:start + self._chunk_size]).strip()
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+
+@functools.lru_cache(maxsize=None)
+def get_tokenizer(name: str):
+    """Return the tokenizer of a name, `regex` or a tiktoken encoding (requires tiktoken and its encoding file)."""
+    if name == 'regex':
+        return RegexTokenizer()
+
+    import tiktoken
+
+    return tiktoken.get_encoding(name)
+
+
+SPLITTERS = {
+    SPLITTER_RECURSIVE: RecursiveCharacterTextSplitter,
+    SPLITTER_MARKDOWN: MarkdownHeaderTextSplitter,
+    SPLITTER_TOKEN: TokenTextSplitter,
+}
+
+
+def create_splitter(name: str, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) \
+        -> TextSplitter:
+    """Build a splitter by its name, raising ValueError for unknown names and invalid sizes."""
+    if name not in SPLITTERS:
+        raise ValueError(f'Unknown splitter {name}, expected one of {", ".join(SPLITTERS)}')
+
+    chunk_size = SPLIT_CHUNK_SIZE if chunk_size is None else chunk_size
+    if chunk_overlap is None:
+        # the default overlap must not exceed a small requested chunk size
+        chunk_overlap = min(SPLIT_CHUNK_OVERLAP, chunk_size // 5)
+    return SPLITTERS[name](chunk_size, chunk_overlap)
+
+
+def from_setting(extract_setting: ExtractSetting) -> Optional[TextSplitter]:
+    """Build the splitter selected by the extract settings, None when the documents are not to be split."""
+    if not extract_setting.splitter:
+        return None
+    return create_splitter(extract_setting.splitter, extract_setting.chunkSize, extract_setting.chunkOverlap)
@@ -15,10 +15,12 @@ class UnstructuredWordExtractor(BaseExtractor):
             self,
             file_path: str,
             api_url: str,
+            max_characters: int = 2000,
     ):
         """Initialize with file path."""
         self._file_path = file_path
         self._api_url = api_url
+        self._max_characters = max_characters
 
     def extract(self) -> list[Document]:
         from unstructured.__version__ import __version__ as __unstructured_version__
@@ -53,7 +55,7 @@ class UnstructuredWordExtractor(BaseExtractor):
             elements = partition_docx(filename=self._file_path)
 
         from unstructured.chunking.title import chunk_by_title
-        chunks = chunk_by_title(elements, max_characters=2000, combine_text_under_n_chars=0)
+        chunks = chunk_by_title(elements, max_characters=self._max_characters, combine_text_under_n_chars=0)
         documents = []
         for chunk in chunks:
             text = chunk.text.strip()
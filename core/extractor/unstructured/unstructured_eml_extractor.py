@@ -1,9 +1,8 @@
 import base64
 import logging
 
-from bs4 import BeautifulSoup
-
 from core.extractor.extractor_base import BaseExtractor
+from core.extractor.html_engine import html_to_text
 from core.models.document import Document
 
 logger = logging.getLogger(__name__)
@@ -13,16 +12,20 @@ class UnstructuredEmailExtractor(BaseExtractor):
     """Load msg files.
     Args:
         file_path: Path to the file to load.
+
+        max_characters: Maximum number of characters of a chunk.
     """
 
     def __init__(
         self,
         file_path: str,
         api_url: str,
+        max_characters: int = 2000,
     ):
         """Initialize with file path."""
         self._file_path = file_path
         self._api_url = api_url
+        self._max_characters = max_characters
 
     def extract(self) -> list[Document]:
         from unstructured.partition.email import partition_email
@@ -37,13 +40,12 @@ class UnstructuredEmailExtractor(BaseExtractor):
                 element_text += '=' * padding_needed
 
                 element_decode = base64.b64decode(element_text)
-                soup = BeautifulSoup(element_decode.decode('utf-8'), 'html.parser')
-                element.text = soup.get_text()
+                element.text = html_to_text(element_decode.decode('utf-8'))
         except Exception:
             pass
 
         from unstructured.chunking.title import chunk_by_title
-        chunks = chunk_by_title(elements, max_characters=2000, combine_text_under_n_chars=0)
+        chunks = chunk_by_title(elements, max_characters=self._max_characters, combine_text_under_n_chars=0)
         documents = []
         for chunk in chunks:
             text = chunk.text.strip()
@@ -13,6 +13,8 @@ class UnstructuredMarkdownExtractor(BaseExtractor):
     Args:
         file_path: Path to the file to load.
 
+        max_characters: Maximum number of characters of a chunk.
+
         remove_hyperlinks: Whether to remove hyperlinks from the text.
 
         remove_images: Whether to remove images from the text.
@@ -28,17 +30,19 @@ class UnstructuredMarkdownExtractor(BaseExtractor):
         self,
         file_path: str,
         api_url: str,
+        max_characters: int = 2000,
     ):
         """Initialize with file path."""
         self._file_path = file_path
         self._api_url = api_url
+        self._max_characters = max_characters
 
     def extract(self) -> list[Document]:
         from unstructured.partition.md import partition_md
 
         elements = partition_md(filename=self._file_path, api_url=self._api_url)
         from unstructured.chunking.title import chunk_by_title
-        chunks = chunk_by_title(elements, max_characters=2000, combine_text_under_n_chars=0)
+        chunks = chunk_by_title(elements, max_characters=self._max_characters, combine_text_under_n_chars=0)
         documents = []
         for chunk in chunks:
             text = chunk.text.strip()
@@ -12,23 +12,27 @@ class UnstructuredTextExtractor(BaseExtractor):
 
     Args:
         file_path: Path to the file to load.
+
+        max_characters: Maximum number of characters of a chunk.
     """
 
     def __init__(
         self,
         file_path: str,
-        api_url: str
+        api_url: str,
+        max_characters: int = 2000,
     ):
         """Initialize with file path."""
         self._file_path = file_path
         self._api_url = api_url
+        self._max_characters = max_characters
 
     def extract(self) -> list[Document]:
         from unstructured.partition.text import partition_text
 
         elements = partition_text(filename=self._file_path, api_url=self._api_url)
         from unstructured.chunking.title import chunk_by_title
-        chunks = chunk_by_title(elements, max_characters=2000, combine_text_under_n_chars=0)
+        chunks = chunk_by_title(elements, max_characters=self._max_characters, combine_text_under_n_chars=0)
         documents = []
         for chunk in chunks:
             text = chunk.text.strip()
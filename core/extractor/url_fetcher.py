@@ -0,0 +1,158 @@
+"""Pooled http client downloading remote files to disk."""
+import os
+import re
+import threading
+import time
+from typing import NamedTuple, Optional
+from urllib.parse import unquote, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+URL_CONNECT_TIMEOUT = float(os.environ.get('URL_CONNECT_TIMEOUT', 5))
+URL_READ_TIMEOUT = float(os.environ.get('URL_READ_TIMEOUT', 30))
+URL_TOTAL_TIMEOUT = float(os.environ.get('URL_TOTAL_TIMEOUT', 120))
+URL_MAX_BYTES = int(os.environ.get('URL_MAX_BYTES', 100 * 1024 * 1024))
+URL_POOL_SIZE = int(os.environ.get('URL_POOL_SIZE', 10))
+
+# size of the chunks written to disk while downloading
+FETCH_CHUNK_BYTES = 64 * 1024
+# longest name of a downloaded file, the NAME_MAX of common file systems
+FILE_NAME_MAX_BYTES = 255
+FILE_EXTENSION_PATTERN = re.compile(r'\.[A-Za-z0-9]{1,16}')
+
+
+class FetchError(ValueError):
+    """Raised when a remote file cannot be downloaded, `status_code` is the matching http status to report."""
+
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FetchedFile(NamedTuple):
+    """The result of a download."""
+
+    file_path: Optional[str]
+    """The downloaded file, None when the remote file was not modified."""
+    mimetype: Optional[str]
+    """The mime type from the Content-Type header, without parameters."""
+    etag: Optional[str]
+    """The ETag header, sent back as If-None-Match on the next download."""
+    last_modified: Optional[str]
+    """The Last-Modified header, sent back as If-Modified-Since on the next download."""
+
+    @property
+    def not_modified(self) -> bool:
+        return self.file_path is None
+
+
+def local_file_name(url: str) -> str:
+    """
+    Name the downloaded file after the last segment of the url path.
+
+    Segments that are no valid file name, e.g. empty, `.`, `..` or too long, are replaced by `file`
+    with the extension of the segment kept, so that the extractor can still be chosen by it.
+    """
+    name = os.path.basename(unquote(urlparse(url).path))
+    if name not in ('', '.', '..') and '\0' not in name and len(name.encode('utf-8')) <= FILE_NAME_MAX_BYTES:
+        return name
+
+    extension = os.path.splitext(name)[1]
+    return 'file' + (extension if FILE_EXTENSION_PATTERN.fullmatch(extension) else '')
+
+
+class UrlFetcher:
+    """
+    Downloads remote files through a shared connection pool.
+
+    Downloads are streamed to disk in chunks and aborted once they exceed `max_bytes` or run longer than
+    `total_timeout`, so that slow or huge remote files cannot tie up a worker indefinitely.
+    """
+
+    def __init__(self, connect_timeout: float = URL_CONNECT_TIMEOUT, read_timeout: float = URL_READ_TIMEOUT,
+                 total_timeout: float = URL_TOTAL_TIMEOUT, max_bytes: int = URL_MAX_BYTES,
+                 pool_size: int = URL_POOL_SIZE):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.max_bytes = max_bytes
+        self.pool_size = pool_size
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = USER_AGENT
+                self._session = session
+            return self._session
+
+    def fetch(self, url: str, folder: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> FetchedFile:
+        """
+        Download a remote file into the folder, named after the last segment of the url path.
+
+        Args:
+            url: The url of the file.
+            folder: An existing folder the file is saved to.
+            etag: The ETag of a previous download, the file is not downloaded again when it still matches.
+            last_modified: The Last-Modified header of a previous download, used like `etag`.
+
+        Returns:
+            The downloaded file, or a FetchedFile without file path when the remote file was not modified.
+
+        Raises:
+            FetchError: The url cannot be reached, answers with an error status, is too large or too slow.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        started_at = time.monotonic()
+        try:
+            with self.session.get(url, headers=headers, stream=True,
+                                  timeout=(self.connect_timeout, self.read_timeout)) as response:
+                mimetype = response.headers.get('Content-Type', '').split(';')[0].strip().lower() or None
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                if response.status_code == 304:
+                    return FetchedFile(None, mimetype, etag, last_modified)
+                if response.status_code != 200:
+                    raise FetchError(f"Fetching {url} returned status code {response.status_code}")
+
+                content_length = int(response.headers.get('Content-Length') or 0)
+                if content_length > self.max_bytes:
+                    raise FetchError(f"Remote file {url} exceeds {self.max_bytes} bytes", 413)
+
+                file_path = os.path.join(folder, local_file_name(url))
+                received = 0
+                with open(file_path, 'wb') as f:
+                    for chunk in response.iter_content(FETCH_CHUNK_BYTES):
+                        received += len(chunk)
+                        if received > self.max_bytes:
+                            raise FetchError(f"Remote file {url} exceeds {self.max_bytes} bytes", 413)
+                        if time.monotonic() - started_at > self.total_timeout:
+                            raise FetchError(f"Fetching {url} took longer than {self.total_timeout} seconds", 504)
+                        f.write(chunk)
+
+                return FetchedFile(file_path, mimetype, etag, last_modified)
+        except (requests.exceptions.MissingSchema, requests.exceptions.InvalidSchema,
+                requests.exceptions.InvalidURL) as e:
+            raise FetchError(f"Invalid url {url}", 400) from e
+        except requests.Timeout as e:
+            raise FetchError(f"Fetching {url} timed out", 504) from e
+        except requests.RequestException as e:
+            raise FetchError(f"Failed to fetch {url}: {e}") from e
+
+
+url_fetcher = UrlFetcher()
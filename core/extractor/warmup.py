@@ -0,0 +1,114 @@
+"""Parser warm-up and the process context of the extraction worker pools."""
+import importlib
+import logging
+import multiprocessing
+import os
+import resource
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PRELOAD_PARSERS = [name.strip() for name in os.environ.get('PRELOAD_PARSERS', 'pdf,xlsx,docx,html').split(',')
+                   if name.strip()]
+WORKER_MAX_JOBS = int(os.environ.get('WORKER_MAX_JOBS', 0))
+WORKER_MAX_RSS_MB = int(os.environ.get('WORKER_MAX_RSS_MB', 0))
+
+# modules imported to warm up a parser, the extractors import them lazily on their first use
+PARSER_MODULES = {
+    'pdf': ['pypdfium2'],
+    'xlsx': ['openpyxl.reader.excel'],
+    'docx': ['docx2txt'],
+    'html': ['lxml.etree', 'core.extractor.html_engine'],
+    'unstructured': [
+        'unstructured.partition.doc', 'unstructured.partition.docx', 'unstructured.partition.email',
+        'unstructured.partition.md', 'unstructured.partition.msg', 'unstructured.partition.ppt',
+        'unstructured.partition.pptx', 'unstructured.partition.text', 'unstructured.partition.xml',
+        'unstructured.chunking.title',
+    ],
+}
+
+timings: dict[str, float] = {}
+"""Seconds taken by every parser during the last warm-up of this process."""
+
+
+def _initialize(parser: str):
+    """Run the one-off initialization of a parser that importing it does not cover."""
+    if parser == 'pdf':
+        import pypdfium2
+
+        pypdfium2.PdfDocument.new().close()
+    elif parser == 'html':
+        from core.extractor.html_engine import parse_html
+
+        parse_html('<p></p>')
+
+
+def preload_modules(parsers: Optional[list[str]] = None) -> list[str]:
+    """Return the modules to import for warming up the parsers, the extractor registry included."""
+    modules = ['core.extractor.registry']
+    for parser in PRELOAD_PARSERS if parsers is None else parsers:
+        modules.extend(PARSER_MODULES.get(parser, []))
+    return modules
+
+
+def warm_up(parsers: Optional[list[str]] = None) -> dict[str, float]:
+    """
+    Import and initialize the parsers, so that the first extraction of a file type does not pay for it.
+
+    Parsers that are not installed are skipped with a warning, the time taken by every parser is logged
+    and kept in `timings`.
+
+    Args:
+        parsers: Names from PARSER_MODULES, defaults to PRELOAD_PARSERS.
+
+    Returns:
+        The seconds taken by every parser, `registry` being the extractors themselves.
+    """
+    result = {}
+    for parser in ['registry'] + (PRELOAD_PARSERS if parsers is None else parsers):
+        if parser != 'registry' and parser not in PARSER_MODULES:
+            logger.warning('unknown parser %s in PRELOAD_PARSERS', parser)
+            continue
+
+        started_at = time.perf_counter()
+        try:
+            for module in PARSER_MODULES.get(parser, ['core.extractor.registry']):
+                importlib.import_module(module)
+            _initialize(parser)
+        except ImportError as e:
+            logger.warning('skipped warming up %s: %s', parser, e)
+            continue
+        result[parser] = time.perf_counter() - started_at
+
+    timings.update(result)
+    logger.info('warmed up parsers in %.3fs: %s', sum(result.values()),
+                ', '.join(f'{parser} {seconds:.3f}s' for parser, seconds in result.items()))
+    return result
+
+
+def process_context() -> multiprocessing.context.BaseContext:
+    """
+    Return the multiprocessing context of the extraction worker pools.
+
+    Workers are forked from a fork server that imported the preloaded parsers once, so that they start
+    warm without inheriting the state of the serving process, pdfium and openpyxl state inherited from
+    it is not safe to use.
+    """
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(preload_modules())
+    return context
+
+
+def current_rss_bytes() -> int:
+    """Return the resident set size of the current process."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # peak instead of current resident size, in kilobytes on linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def exceeds_max_rss() -> bool:
+    return WORKER_MAX_RSS_MB > 0 and current_rss_bytes() > WORKER_MAX_RSS_MB * 1024 * 1024
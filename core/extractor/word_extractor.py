@@ -1,11 +1,13 @@
 """Abstract interface for document loader implementations."""
 import os
+import shutil
 import tempfile
+from typing import Optional
 from urllib.parse import urlparse
 
-import requests
-
+from core.extractor.blod.blod import Blob
 from core.extractor.extractor_base import BaseExtractor
+from core.extractor.url_fetcher import url_fetcher
 from core.models.document import Document
 
 
@@ -15,42 +17,46 @@ class WordExtractor(BaseExtractor):
 
     Args:
         file_path: Path to the file to load.
+        blob: In-memory content of the file, when given the file path is only used as the source.
     """
 
-    def __init__(self, file_path: str):
+    supports_blob = True
+
+    def __init__(self, file_path: str, blob: Optional[Blob] = None):
         """Initialize with file path."""
         self.file_path = file_path
+        self.blob = blob
+        if self.blob is not None:
+            return
+
         if "~" in self.file_path:
             self.file_path = os.path.expanduser(self.file_path)
 
-        # If the file is a web path, download it to a temporary file, and use that
+        # If the file is a web path, download it to a temporary folder, and use that
         if not os.path.isfile(self.file_path) and self._is_valid_url(self.file_path):
-            r = requests.get(self.file_path)
-
-            if r.status_code != 200:
-                raise ValueError(
-                    "Check the url of your file; returned status code %s"
-                    % r.status_code
-                )
-
             self.web_path = self.file_path
-            self.temp_file = tempfile.NamedTemporaryFile()
-            self.temp_file.write(r.content)
-            self.file_path = self.temp_file.name
+            self.temp_dir = tempfile.mkdtemp()
+            self.file_path = url_fetcher.fetch(self.web_path, self.temp_dir).file_path
         elif not os.path.isfile(self.file_path):
             raise ValueError("File path %s is not a valid file or url" % self.file_path)
 
     def __del__(self) -> None:
-        if hasattr(self, "temp_file"):
-            self.temp_file.close()
+        if hasattr(self, "temp_dir"):
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
 
     def extract(self) -> list[Document]:
         """Load given path as single page."""
         import docx2txt
 
+        if self.blob is not None:
+            with self.blob.as_bytes_io() as f:
+                content = docx2txt.process(f)
+        else:
+            content = docx2txt.process(self.file_path)
+
         return [
             Document(
-                content=docx2txt.process(self.file_path),
+                content=content,
                 meta={"source": self.file_path},
             )
         ]
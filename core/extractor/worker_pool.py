@@ -0,0 +1,203 @@
+"""Process pools running extractions off the event loop of the asgi app."""
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from collections.abc import AsyncIterator, Iterable
+from typing import Optional
+
+from core.extractor.blod.blod import Blob
+from core.extractor.entity.extract_setting import ExtractSetting
+from core.extractor.extract_processor import ExtractProcessor
+from core.extractor.url_fetcher import FetchedFile
+from core.extractor.warmup import WORKER_MAX_JOBS, exceeds_max_rss, process_context, warm_up
+from core.models.serialization import dump_document
+
+ASGI_WORKERS = int(os.environ.get('ASGI_WORKERS', os.cpu_count() or 1))
+ASGI_SMALL_WORKERS = int(os.environ.get('ASGI_SMALL_WORKERS', 1))
+ASGI_SMALL_FILE_BYTES = int(os.environ.get('ASGI_SMALL_FILE_BYTES', 1024 * 1024))
+ASGI_QUEUE_SIZE = int(os.environ.get('ASGI_QUEUE_SIZE', 2))
+ASGI_QUEUE_TIMEOUT = float(os.environ.get('ASGI_QUEUE_TIMEOUT', 30))
+
+# how often a streamed extraction is checked for new documents
+STREAM_POLL_SECONDS = 0.02
+STREAM_READ_BYTES = 64 * 1024
+
+
+class PoolBusyError(RuntimeError):
+    """Raised when a lane has no free slot before the queue timeout."""
+
+
+def _init_worker():
+    from core.extensions import init_from_env
+
+    init_from_env()
+    warm_up()
+
+
+def _run_job(fn, *args) -> tuple[object, bool]:
+    """Run a job in a worker process, returning its result and whether the worker should be recycled."""
+    return fn(*args), exceeds_max_rss()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _file_blob(file_path: Optional[str], data: Optional[bytes], filename: str, mimetype: Optional[str]) -> Blob:
+    if data is not None:
+        return Blob.from_data(data, mime_type=mimetype, path=filename)
+    return Blob.from_path(file_path, mime_type=mimetype)
+
+
+def _write_lines(documents: Iterable, output_path: str):
+    with open(output_path, 'wb') as f:
+        for document in documents:
+            f.write(dump_document(document) + b'\n')
+            f.flush()
+
+
+def extract_file(file_path: Optional[str], data: Optional[bytes], filename: str,
+                 mimetype: Optional[str] = None, extract_setting: Optional[ExtractSetting] = None) -> list[bytes]:
+    """
+    Extract an uploaded file, given either as a local file path or as its content, in a worker process.
+
+    The documents are returned JSON encoded, encoding them in the worker is cheaper than pickling them
+    and keeps the encoding off the event loop.
+    """
+    blob = _file_blob(file_path, data, filename, mimetype)
+    return [dump_document(document)
+            for document in ExtractProcessor.iter_extract(extract_setting or ExtractSetting(), blob=blob)]
+
+
+def stream_file(output_path: str, file_path: Optional[str], data: Optional[bytes], filename: str,
+                mimetype: Optional[str] = None, extract_setting: Optional[ExtractSetting] = None):
+    """
+    Extract an uploaded file like `extract_file`, writing every document as a JSON line to `output_path` as soon
+    as it is produced, see `read_lines`.
+    """
+    blob = _file_blob(file_path, data, filename, mimetype)
+    _write_lines(ExtractProcessor.iter_extract(extract_setting or ExtractSetting(), blob=blob), output_path)
+
+
+def extract_fetched(url: str, fetched: FetchedFile, extract_setting: Optional[ExtractSetting] = None) -> list[bytes]:
+    """Extract a file downloaded by ExtractProcessor.fetch_url in a worker process."""
+    return [dump_document(document) for document in ExtractProcessor.iter_fetched(url, fetched, extract_setting)]
+
+
+def stream_fetched(output_path: str, url: str, fetched: FetchedFile, extract_setting: Optional[ExtractSetting] = None):
+    """Extract a downloaded file like `extract_fetched`, writing the documents as JSON lines to `output_path`."""
+    _write_lines(ExtractProcessor.iter_fetched(url, fetched, extract_setting), output_path)
+
+
+async def read_lines(future: asyncio.Future, output_path: str) -> AsyncIterator[bytes]:
+    """
+    Yield the lines a streamed extraction writes to `output_path` while it runs, each ending with a newline.
+
+    Only complete lines are yielded, and the error of the extraction is raised once all of them have been
+    read, the file has to exist before the extraction is submitted.
+    """
+    with open(output_path, 'rb') as f:
+        pending = b''
+        while True:
+            # checked before reading, so that nothing written before the extraction finished is missed
+            finished = future.done()
+            chunk = f.read(STREAM_READ_BYTES)
+            if chunk:
+                lines = (pending + chunk).split(b'\n')
+                pending = lines.pop()
+                for line in lines:
+                    yield line + b'\n'
+            elif finished:
+                break
+            else:
+                await asyncio.sleep(STREAM_POLL_SECONDS)
+    future.result()
+
+
+class WorkerLane:
+    """
+    A process pool with a bounded number of pending extractions.
+
+    At most `workers * ASGI_QUEUE_SIZE` extractions are submitted at once, callers beyond that wait up to
+    `queue_timeout` seconds for a free slot and are then rejected with PoolBusyError, so that the pool
+    queue cannot grow without bounds under load. A slot is only freed once its extraction finishes, even
+    when the waiting request is cancelled.
+
+    Workers are recycled after WORKER_MAX_JOBS jobs, and the whole pool is replaced once a worker grows
+    beyond WORKER_MAX_RSS_MB, the jobs already submitted to it still complete.
+    """
+
+    def __init__(self, name: str, workers: int, queue_size: int = ASGI_QUEUE_SIZE,
+                 queue_timeout: float = ASGI_QUEUE_TIMEOUT):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(self.workers * max(1, queue_size))
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=process_context(), initializer=_init_worker,
+                    max_tasks_per_child=WORKER_MAX_JOBS or None)
+            return self._executor
+
+    async def start(self) -> float:
+        """Start the fork server and warm up the workers ahead of the first job, returning the seconds it took."""
+        started_at = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        await asyncio.gather(*(loop.run_in_executor(executor, _ping) for _ in range(self.workers)))
+        return time.perf_counter() - started_at
+
+    async def submit(self, fn, *args) -> asyncio.Future:
+        """Submit a job once a slot is free, returning the future of its `_run_job` result."""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise PoolBusyError(f"No free {self.name} worker after {self.queue_timeout} seconds")
+
+        try:
+            executor = self.executor
+            future = asyncio.get_running_loop().run_in_executor(executor, _run_job, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        def done(_):
+            self._slots.release()
+            if not future.cancelled() and future.exception() is None and future.result()[1]:
+                self._retire(executor)
+
+        future.add_done_callback(done)
+        return future
+
+    async def run(self, fn, *args):
+        result, _ = await asyncio.shield(await self.submit(fn, *args))
+        return result
+
+    def _retire(self, executor: concurrent.futures.ProcessPoolExecutor):
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# small files get their own lane, so that they are never queued behind large documents
+small_lane = WorkerLane('small file', ASGI_SMALL_WORKERS)
+large_lane = WorkerLane('large file', ASGI_WORKERS)
+
+
+def lane_for(size: int) -> WorkerLane:
+    return small_lane if size <= ASGI_SMALL_FILE_BYTES else large_lane
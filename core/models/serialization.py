@@ -0,0 +1,48 @@
+"""JSON encoding of documents at the edges of the service, with orjson when it is installed."""
+import json
+from collections.abc import Iterable
+from typing import Any, Optional, Union
+
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from core.models.document import Document
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_MIMETYPE = 'application/json'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode an object as UTF-8 JSON, values JSON has no type for are encoded as strings."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, default=str, separators=(',', ':')).encode('utf-8')
+
+
+def prefers_ndjson(accept: Optional[str]) -> bool:
+    """Whether newline-delimited JSON is the best match of an Accept header, as negotiated by Flask."""
+    return parse_accept_header(accept, MIMEAccept).best == NDJSON_MIMETYPE
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_document(document: Document) -> bytes:
+    return dumps(document.to_dict())
+
+
+def load_documents(data: Union[bytes, str]) -> list[Document]:
+    return [Document(item['content'], item.get('meta')) for item in loads(data)]
+
+
+def join_documents(items: Iterable[bytes]) -> bytes:
+    """Build the `{"documents": [...]}` payload from documents encoded with `dump_document`."""
+    return b'{"documents":[' + b','.join(items) + b']}'
@@ -0,0 +1,119 @@
+import json
+import logging
+import re
+import time
+import uuid
+from typing import Optional
+
+from core.extensions.ext_celery import celery_app
+from core.extensions.ext_storage import storage
+from core.extractor.entity.extract_setting import ExtractSetting
+from core.extractor.extract_processor import ExtractProcessor
+from core.models.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+JOB_PREFIX = 'jobs/'
+# ids are generated by uuid4().hex, anything else must never reach a storage key
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+JOB_STATUS_PENDING = 'pending'
+JOB_STATUS_RUNNING = 'running'
+JOB_STATUS_SUCCEEDED = 'succeeded'
+JOB_STATUS_FAILED = 'failed'
+
+
+def is_job_id(job_id: str) -> bool:
+    return JOB_ID_PATTERN.fullmatch(job_id) is not None
+
+
+def _status_key(job_id: str) -> str:
+    return f"{JOB_PREFIX}{job_id}/status.json"
+
+
+def _result_key(job_id: str) -> str:
+    return f"{JOB_PREFIX}{job_id}/result.json"
+
+
+def _save_status(job: dict):
+    job['updated_at'] = time.time()
+    storage.save(_status_key(job['id']), json.dumps(job).encode('utf-8'))
+
+
+def submit_job(filename: str, data: bytes, extract_setting: Optional[ExtractSetting] = None) -> dict:
+    """
+    Save the uploaded file into the storage and enqueue its extraction.
+
+    With the `memory://` broker the job runs eagerly, it is already finished when this function returns,
+    the extraction only runs asynchronously with a real broker or the filesystem one.
+
+    Args:
+        filename: The name of the uploaded file, its extension decides the extractor.
+        data: The content of the uploaded file.
+        extract_setting: The settings used for extraction, `filepath` is filled in by this function.
+
+    Returns:
+        The initial state of the job.
+    """
+    job_id = uuid.uuid4().hex
+    filepath = f"{JOB_PREFIX}{job_id}/{filename}"
+    storage.save(filepath, data)
+
+    extract_setting = extract_setting or ExtractSetting()
+    extract_setting.filepath = filepath
+
+    job = {
+        'id': job_id,
+        'status': JOB_STATUS_PENDING,
+        'filename': filename,
+        'created_at': time.time(),
+        'error': None,
+    }
+    _save_status(job)
+
+    extract_task.delay(job_id, extract_setting.dict())
+    return get_job(job_id)
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """
+    Load the state of a job, the extracted documents are included once the job succeeded.
+
+    Returns:
+        The state of the job, or None if there is no job with this id or the id is not valid.
+    """
+    if not is_job_id(job_id):
+        return None
+
+    try:
+        job = json.loads(storage.load_once(_status_key(job_id)))
+    except FileNotFoundError:
+        return None
+
+    if job['status'] == JOB_STATUS_SUCCEEDED:
+        job['documents'] = loads(storage.load_once(_result_key(job_id)))
+
+    return job
+
+
+@celery_app.task(name='extractor.extract')
+def extract_task(job_id: str, extract_setting: dict):
+    """Run the extraction of a submitted job and persist its result into the storage."""
+    job = json.loads(storage.load_once(_status_key(job_id)))
+    job['status'] = JOB_STATUS_RUNNING
+    _save_status(job)
+
+    extract_setting = ExtractSetting(**extract_setting)
+    try:
+        # reported under the uploaded file name rather than where the storage keeps it
+        documents = ExtractProcessor.extract(extract_setting, source=job['filename'])
+        storage.save(_result_key(job_id), dumps([document.to_dict() for document in documents]))
+        job['status'] = JOB_STATUS_SUCCEEDED
+    except Exception as e:
+        logger.exception('extraction job %s failed', job_id)
+        job['status'] = JOB_STATUS_FAILED
+        job['error'] = str(e)
+    finally:
+        storage.delete(extract_setting.filepath)
+
+    _save_status(job)
@@ -0,0 +1,44 @@
+"""Gunicorn settings of the extractor service, gunicorn reads them from the working directory."""
+import os
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+# import the app once in the master, workers are forked with it loaded
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+if preload_app and worker_class == 'gevent':
+    # the master imports the app, patch the standard library before any other module is loaded, those
+    # imported by this file included
+    from gevent import monkey
+
+    monkey.patch_all()
+
+from core.extractor.warmup import (WORKER_MAX_JOBS, WORKER_MAX_RSS_MB, current_rss_bytes,  # noqa: E402
+                                   exceeds_max_rss, warm_up)
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:80')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+accesslog = '-'
+
+# recycle workers to contain native memory leaks of the parsers
+max_requests = WORKER_MAX_JOBS
+max_requests_jitter = WORKER_MAX_JOBS // 10
+
+
+def on_starting(server):
+    # warm up the parsers once in the master, workers are forked warm, and celery workers or scripts
+    # importing the app do not pay for it
+    warm_up()
+
+
+def post_request(worker, req, environ, resp):
+    if exceeds_max_rss():
+        worker.log.info('recycling worker %s, resident memory %d MB exceeds %d MB',
+                        worker.pid, current_rss_bytes() // (1024 * 1024), WORKER_MAX_RSS_MB)
+        worker.alive = False
+
+
+def child_exit(server, worker):
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
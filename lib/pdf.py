@@ -1,7 +1,38 @@
+import os
+from collections import deque
+from collections.abc import Iterator
 from io import BytesIO
+from typing import NamedTuple, Optional
 
 import pypdfium2 as pdfium
 
+from core.extractor.helpers import pdfium_lock
+
+PDF_RENDER_DPI = int(os.environ.get('PDF_RENDER_DPI', 300))
+PDF_RENDER_FORMAT = os.environ.get('PDF_RENDER_FORMAT', 'jpeg')
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', 0))
+# pages a worker renders per task, it opens the file once for all of them
+PDF_RENDER_PAGES_PER_TASK = int(os.environ.get('PDF_RENDER_PAGES_PER_TASK', 4))
+# pages rendered or waiting to be consumed at once, this bounds the memory used by a rendering
+PDF_RENDER_MAX_IN_FLIGHT = int(os.environ.get('PDF_RENDER_MAX_IN_FLIGHT', 0))
+PDF_RENDER_MAX_DPI = 1200
+
+
+class ImageFormat(NamedTuple):
+    """An image format pages can be rendered to."""
+
+    pil_format: str
+    mimetype: str
+    extension: str
+    options: dict
+
+
+IMAGE_FORMATS = {
+    'jpeg': ImageFormat('JPEG', 'image/jpeg', '.jpg', {'quality': 85, 'optimize': True}),
+    'png': ImageFormat('PNG', 'image/png', '.png', {'compress_level': 6}),
+    'webp': ImageFormat('WEBP', 'image/webp', '.webp', {'quality': 80, 'method': 4}),
+}
+
 
 def convert_pdf_to_text(file_path):
     """
@@ -29,6 +60,160 @@ def test_convert_pdf_to_text():
     print(text)
 
 
+def render_page(pdf_file: pdfium.PdfDocument, page_number: int, dpi: int, image_format: str) -> bytes:
+    """
+    Render a page of an opened PDF file and encode it as an image.
+
+    Args:
+        pdf_file (PdfDocument): The PDF file.
+        page_number (int): The index of the page, starting from 0.
+        dpi (int): The resolution of the image.
+        image_format (str): One of the IMAGE_FORMATS.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    target = IMAGE_FORMATS[image_format]
+    with pdfium_lock:
+        page = pdf_file[page_number]
+        try:
+            bitmap = page.render(scale=dpi / 72)
+        finally:
+            page.close()
+    try:
+        # the image may share the buffer of the bitmap, it is encoded outside the lock but before the bitmap is closed
+        image = bitmap.to_pil()
+        image_byte_array = BytesIO()
+        image.save(image_byte_array, format=target.pil_format, **target.options)
+        return image_byte_array.getvalue()
+    finally:
+        with pdfium_lock:
+            bitmap.close()
+
+
+def _render_pages_file(file_path: str, page_numbers: list[int], dpi: int, image_format: str) -> list[bytes]:
+    """Render a run of pages in a worker process, which opens the file once for all of them."""
+    pdf_file = pdfium.PdfDocument(file_path)
+    try:
+        return [render_page(pdf_file, page_number, dpi, image_format) for page_number in page_numbers]
+    finally:
+        pdf_file.close()
+
+
+def render_pdf_pages(file_path: str, dpi: int = PDF_RENDER_DPI, image_format: str = PDF_RENDER_FORMAT,
+                     pages: str = '', max_pages: Optional[int] = None, workers: int = PDF_RENDER_WORKERS,
+                     max_in_flight: int = PDF_RENDER_MAX_IN_FLIGHT,
+                     pages_per_task: int = PDF_RENDER_PAGES_PER_TASK) -> Iterator[tuple[int, bytes]]:
+    """
+    Render the pages of a PDF file as images, yielding every page as soon as it is encoded.
+
+    The arguments and the file are checked before the first page is requested, so that invalid values
+    and invalid PDF files are raised by this call. With two workers or more, the pages are rendered on
+    a process pool in runs of `pages_per_task` pages, every worker opens the file once per run.
+
+    Args:
+        file_path (str): The path to the PDF file to render.
+        dpi (int): The resolution of the images, up to PDF_RENDER_MAX_DPI.
+        image_format (str): `jpeg`, `png` or `webp`.
+        pages (str): The pages to render, e.g. `1-10,15`, all pages when empty.
+        max_pages (int): The maximum number of pages to render, the first ones of the selection are kept.
+        workers (int): The number of worker processes, values below 2 render the pages in this process.
+        max_in_flight (int): The number of pages rendered ahead of the consumer, twice the pages of a task
+            per worker when 0.
+        pages_per_task (int): The number of pages a worker renders per task, fewer when `max_in_flight`
+            could not keep all workers busy otherwise.
+
+    Returns:
+        Iterator: The index of every page, starting from 0, and its encoded image, in page order.
+
+    Raises:
+        ValueError: when an argument is invalid.
+        PdfiumError: when the file is not a valid PDF file.
+    """
+    from core.extractor.pdf_extractor import parse_pages, select_pages
+
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f'Unknown image format {image_format}, expected one of {", ".join(IMAGE_FORMATS)}')
+    if not 0 < dpi <= PDF_RENDER_MAX_DPI:
+        raise ValueError(f'dpi must be between 1 and {PDF_RENDER_MAX_DPI}, got {dpi}')
+    page_ranges = parse_pages(pages, max_pages)
+
+    with pdfium_lock:
+        pdf_file = pdfium.PdfDocument(file_path)
+        page_numbers = select_pages(page_ranges, max_pages, len(pdf_file))
+    if workers > 1 and len(page_numbers) > 1:
+        with pdfium_lock:
+            pdf_file.close()
+        pages_per_task = max(1, pages_per_task)
+        max_in_flight = max_in_flight or 2 * workers * pages_per_task
+        return _render_parallel(file_path, page_numbers, dpi, image_format, workers, max_in_flight,
+                                max(1, min(pages_per_task, max_in_flight // workers)))
+    return _render_serial(pdf_file, page_numbers, dpi, image_format)
+
+
+def _render_serial(pdf_file: pdfium.PdfDocument, page_numbers: list[int], dpi: int,
+                   image_format: str) -> Iterator[tuple[int, bytes]]:
+    try:
+        for page_number in page_numbers:
+            yield page_number, render_page(pdf_file, page_number, dpi, image_format)
+    finally:
+        with pdfium_lock:
+            pdf_file.close()
+
+
+def _render_parallel(file_path: str, page_numbers: list[int], dpi: int, image_format: str, workers: int,
+                     max_in_flight: int, pages_per_task: int) -> Iterator[tuple[int, bytes]]:
+    """Keep about `max_in_flight` pages submitted to the process pool in runs and yield them back in order."""
+    from core.extractor.helpers import get_process_pool
+
+    executor = get_process_pool(workers)
+    runs = (page_numbers[i:i + pages_per_task] for i in range(0, len(page_numbers), pages_per_task))
+    in_flight = deque()
+
+    def submit() -> bool:
+        run = next(runs, None)
+        if run is None:
+            return False
+        in_flight.append((run, executor.submit(_render_pages_file, file_path, run, dpi, image_format)))
+        return True
+
+    try:
+        while len(in_flight) * pages_per_task < max_in_flight and submit():
+            pass
+
+        while in_flight:
+            run, future = in_flight.popleft()
+            images = future.result()
+            # the next run is rendered while the consumer handles this one
+            submit()
+            yield from zip(run, images)
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+
+
+def iter_pdf_images(file_path, dpi=PDF_RENDER_DPI, image_format=PDF_RENDER_FORMAT, pages='', max_pages=None):
+    """
+    Convert a PDF file into images, one page at a time.
+
+    This function takes a path to a PDF file as input, renders the selected pages as images, and
+    yields them one at a time, see `render_pdf_pages` for the arguments. Each image is represented
+    as a dictionary where the key is the page index and the value is the image data.
+
+    Args:
+        file_path (str): The path to the PDF file to convert.
+        dpi (int): The resolution of the images, 300 by default.
+        image_format (str): `jpeg`, `png` or `webp`.
+        pages (str): The pages to convert, e.g. `1-10,15`, all pages when empty.
+        max_pages (int): The maximum number of pages to convert.
+
+    Yields:
+        dict: A single key-value pair, the page index (starting from 0) and the image data.
+    """
+    for i, image in render_pdf_pages(file_path, dpi, image_format, pages, max_pages):
+        yield {i: image}
+
+
 def convert_pdf_to_images(file_path, scale=300 / 72):
     """
     Convert a PDF file into a list of images.
@@ -36,6 +221,7 @@ def convert_pdf_to_images(file_path, scale=300 / 72):
     This function takes a path to a PDF file and a scale factor as input. It reads the PDF file,
     renders each page as an image, and returns a list of these images. Each image is represented
     as a dictionary where the key is the page index and the value is the image data in JPEG format.
+    Use `iter_pdf_images` to render the pages one at a time.
 
     Args:
         file_path (str): The path to the PDF file to convert.
@@ -46,18 +232,7 @@ def convert_pdf_to_images(file_path, scale=300 / 72):
         list: A list of dictionaries. Each dictionary represents an image and has a single key-value pair.
               The key is the page index (starting from 0), and the value is the image data in JPEG format.
     """
-    pdf_file = pdfium.PdfDocument(file_path)
-    page_indices = [i for i in range(len(pdf_file))]
-
-    renderer = pdf_file.render(pdfium.PdfBitmap.to_pil, page_indices=page_indices, scale=scale)
-    final_images = []
-    for i, image in zip(page_indices, renderer):
-        image_byte_array = BytesIO()
-        image.save(image_byte_array, format='jpeg', optimize=True)
-        image_byte_array = image_byte_array.getvalue()
-        final_images.append(dict({i: image_byte_array}))
-
-    return final_images
+    return list(iter_pdf_images(file_path, max(1, round(scale * 72)), 'jpeg'))
 
 
 def test_convert_pdf_to_images():
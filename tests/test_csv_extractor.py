@@ -0,0 +1,44 @@
+"""Tests of the encoding fallback of the CSV extractor."""
+import pytest
+
+from core.extractor.blod.blod import Blob
+from core.extractor.csv_extractor import CSVExtractor
+from core.extractor.helpers import ENCODING_SAMPLE_BYTES
+
+ROWS = 200000
+ODD_ROW = 30000
+
+
+def latin1_csv() -> bytes:
+    # an ASCII file whose single latin-1 byte lies between the head and middle samples of the encoding detection
+    lines = [b'id,name'] + [b'%d,name %d' % (i, i) for i in range(ROWS)]
+    lines[ODD_ROW + 1] = b'%d,caf\xe9' % ODD_ROW
+    data = b'\n'.join(lines) + b'\n'
+    position = data.index(b'\xe9')
+    assert ENCODING_SAMPLE_BYTES < position < (len(data) - ENCODING_SAMPLE_BYTES) // 2
+    return data
+
+
+@pytest.mark.parametrize('make_blob', [
+    lambda path, data: Blob.from_path(str(path)),
+    lambda path, data: Blob.from_chunks(lambda: iter([data[i:i + 65536] for i in range(0, len(data), 65536)]),
+                                        path=str(path), size=len(data)),
+], ids=['file', 'stream'])
+def test_byte_outside_of_the_samples_is_decoded(tmp_path, make_blob):
+    data = latin1_csv()
+    path = tmp_path / 'people.csv'
+    path.write_bytes(data)
+
+    documents = list(CSVExtractor(str(path), autodetect_encoding=True, blob=make_blob(path, data)).load())
+
+    assert len(documents) == ROWS
+    assert [document.meta['row'] for document in documents] == list(range(ROWS))
+    assert documents[ODD_ROW].content == f'id: {ODD_ROW}\nname: café'
+
+
+def test_undecodable_file_without_autodetection_fails(tmp_path):
+    path = tmp_path / 'people.csv'
+    path.write_bytes(latin1_csv())
+
+    with pytest.raises(RuntimeError):
+        list(CSVExtractor(str(path)).load())
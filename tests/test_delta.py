@@ -0,0 +1,64 @@
+"""Tests of the change marks of delta extractions."""
+import pytest
+
+import core.extensions.ext_storage as storage
+from core.extractor.delta import CHANGE_CHANGED, CHANGE_NEW, CHANGE_UNCHANGED, content_hash, mark_changes
+from core.models.document import Document
+
+
+@pytest.fixture(autouse=True)
+def local_storage(tmp_path):
+    storage.init(storage.StorageConfig.local(str(tmp_path)))
+
+
+def extract(document_id: str, *pages: str) -> list[str]:
+    documents = [Document(content, {'source': 'a.pdf', 'page': i}) for i, content in enumerate(pages)]
+    return [document.meta['change'] for document in mark_changes(document_id, documents)]
+
+
+def test_first_extraction_is_all_new():
+    assert extract('doc', 'alpha', 'beta') == [CHANGE_NEW, CHANGE_NEW]
+
+
+def test_marks_against_the_previous_extraction():
+    extract('doc', 'alpha', 'beta', 'gamma')
+
+    assert extract('doc', 'alpha', 'beta 2', 'gamma', 'delta') == [
+        CHANGE_UNCHANGED, CHANGE_CHANGED, CHANGE_UNCHANGED, CHANGE_NEW]
+    # compared with the last extraction only
+    assert extract('doc', 'alpha', 'beta 2', 'gamma', 'delta') == [CHANGE_UNCHANGED] * 4
+
+
+def test_moved_content_is_unchanged():
+    extract('doc', 'alpha', 'beta', 'gamma')
+
+    assert extract('doc', 'gamma', 'alpha', 'beta') == [CHANGE_UNCHANGED] * 3
+
+
+def test_every_previous_document_matches_a_single_new_one():
+    extract('doc', 'alpha', 'beta')
+
+    # the second alpha takes the position of beta, which moved on
+    assert extract('doc', 'alpha', 'alpha', 'beta') == [CHANGE_UNCHANGED, CHANGE_CHANGED, CHANGE_UNCHANGED]
+
+
+def test_documents_sharing_a_position_are_told_apart_by_their_ordinal():
+    def sections(*contents):
+        documents = [Document(content, {'header_path': ['Guide']}) for content in contents]
+        return [document.meta['change'] for document in mark_changes('md', documents)]
+
+    sections('one', 'two')
+    assert sections('one', 'three') == [CHANGE_UNCHANGED, CHANGE_CHANGED]
+
+
+def test_document_ids_are_tracked_separately():
+    extract('a', 'alpha')
+
+    assert extract('b', 'alpha') == [CHANGE_NEW]
+
+
+def test_hashes_are_added_to_the_meta():
+    document = next(mark_changes('doc', [Document('alpha', {'page': 0})]))
+
+    assert document.meta['content_hash'] == content_hash('alpha')
+    assert document.meta['page'] == 0
@@ -0,0 +1,110 @@
+"""Tests of the result cache on the local storage: expiry, the in-process LRU layer and the storage sweeps."""
+import os
+import time
+
+import pytest
+
+import core.extensions.ext_storage as storage
+from core.extensions.ext_cache import Cache, CacheConfig
+from core.extractor.blod.blod import Blob
+from core.extractor.csv_extractor import CSVExtractor
+from core.extractor.entity.extract_setting import ExtractSetting
+from core.extractor.extract_processor import ExtractProcessor
+from core.extractor.html_extractor import HtmlExtractor
+
+PREFIX = 'extract_cache/'
+
+
+@pytest.fixture
+def storage_path(tmp_path):
+    storage.init(storage.StorageConfig.local(str(tmp_path)))
+    return tmp_path
+
+
+def make_cache(**kwargs) -> Cache:
+    cache = Cache()
+    cache.init(CacheConfig.create(**{'sweep_interval': 0, **kwargs}))
+    return cache
+
+
+def age(storage_path, key: str, seconds: float):
+    path = storage_path / PREFIX / key
+    modified = time.time() - seconds
+    os.utime(path, (modified, modified))
+
+
+def test_entry_expires_after_the_ttl(storage_path, monkeypatch):
+    cache = make_cache(ttl=60)
+    cache.set('a', b'cached')
+    assert cache.get('a') == b'cached'
+
+    later = time.time() + 61
+    monkeypatch.setattr(time, 'time', lambda: later)
+    assert cache.get('a') is None
+    assert not (storage_path / PREFIX / 'a').exists()
+
+
+def test_stored_entry_survives_the_memory_layer(storage_path):
+    cache = make_cache()
+    cache.set('a', b'cached')
+    cache.clear_memory()
+
+    assert cache.get('a') == b'cached'
+
+
+def test_memory_layer_evicts_the_least_recently_used(storage_path):
+    cache = make_cache(max_memory_bytes=10)
+    cache.set('a', b'aaaa')
+    cache.set('b', b'bbbb')
+    cache.get('a')
+    cache.set('c', b'cccc')
+
+    assert list(cache._entries) == ['a', 'c']
+
+
+def test_sweep_removes_expired_entries(storage_path):
+    cache = make_cache(ttl=60)
+    cache.set('old', b'old')
+    cache.set('new', b'new')
+    age(storage_path, 'old', 120)
+
+    assert cache.sweep() == 1
+    assert sorted(os.listdir(storage_path / PREFIX)) == ['new']
+    assert cache.get('old') is None
+
+
+def test_sweep_removes_the_oldest_entries_beyond_the_storage_size(storage_path):
+    cache = make_cache(ttl=0, max_storage_bytes=64)
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.set(key, b'x' * 20)
+        age(storage_path, key, 30 - i)
+
+    # every stored entry also holds its header line
+    assert cache.sweep() == 1
+    assert sorted(os.listdir(storage_path / PREFIX)) == ['b', 'c']
+
+
+def test_write_sweeps_in_the_background(storage_path):
+    cache = make_cache(ttl=60, sweep_interval=600)
+    (storage_path / PREFIX).mkdir()
+    (storage_path / PREFIX / 'old').write_bytes(b'0\nold')
+    age(storage_path, 'old', 120)
+
+    cache.set('new', b'new')
+    deadline = time.time() + 5
+    while cache._sweeping and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert sorted(os.listdir(storage_path / PREFIX)) == ['new']
+
+
+def test_cache_key_covers_the_environment_settings():
+    setting = ExtractSetting()
+    blob = Blob.from_data(b'a,b\n1,2\n', path='rows.csv')
+
+    def key(extractor):
+        return ExtractProcessor._cache_key(setting, extractor, blob)
+
+    assert key(CSVExtractor('rows.csv', blob=blob)) != key(CSVExtractor('rows.csv', rows_per_document=10, blob=blob))
+    assert key(HtmlExtractor('page.html', engine='lxml', blob=blob)) != \
+        key(HtmlExtractor('page.html', engine='html.parser', blob=blob))
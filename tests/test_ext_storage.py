@@ -0,0 +1,116 @@
+"""Tests of the S3 storage against an in-process S3 mock, they need `moto` and make no network calls."""
+import os
+from unittest import mock
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from core.extensions.ext_storage import Storage, StorageConfig
+
+BUCKET = 'extractor-test'
+# the smallest part size S3 accepts
+PART_SIZE = 5 * 1024 * 1024
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN', 'AWS_PROFILE'):
+        monkeypatch.delenv(name, raising=False)
+
+    with mock_aws():
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket=BUCKET)
+        storage = Storage()
+        storage.init(StorageConfig.s3(BUCKET, 'testing', 'testing', None, 'us-east-1',
+                                      multipart_threshold=PART_SIZE, multipart_chunksize=PART_SIZE))
+        yield storage
+
+
+def test_save_below_threshold_puts_a_single_object(storage):
+    storage.save('small.txt', b'hello')
+
+    assert storage.load_once('small.txt') == b'hello'
+    assert '-' not in storage.info('small.txt').version
+
+
+def test_save_above_threshold_uploads_in_parts(storage):
+    data = os.urandom(2 * PART_SIZE + 1024)
+    storage.save('large.bin', data)
+
+    # the ETag of a multipart upload ends with the number of its parts
+    stored = storage.info('large.bin')
+    assert stored.size == len(data)
+    assert stored.version.endswith('-3')
+    assert storage.load_once('large.bin') == data
+
+
+def test_download_above_threshold_uses_ranged_requests(storage, tmp_path):
+    data = os.urandom(2 * PART_SIZE + 1024)
+    storage.save('large.bin', data)
+
+    ranges = []
+    storage.client.meta.events.register('before-parameter-build.s3.GetObject',
+                                        lambda params, **kwargs: ranges.append(params.get('Range')))
+    target = tmp_path / 'large.bin'
+    storage.download('large.bin', str(target))
+
+    assert target.read_bytes() == data
+    assert len(ranges) == 3
+    assert all(r is not None and r.startswith('bytes=') for r in ranges)
+
+
+def test_load_stream_yields_the_whole_object(storage):
+    data = os.urandom(PART_SIZE + 1024)
+    storage.save('stream.bin', data)
+
+    assert b''.join(storage.load_stream('stream.bin')) == data
+
+
+@pytest.mark.parametrize('load', [
+    lambda storage, tmp_path: storage.load_once('missing.txt'),
+    lambda storage, tmp_path: b''.join(storage.load_stream('missing.txt')),
+    lambda storage, tmp_path: storage.download('missing.txt', str(tmp_path / 'missing.txt')),
+    lambda storage, tmp_path: storage.info('missing.txt'),
+], ids=['load_once', 'load_stream', 'download', 'info'])
+def test_missing_key_raises_file_not_found(storage, tmp_path, load):
+    with pytest.raises(FileNotFoundError):
+        load(storage, tmp_path)
+
+
+def test_exists(storage):
+    storage.save('present.txt', b'hello')
+
+    assert storage.exists('present.txt')
+    assert not storage.exists('missing.txt')
+
+
+def test_exists_raises_errors_other_than_not_found(storage):
+    error = ClientError({'Error': {'Code': '403', 'Message': 'Forbidden'}}, 'HeadObject')
+    with mock.patch.object(storage.client, 'head_object', side_effect=error):
+        with pytest.raises(ClientError):
+            storage.exists('present.txt')
+
+
+def test_client_is_reused_after_the_first_call(storage, tmp_path):
+    client = storage.client
+    with mock.patch('boto3.session.Session') as session:
+        storage.save('a.txt', b'a')
+        storage.load_once('a.txt')
+        b''.join(storage.load_stream('a.txt'))
+        storage.download('a.txt', str(tmp_path / 'a.txt'))
+        storage.exists('a.txt')
+        storage.delete('a.txt')
+
+    session.assert_not_called()
+    assert storage.client is client
+
+
+def test_scan_lists_the_files_under_a_prefix(storage):
+    storage.save('cache/a', b'a')
+    storage.save('cache/b', b'bb')
+    storage.save('other/c', b'c')
+
+    entries = sorted(storage.scan('cache/'))
+    assert [(entry.filename, entry.size) for entry in entries] == [('cache/a', 1), ('cache/b', 2)]
+    assert all(entry.modified > 0 for entry in entries)
@@ -0,0 +1,64 @@
+"""Tests of the html engines, which have to split pages the same way."""
+import pytest
+
+from core.extractor.blod.blod import Blob
+from core.extractor.html_engine import HtmlSection, html_to_text, parse_html, parse_html_blob
+from core.extractor.html_extractor import HtmlExtractor
+
+ENGINES = ['lxml', 'html.parser']
+
+PAGE = '''<html><head><title>Guide</title><style>p { color: red }</style></head>
+<body><nav>Menu <a href="/">Home</a></nav>
+<h1>Intro</h1><p>Hello <b>world</b></p><script>var x = 1;</script>
+<h2>Details</h2><p>First</p><ul><li>one</li><li>two</li></ul>
+<footer>Copyright</footer></body></html>'''
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_page_is_split_at_its_headings(engine):
+    title, sections = parse_html(PAGE, engine)
+
+    assert title == 'Guide'
+    assert sections == [
+        HtmlSection('Intro', 'Hello world', ['Intro']),
+        HtmlSection('Details', 'First\none\ntwo', ['Intro', 'Details']),
+    ]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_unclosed_boilerplate_ends_with_its_parent(engine):
+    _, sections = parse_html('<body><div><nav>Menu <a>Home</a></div><h1>Intro</h1><p>Hello</p></body>', engine)
+
+    assert sections == [HtmlSection('Intro', 'Hello', ['Intro'])]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_page_of_boilerplate_only_keeps_its_text(engine):
+    _, sections = parse_html('<body><nav>Only navigation</nav><footer>and a footer</footer></body>', engine)
+
+    assert [section.text for section in sections] == ['Only navigation\nand a footer']
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_html_to_text(engine):
+    assert html_to_text('<p>a</p><script>b</script><p>c <i>d</i></p>', engine) == 'a\nc d'
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_meta_charset_decodes_the_blob(engine):
+    html = '<html><head><meta charset="iso-8859-1"></head><body><p>café</p></body></html>'.encode('latin-1')
+
+    _, sections = parse_html_blob(Blob.from_data(html, path='page.html'), engine)
+
+    assert [section.text for section in sections] == ['café']
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError):
+        parse_html(PAGE, 'html5lib')
+
+
+def test_page_without_text_is_a_single_empty_document():
+    documents = list(HtmlExtractor('empty.html', blob=Blob.from_data(b'<html><body></body></html>')).load())
+
+    assert [(document.content, document.meta['header_path']) for document in documents] == [('', [])]
@@ -0,0 +1,106 @@
+"""Tests of the extraction jobs on the in-process `memory://` broker and the filesystem broker, both offline."""
+import io
+import os
+
+import pytest
+from flask import Flask
+
+import core.extensions.ext_celery as celery
+import core.extensions.ext_storage as storage
+from core.extractor.entity.extract_setting import ExtractSetting
+from core.tasks.extract_task import (JOB_PREFIX, JOB_STATUS_FAILED, JOB_STATUS_PENDING, JOB_STATUS_SUCCEEDED,
+                                     extract_task, get_job, submit_job)
+from web import ExtractorRequest, bp
+
+
+@pytest.fixture
+def storage_path(tmp_path):
+    storage.init(storage.StorageConfig.local(str(tmp_path / 'storage')))
+    return tmp_path / 'storage'
+
+
+def init_celery(conf: celery.CeleryConfig):
+    # celery keeps the connections to the broker it first used, the tests switch between brokers
+    celery.celery_app._pool = None
+    celery.celery_app.amqp._producer_pool = None
+    celery.init(conf)
+
+
+@pytest.fixture
+def memory_broker(storage_path):
+    init_celery(celery.CeleryConfig.memory())
+
+
+@pytest.fixture
+def filesystem_broker(storage_path, tmp_path):
+    init_celery(celery.CeleryConfig.filesystem(str(tmp_path / 'broker')))
+    yield tmp_path / 'broker'
+    init_celery(celery.CeleryConfig.memory())
+
+
+@pytest.fixture
+def client(memory_broker):
+    app = Flask(__name__)
+    app.request_class = ExtractorRequest
+    app.register_blueprint(bp)
+    return app.test_client()
+
+
+def test_memory_broker_runs_the_job_on_submit(memory_broker, storage_path):
+    job = submit_job('notes.txt', b'hello jobs')
+
+    assert job['status'] == JOB_STATUS_SUCCEEDED
+    assert [document['content'] for document in job['documents']] == ['hello jobs']
+    # not the path of the file in the storage
+    assert [document['meta']['source'] for document in job['documents']] == ['notes.txt']
+    assert get_job(job['id'])['documents'] == job['documents']
+    # the uploaded file is removed once extracted
+    assert not (storage_path / JOB_PREFIX / job['id'] / 'notes.txt').exists()
+
+
+def test_failed_job_reports_its_error(memory_broker):
+    job = submit_job('broken.pdf', b'not a pdf')
+
+    assert job['status'] == JOB_STATUS_FAILED
+    assert job['error']
+    assert 'documents' not in job
+
+
+def test_filesystem_broker_queues_the_job(filesystem_broker):
+    job = submit_job('notes.txt', b'hello queue')
+
+    assert job['status'] == JOB_STATUS_PENDING
+    assert len(os.listdir(filesystem_broker / 'queue')) == 1
+
+    # what a worker runs once it takes the message
+    extract_task(job['id'], ExtractSetting(filepath=f"{JOB_PREFIX}{job['id']}/notes.txt").dict())
+    job = get_job(job['id'])
+    assert job['status'] == JOB_STATUS_SUCCEEDED
+    assert [document['content'] for document in job['documents']] == ['hello queue']
+
+
+@pytest.mark.parametrize('job_id', ['..', '.', 'status.json', '0' * 31, '0' * 33, 'G' * 32, 'A' * 32])
+def test_invalid_job_ids_are_not_found(memory_broker, storage_path, job_id):
+    # a status file one level up, which a relative job id could reach
+    (storage_path / JOB_PREFIX).mkdir(parents=True, exist_ok=True)
+    (storage_path / 'status.json').write_text('{"id": "x", "status": "succeeded"}')
+
+    assert get_job(job_id) is None
+
+
+def test_unknown_job_id_is_not_found(memory_broker):
+    assert get_job('0' * 32) is None
+
+
+def test_jobs_endpoints(client):
+    response = client.post('/v1/extractor/jobs', data={'file': (io.BytesIO(b'hello api'), 'notes.txt')})
+    assert response.status_code == 202
+    job_id = response.get_json()['id']
+
+    response = client.get(f'/v1/extractor/jobs/{job_id}')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == JOB_STATUS_SUCCEEDED
+
+    assert client.get('/v1/extractor/jobs/..').status_code == 404
+    assert client.get(f'/v1/extractor/jobs/{"0" * 32}').status_code == 404
+    assert client.post('/v1/extractor/jobs').status_code == 400
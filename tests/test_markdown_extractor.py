@@ -0,0 +1,55 @@
+"""Tests of the sections of the markdown extractor."""
+from core.extractor.blod.blod import Blob
+from core.extractor.markdown_extractor import MarkdownExtractor
+
+MARKDOWN = '''Preface text.
+
+# Guide
+Read the [docs](https://example.com) first.
+
+## Install
+```bash
+# not a header
+pip install extractor
+```
+
+### Linux
+<b>apt</b> works too.
+
+## Usage ##
+Run it.
+'''
+
+
+def extract(markdown: str, **kwargs):
+    return list(MarkdownExtractor('guide.md', blob=Blob.from_data(markdown.encode('utf-8'), path='guide.md'),
+                                  **kwargs).load())
+
+
+def test_sections_keep_their_header_path():
+    documents = extract(MARKDOWN)
+
+    assert [document.meta['header_path'] for document in documents] == [
+        [], ['Guide'], ['Guide', 'Install'], ['Guide', 'Install', 'Linux'], ['Guide', 'Usage']]
+    assert documents[0].content == 'Preface text.'
+    assert documents[4].content == '\n\nUsage\nRun it.'
+
+
+def test_fenced_code_is_kept_as_is():
+    install = extract(MARKDOWN)[2]
+
+    assert '# not a header\npip install extractor' in install.content
+
+
+def test_links_and_tags_are_cleaned():
+    documents = extract(MARKDOWN)
+
+    assert documents[1].content == '\n\nGuide\nRead the docs first.'
+    assert documents[3].content == '\n\nLinux\napt works too.'
+    assert '(https://example.com)' in extract(MARKDOWN, remove_hyperlinks=False)[1].content
+
+
+def test_unclosed_fence_keeps_the_rest_in_its_section():
+    documents = extract('# A\n~~~\n# B\n```\n# C\n')
+
+    assert [document.meta['header_path'] for document in documents] == [['A']]
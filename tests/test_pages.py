@@ -0,0 +1,71 @@
+"""Tests of the page selection of PDF extractions."""
+import io
+
+import pypdfium2 as pdfium
+import pytest
+
+from core.extractor.blod.blod import Blob
+from core.extractor.entity.extract_setting import ExtractSetting
+from core.extractor.extract_processor import ExtractProcessor
+from core.extractor.pdf_extractor import PdfExtractor, parse_pages, select_pages
+
+
+@pytest.fixture
+def pdf_blob() -> Blob:
+    pdf = pdfium.PdfDocument.new()
+    for _ in range(5):
+        pdf.new_page(200, 200)
+    data = io.BytesIO()
+    pdf.save(data)
+    return Blob.from_data(data.getvalue(), path='five.pdf')
+
+
+@pytest.mark.parametrize('pages, ranges', [
+    ('', []),
+    ('3', [(2, 3)]),
+    ('1-10,15', [(0, 10), (14, 15)]),
+    (' 2 - 4 , 7 ', [(1, 4), (6, 7)]),
+    ('20-', [(19, None)]),
+    ('-3', [(0, 3)]),
+])
+def test_parse_pages(pages, ranges):
+    assert parse_pages(pages) == ranges
+
+
+@pytest.mark.parametrize('pages, max_pages', [('0', None), ('5-2', None), ('a', None), ('1-b', None), ('', 0)])
+def test_parse_pages_rejects_invalid_values(pages, max_pages):
+    with pytest.raises(ValueError):
+        parse_pages(pages, max_pages)
+
+
+@pytest.mark.parametrize('pages, max_pages, selected', [
+    ('', None, [0, 1, 2, 3, 4]),
+    ('4-,1', None, [0, 3, 4]),
+    ('2-3,3-4', None, [1, 2, 3]),
+    ('4-10', None, [3, 4]),
+    ('9', None, []),
+    ('', 2, [0, 1]),
+    ('5,2-3', 2, [1, 2]),
+])
+def test_select_pages(pages, max_pages, selected):
+    assert select_pages(parse_pages(pages, max_pages), max_pages, 5) == selected
+
+
+def test_extractor_yields_the_selected_pages(pdf_blob):
+    documents = list(PdfExtractor('five.pdf', blob=pdf_blob, pages='2-3,5', max_pages=2).load())
+
+    assert [document.meta['page'] for document in documents] == [1, 2]
+
+
+def test_processor_selects_pages_of_extractors_supporting_them(pdf_blob):
+    documents = ExtractProcessor.extract(ExtractSetting(pages='4-'), blob=pdf_blob)
+
+    assert [document.meta['page'] for document in documents] == [3, 4]
+
+
+def test_processor_ignores_the_selection_of_other_extractors():
+    blob = Blob.from_data(b'no pages here', path='notes.txt')
+
+    documents = ExtractProcessor.extract(ExtractSetting(pages='2', maxPages=1), blob=blob)
+
+    assert [document.content for document in documents] == ['no pages here']
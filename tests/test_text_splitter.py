@@ -0,0 +1,73 @@
+"""Tests of the splitters applied to the extracted documents."""
+import pytest
+
+from core.extractor.text_splitter import (MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter, RegexTokenizer,
+                                          TokenTextSplitter, create_splitter)
+from core.models.document import Document
+
+
+def test_recursive_splitter_keeps_short_texts_whole():
+    assert RecursiveCharacterTextSplitter(100, 10).split_text('  a short text \n') == ['a short text']
+    assert RecursiveCharacterTextSplitter(100, 10).split_text('   ') == []
+
+
+def test_recursive_splitter_prefers_paragraphs():
+    text = 'first paragraph\n\nsecond paragraph\n\nthird paragraph'
+
+    assert RecursiveCharacterTextSplitter(35, 0).split_text(text) == [
+        'first paragraph\n\nsecond paragraph', 'third paragraph']
+
+
+def test_recursive_splitter_overlaps_chunks():
+    text = ' '.join(f'w{i}' for i in range(20))
+
+    # every chunk starts with the last words of the previous one, up to the overlap
+    assert RecursiveCharacterTextSplitter(20, 8).split_text(text) == [
+        'w0 w1 w2 w3 w4 w5 w6', 'w4 w5 w6 w7 w8 w9', 'w7 w8 w9 w10 w11 w12', 'w11 w12 w13 w14 w15',
+        'w14 w15 w16 w17 w18', 'w17 w18 w19']
+
+
+def test_recursive_splitter_splits_long_words_into_characters():
+    assert RecursiveCharacterTextSplitter(4, 1).split_text('abcdefghij') == ['abcd', 'defg', 'ghij']
+
+
+def test_markdown_splitter_keeps_the_header_path():
+    text = '# Guide\nintro\n## Install\nrun it\n```\n# not a header\n```\n## Usage\nuse it'
+    documents = list(MarkdownHeaderTextSplitter(1000, 0).split_document(Document(text, {'source': 'a.md'})))
+
+    assert [document.meta['header_path'] for document in documents] == [
+        ['Guide'], ['Guide', 'Install'], ['Guide', 'Usage']]
+    assert documents[1].content == '## Install\nrun it\n```\n# not a header\n```'
+    assert [document.meta['chunk'] for document in documents] == [0, 1, 2]
+    assert all(document.meta['source'] == 'a.md' for document in documents)
+
+
+def test_markdown_splitter_extends_the_path_of_extracted_sections():
+    document = Document('## Install\nrun it\n### Linux\napt install', {'header_path': ['Guide', 'Install']})
+
+    assert [chunk.meta['header_path'] for chunk in MarkdownHeaderTextSplitter(1000, 0).split_document(document)] == [
+        ['Guide', 'Install'], ['Guide', 'Install', 'Linux']]
+
+
+def test_token_splitter_windows():
+    tokenizer = RegexTokenizer()
+    text = ' '.join(f'w{i}' for i in range(10))
+    chunks = TokenTextSplitter(8, 2, tokenizer=tokenizer).split_text(text)
+
+    assert all(len(tokenizer.encode(chunk)) <= 8 for chunk in chunks)
+    assert chunks[0] == 'w0 w1 w2 w3'
+    assert chunks[1].startswith('w3')
+    assert chunks[-1].endswith('w9')
+
+
+@pytest.mark.parametrize('name, chunk_size, chunk_overlap', [
+    ('unknown', None, None), ('recursive', 0, None), ('recursive', 10, 10), ('token', 10, -1)])
+def test_create_splitter_rejects_invalid_settings(name, chunk_size, chunk_overlap):
+    with pytest.raises(ValueError):
+        create_splitter(name, chunk_size, chunk_overlap)
+
+
+def test_create_splitter_caps_the_default_overlap():
+    splitter = create_splitter('recursive', 50)
+
+    assert splitter.split_text('x' * 120) == ['x' * 50, 'x' * 50, 'x' * 40]
@@ -0,0 +1,20 @@
+"""Tests of the names given to downloaded files."""
+import pytest
+
+from core.extractor.url_fetcher import local_file_name
+
+
+@pytest.mark.parametrize('url, name', [
+    ('https://example.com/docs/report.pdf', 'report.pdf'),
+    ('https://example.com/docs/r%C3%A9sum%C3%A9.pdf?download=1', 'résumé.pdf'),
+    ('https://example.com/', 'file'),
+    ('https://example.com', 'file'),
+    ('https://example.com/docs/..', 'file'),
+    ('https://example.com/docs/%2F..', 'file'),
+    ('https://example.com/docs/.', 'file'),
+    ('https://example.com/docs/a%00b.pdf', 'file.pdf'),
+    ('https://example.com/docs/' + 'a' * 300 + '.pdf', 'file.pdf'),
+    ('https://example.com/docs/' + 'a' * 300 + '.' + 'b' * 20, 'file'),
+])
+def test_local_file_name(url, name):
+    assert local_file_name(url) == name
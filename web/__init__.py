@@ -1,7 +1,32 @@
-from flask import Blueprint
+import os
+from io import BytesIO
+
+from flask import Blueprint, Request
 from flask_restful import Api
+from werkzeug.formparser import default_stream_factory
+
+UPLOAD_MEMORY_MAX_BYTES = int(os.environ.get('UPLOAD_MEMORY_MAX_BYTES', 10 * 1024 * 1024))
+
+
+class ExtractorRequest(Request):
+    """
+    Request class keeping uploads of requests smaller than UPLOAD_MEMORY_MAX_BYTES in memory,
+    so that they can be extracted without ever touching the filesystem.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= UPLOAD_MEMORY_MAX_BYTES:
+            return BytesIO()
+
+        return default_stream_factory(
+            total_content_length=total_content_length,
+            filename=filename,
+            content_type=content_type,
+            content_length=content_length,
+        )
+
 
 bp = Blueprint('web', __name__, url_prefix='/v1')
 api = Api(bp)
 
-from . import extractor
+from . import extractor, images, jobs
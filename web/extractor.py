@@ -1,19 +1,125 @@
+import itertools
+import os
+import shutil
+import tarfile
 import tempfile
+import zipfile
+from functools import partial
+from io import BytesIO
+from typing import Optional, Union
 
-from flask import request
+from flask import Response, current_app, request, stream_with_context
 from flask_restful import Resource, reqparse, abort
 
+from core.extensions.ext_metrics import metrics
+from core.extractor.blod.blod import Blob
 from core.extractor.entity.extract_setting import ExtractSetting
 from core.extractor.extract_processor import ExtractProcessor
+from core.extractor.pdf_extractor import parse_pages
+from core.extractor.text_splitter import from_setting as splitter_from_setting
+from core.models.serialization import JSON_MIMETYPE, NDJSON_MIMETYPE, dump_document, dumps, prefers_ndjson
+from core.extractor.url_fetcher import FetchError
 from web import api
 
+BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', 1000))
+BATCH_MAX_BYTES = int(os.environ.get('BATCH_MAX_BYTES', 1024 * 1024 * 1024))
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+
+def wants_stream() -> bool:
+    """
+    Check whether the client asked for a streaming response, either with the `stream` query flag
+    or with an `Accept: application/x-ndjson` header.
+    """
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+
+    return prefers_ndjson(request.headers.get('Accept'))
+
+
+def request_setting() -> ExtractSetting:
+    """
+    Build the extract settings of a request from its `splitter`, `chunk_size`, `chunk_overlap`, `pages`,
+    `max_pages` and `document_id` form or query values, invalid values are answered with 400.
+    """
+    try:
+        extract_setting = ExtractSetting(splitter=request.values.get('splitter', ''),
+                                         chunkSize=request.values.get('chunk_size') or None,
+                                         chunkOverlap=request.values.get('chunk_overlap') or None,
+                                         pages=request.values.get('pages', ''),
+                                         maxPages=request.values.get('max_pages') or None,
+                                         documentId=request.values.get('document_id', ''))
+        splitter_from_setting(extract_setting)
+        parse_pages(extract_setting.pages, extract_setting.maxPages)
+    except ValueError as e:
+        abort(400, message=str(e))
+
+    return extract_setting
+
+
+def upload_blob(file) -> Optional[Blob]:
+    """
+    Wrap an uploaded file into an in-memory blob, if the request class kept it in memory.
+    Returns None for uploads spooled to disk, those have to be saved to a file first.
+    """
+    if not isinstance(file.stream, BytesIO):
+        return None
+
+    return Blob.from_data(file.stream.getvalue(), mime_type=file.mimetype or None,
+                          path=os.path.basename(file.filename))
+
+
+def ndjson_response(documents) -> Response:
+    """
+    Build a streaming response that writes every document as a single JSON line as soon as it is produced.
+
+    The first document is extracted before the response is built, so that the errors raised until then
+    are answered with an error status. An error raised once the response has started ends it with an
+    `{"error": ...}` line.
+    """
+    documents = iter(documents)
+    first = next(documents, None)
+
+    def generate():
+        try:
+            if first is None:
+                return
+            for document in itertools.chain((first,), documents):
+                with metrics.stage('serialization'):
+                    line = dump_document(document) + b'\n'
+                yield line
+        except Exception as e:
+            current_app.logger.exception('extraction failed while streaming')
+            yield dumps({'error': str(e)}) + b'\n'
+        finally:
+            if hasattr(documents, 'close'):
+                documents.close()
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+def documents_response(documents) -> Response:
+    """
+    Build the `{"documents": [...]}` response of a non streaming extraction, the encoding of the documents
+    is timed as the serialization stage.
+    """
+    documents = list(documents)
+    with metrics.stage('serialization'):
+        return Response(dumps({'documents': [document.to_dict() for document in documents]}), mimetype=JSON_MIMETYPE)
+
+
+def save_upload(file, file_path: str):
+    with metrics.stage('upload_save'):
+        file.save(file_path)
+
 
 class FileExtractor(Resource):
     """
     A Flask-RESTful resource for extracting text from uploaded files.
 
-    This resource accepts POST requests with a file part, saves the file to a temporary directory,
-    and then processes the file to extract text. The extracted text is returned in the response.
+    This resource accepts POST requests with a file part, keeps small files in memory and saves larger
+    ones to a temporary directory, and then processes the file to extract text. The extracted text is
+    returned in the response.
     """
 
     def post(self):
@@ -23,7 +129,11 @@ class FileExtractor(Resource):
         The request should include a file part with the key 'file'. If the file part is missing,
         or if no file is selected, an error message is returned.
 
-        The file is saved to a temporary directory, and then processed to extract text. The
+        The documents are split into chunks when a `splitter` (recursive, markdown or token) is given,
+        together with the optional `chunk_size` and `chunk_overlap`, see `request_setting`.
+
+        Files smaller than UPLOAD_MEMORY_MAX_BYTES are extracted in memory, larger ones are saved to a
+        temporary directory, and then processed to extract text. The
         extracted text is returned in the response as a list of documents, where each document
         is a dictionary that can be serialized to JSON.
 
@@ -35,6 +145,9 @@ class FileExtractor(Resource):
 
             If the request is not successful, the dictionary contains a single key-value pair,
             where the key is 'error' and the value is an error message.
+
+            When streaming is requested (see `wants_stream`), the documents are written as
+            newline-delimited JSON as soon as they are extracted instead.
         """
         if 'file' not in request.files:
             abort(400, message='No file part')
@@ -43,13 +156,35 @@ class FileExtractor(Resource):
         if file.filename == '':
             abort(400, message='No selected file')
 
+        extract_setting = request_setting()
+        blob = upload_blob(file)
+        if blob is not None:
+            if wants_stream():
+                return ndjson_response(ExtractProcessor.iter_extract(extract_setting, blob=blob))
+
+            documents = ExtractProcessor.extract(extract_setting, blob=blob)
+            return documents_response(documents)
+
+        if wants_stream():
+            temp_dir = tempfile.mkdtemp()
+            file_path = f"{temp_dir}/{os.path.basename(file.filename)}"
+            save_upload(file, file_path)
+
+            def generate():
+                try:
+                    yield from ExtractProcessor.iter_extract(extract_setting, file_path=file_path)
+                finally:
+                    shutil.rmtree(temp_dir, ignore_errors=True)
+
+            return ndjson_response(generate())
+
         with tempfile.TemporaryDirectory() as temp_dir:
-            file_path = f"{temp_dir}/{file.filename}"
-            file.save(file_path)
+            file_path = f"{temp_dir}/{os.path.basename(file.filename)}"
+            save_upload(file, file_path)
 
-            documents = ExtractProcessor.extract(ExtractSetting(), file_path=file_path)
+            documents = ExtractProcessor.extract(extract_setting, file_path=file_path)
 
-        return {'documents': [document.to_dict() for document in documents]}
+        return documents_response(documents)
 
 
 class WebExtractor(Resource):
@@ -67,6 +202,9 @@ class WebExtractor(Resource):
         The request should include a form part with the key 'url'. If the 'url' part is missing,
         an error message is returned.
 
+        The optional `splitter`, `chunk_size` and `chunk_overlap` values chunk the documents, as for the
+        file resource.
+
         The content of the web page is fetched and then processed to extract text. The
         extracted text is returned in the response as a list of documents, where each document
         is a dictionary that can be serialized to JSON.
@@ -78,16 +216,131 @@ class WebExtractor(Resource):
             extracted text.
 
             If the request is not successful, the dictionary contains a single key-value pair,
-            where the key is 'error' and the value is an error message.
+            where the key is 'error' and the value is an error message. Urls that cannot be fetched
+            are answered with 400 (invalid url), 413 (too large), 504 (too slow) or 502.
+
+            When streaming is requested (see `wants_stream`), the documents are written as
+            newline-delimited JSON as soon as they are extracted instead.
         """
         target_url = request.form.get('url')
         if not target_url:
             abort(400, message='No url provided')
 
-        documents = ExtractProcessor.load_from_url(target_url)
+        extract_setting = request_setting()
+        try:
+            documents = ExtractProcessor.iter_from_url(target_url, extract_setting)
+        except FetchError as e:
+            abort(e.status_code, message=str(e))
+
+        if wants_stream():
+            return ndjson_response(documents)
+
+        return documents_response(documents)
+
+
+class BatchExtractor(Resource):
+    """
+    A Flask-RESTful resource for extracting text from many uploaded files in a single request.
+
+    This resource accepts POST requests with any number of file parts, each of which can also be a
+    zip or tar archive. Files are kept in memory when small enough, otherwise saved to a single
+    temporary directory, and extracted on a bounded worker pool.
+    """
+
+    def post(self):
+        """
+        Handle a POST request to the BatchExtractor resource.
+
+        Every file part of the request is extracted, archives (zip, tar, tar.gz, ...) are unpacked and
+        each of their members is extracted. If no file is provided, the number of files exceeds
+        BATCH_MAX_FILES or the archives unpack to more than BATCH_MAX_BYTES, an error message is returned.
+
+        Returns:
+            A dictionary that can be serialized to JSON, with a single key 'results'. Its value maps
+            every file name (the archive member path for archives) to either a dictionary with the
+            key 'documents' holding the extracted documents, or with the key 'error' holding an
+            error message when that single file could not be extracted.
+        """
+        files = [file for _, file in request.files.items(multi=True) if file.filename]
+        if not files:
+            abort(400, message='No file part')
+
+        extract_setting = request_setting()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_paths, unpacked = {}, 0
+            for file in files:
+                if file.filename.lower().endswith(ARCHIVE_EXTENSIONS):
+                    try:
+                        unpacked = self._unpack_archive(file, temp_dir, file_paths, unpacked)
+                    except (zipfile.BadZipFile, tarfile.TarError):
+                        abort(400, message=f'Invalid archive {file.filename}')
+                elif (blob := upload_blob(file)) is not None:
+                    self._add_path(file_paths, file.filename, blob)
+                else:
+                    file_path = self._temp_path(temp_dir, file.filename, len(file_paths))
+                    save_upload(file, file_path)
+                    self._add_path(file_paths, file.filename, file_path)
+
+            if len(file_paths) > BATCH_MAX_FILES:
+                abort(400, message=f'Too many files, at most {BATCH_MAX_FILES} are allowed')
+
+            results = ExtractProcessor.extract_batch(file_paths, extract_setting)
+
+        with metrics.stage('serialization'):
+            return Response(dumps({'results': {
+                name: {'error': str(result)} if isinstance(result, Exception)
+                else {'documents': [document.to_dict() for document in result]}
+                for name, result in results.items()
+            }}), mimetype=JSON_MIMETYPE)
+
+    def _unpack_archive(self, file, temp_dir: str, file_paths: dict[str, Union[str, Blob]], unpacked: int) -> int:
+        """Unpack the members of an archive, returning the number of bytes unpacked by the request so far."""
+        if file.filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(file.stream) as archive:
+                for member in archive.infolist():
+                    if not member.is_dir():
+                        unpacked = self._unpack_member(partial(archive.open, member), member.filename,
+                                                       member.file_size, temp_dir, file_paths, unpacked)
+        else:
+            with tarfile.open(fileobj=file.stream, mode='r:*') as archive:
+                for member in archive:
+                    if member.isfile():
+                        unpacked = self._unpack_member(partial(archive.extractfile, member), member.name,
+                                                       member.size, temp_dir, file_paths, unpacked)
+        return unpacked
+
+    def _unpack_member(self, open_member, name: str, size: int, temp_dir: str,
+                       file_paths: dict[str, Union[str, Blob]], unpacked: int) -> int:
+        # the sizes of the headers are checked first, and the bytes written as well since headers can lie
+        if len(file_paths) >= BATCH_MAX_FILES:
+            abort(400, message=f'Too many files, at most {BATCH_MAX_FILES} are allowed')
+        if unpacked + size > BATCH_MAX_BYTES:
+            abort(400, message=f'Archives too large, at most {BATCH_MAX_BYTES} bytes can be unpacked')
+
+        file_path = self._temp_path(temp_dir, name, len(file_paths))
+        with open_member() as src, open(file_path, 'wb') as dst:
+            while chunk := src.read(1024 * 1024):
+                unpacked += len(chunk)
+                if unpacked > BATCH_MAX_BYTES:
+                    abort(400, message=f'Archives too large, at most {BATCH_MAX_BYTES} bytes can be unpacked')
+                dst.write(chunk)
+        self._add_path(file_paths, name, file_path)
+        return unpacked
+
+    @staticmethod
+    def _temp_path(temp_dir: str, filename: str, index: int) -> str:
+        # only keep the base name, archive member paths must never escape the temporary directory
+        return f"{temp_dir}/{index}-{os.path.basename(filename)}"
 
-        return {'documents': [document.to_dict() for document in documents]}
+    @staticmethod
+    def _add_path(file_paths: dict[str, Union[str, Blob]], name: str, file_path: Union[str, Blob]):
+        key, n = name, 1
+        while key in file_paths:
+            n += 1
+            key = f"{name} ({n})"
+        file_paths[key] = file_path
 
 
 api.add_resource(FileExtractor, '/extractor/file')
 api.add_resource(WebExtractor, '/extractor/url')
+api.add_resource(BatchExtractor, '/extractor/batch')
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import uuid
+
+from flask import Response, request
+from flask_restful import Resource, abort
+from pypdfium2 import PdfiumError
+
+from lib.pdf import IMAGE_FORMATS, PDF_RENDER_DPI, PDF_RENDER_FORMAT, render_pdf_pages
+from web import api
+from web.extractor import save_upload
+
+
+class PageImages(Resource):
+    """
+    A Flask-RESTful resource rendering the pages of an uploaded PDF file as images.
+
+    The images are streamed as a multipart/mixed response while they are rendered, one part per page.
+    """
+
+    def post(self):
+        """
+        Handle a POST request to the PageImages resource.
+
+        The request should include a file part with the key 'file'. The optional `dpi`, `format` (jpeg,
+        png or webp), `pages` (e.g. `1-10,15`) and `max_pages` form or query values select the resolution,
+        the image format and the pages, invalid values and files that are no PDF are answered with 400.
+
+        Returns:
+            A multipart/mixed response with a part per page, in page order. Every part has the content
+            type of the image format and an `X-Page` header holding the index of the page, starting
+            from 0.
+        """
+        if 'file' not in request.files:
+            abort(400, message='No file part')
+
+        file = request.files['file']
+        if file.filename == '':
+            abort(400, message='No selected file')
+
+        image_format = request.values.get('format', PDF_RENDER_FORMAT).lower()
+        temp_dir = tempfile.mkdtemp()
+        try:
+            # workers of the process pool open the file on their own
+            file_path = f"{temp_dir}/{os.path.basename(file.filename)}"
+            save_upload(file, file_path)
+            max_pages = request.values.get('max_pages')
+            images = render_pdf_pages(file_path, int(request.values.get('dpi') or PDF_RENDER_DPI), image_format,
+                                      request.values.get('pages', ''), int(max_pages) if max_pages else None)
+        except (ValueError, PdfiumError) as e:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            abort(400, message=str(e))
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        boundary = uuid.uuid4().hex
+        target = IMAGE_FORMATS[image_format]
+
+        def generate():
+            try:
+                for page_number, image in images:
+                    yield (f'--{boundary}\r\nContent-Type: {target.mimetype}\r\nContent-Length: {len(image)}\r\n'
+                           f'Content-Disposition: attachment; filename="page-{page_number + 1}{target.extension}"\r\n'
+                           f'X-Page: {page_number}\r\n\r\n').encode('ascii')
+                    yield image
+                    yield b'\r\n'
+                yield f'--{boundary}--\r\n'.encode('ascii')
+            finally:
+                images.close()
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        return Response(generate(), content_type=f'multipart/mixed; boundary={boundary}')
+
+
+api.add_resource(PageImages, '/extractor/images')
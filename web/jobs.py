@@ -0,0 +1,70 @@
+import os
+
+from flask import request
+from flask_restful import Resource, abort
+
+from core.tasks.extract_task import get_job, is_job_id, submit_job
+from web import api
+from web.extractor import request_setting
+
+
+class ExtractJobs(Resource):
+    """
+    A Flask-RESTful resource for submitting long-running extractions as asynchronous jobs.
+
+    This resource accepts POST requests with a file part, stores the file and enqueues its extraction
+    on a worker. The id of the job is returned immediately. With the default `memory://` broker there
+    is no worker and the job runs within the request, it is only asynchronous with a real broker or
+    the filesystem one, see CELERY_BROKER_URL.
+    """
+
+    def post(self):
+        """
+        Handle a POST request to the ExtractJobs resource.
+
+        The request should include a file part with the key 'file'. If the file part is missing,
+        or if no file is selected, an error message is returned.
+
+        Returns:
+            A dictionary that can be serialized to JSON, describing the submitted job. Its 'id' can be
+            used to query the job status and results.
+        """
+        if 'file' not in request.files:
+            abort(400, message='No file part')
+
+        file = request.files['file']
+        if file.filename == '':
+            abort(400, message='No selected file')
+
+        job = submit_job(os.path.basename(file.filename), file.read(), request_setting())
+
+        return job, 202
+
+
+class ExtractJob(Resource):
+    """
+    A Flask-RESTful resource for querying the status and results of an extraction job.
+    """
+
+    def get(self, job_id: str):
+        """
+        Handle a GET request to the ExtractJob resource.
+
+        Returns:
+            A dictionary that can be serialized to JSON, describing the job. The 'status' is one of
+            pending, running, succeeded or failed. Once the job succeeded, the 'documents' key contains
+            the extracted documents, if it failed, the 'error' key contains an error message.
+            Unknown and invalid job ids are answered with 404.
+        """
+        if not is_job_id(job_id):
+            abort(404, message='Job not found')
+
+        job = get_job(job_id)
+        if job is None:
+            abort(404, message='Job not found')
+
+        return job
+
+
+api.add_resource(ExtractJobs, '/extractor/jobs')
+api.add_resource(ExtractJob, '/extractor/jobs/<string:job_id>')
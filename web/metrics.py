@@ -0,0 +1,17 @@
+from flask import Blueprint, Response, abort
+
+from core.extensions.ext_metrics import metrics
+
+bp = Blueprint('metrics', __name__)
+
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    """
+    Expose the Prometheus metrics of the extractions, the endpoint answers 404 while metrics are disabled.
+    """
+    if not metrics.enabled:
+        abort(404)
+
+    data, content_type = metrics.render()
+    return Response(data, content_type=content_type)